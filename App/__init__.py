@@ -1,4 +1,19 @@
-from .models import *
-from .views import *
-from .controllers import *
-from .main import *
\ No newline at end of file
+import importlib
+
+# The package used to star-import its models, views, controllers and main,
+# so any `import App.x` paid for Flask-Admin and every blueprint. Names are
+# now resolved on first use instead (PEP 562), keeping `from App import X`
+# working without the import cost for CLI and worker processes.
+_SUBMODULES = ('App.models', 'App.controllers', 'App.main', 'App.views')
+
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    for module_name in _SUBMODULES:
+        module = importlib.import_module(module_name)
+        if hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module 'App' has no attribute {name!r}")
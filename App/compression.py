@@ -0,0 +1,155 @@
+import threading
+import time
+import zlib
+
+from flask import request
+
+from App.metrics import register_metrics
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/javascript',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+})
+
+
+class ResponseCompressor:
+    """Negotiated gzip/brotli Content-Encoding for responses.
+
+    Bodies under ``min_bytes`` go out as they are. Streamed bodies (such as
+    /api/users?stream=1) are compressed chunk by chunk as they are sent, so
+    they never have to be held in memory. Server-Sent Events are left
+    alone: their events must reach the client as soon as they are written.
+    """
+
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=4, encodings=('br', 'gzip')):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = [encoding for encoding in encodings if encoding != 'br' or brotli is not None]
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.streamed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            return brotli.Compressor(quality=self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    def compress(self, encoding, data):
+        compressor = self._compressor(encoding)
+        return compressor.process(data) + compressor.finish()
+
+    def after_request(self, response):
+        if (
+            request.method == 'HEAD'
+            or response.direct_passthrough
+            or not 200 <= response.status_code < 300
+            or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+        if not response.is_streamed and len(response.get_data()) < self.min_bytes:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = self._stream(encoding, response.response)
+            response.headers.pop('Content-Length', None)
+            with self._lock:
+                self.streamed += 1
+        else:
+            data = response.get_data()
+            start = time.process_time()
+            body = self.compress(encoding, data)
+            self._record(len(data), len(body), time.process_time() - start)
+            response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _stream(self, encoding, chunks):
+        compressor = self._compressor(encoding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                start = time.process_time()
+                out = compressor.process(chunk)
+                self._record(len(chunk), len(out), time.process_time() - start, count=False)
+                if out:
+                    yield out
+            out = compressor.finish()
+            self._record(0, len(out), 0.0)
+            yield out
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def _record(self, bytes_in, bytes_out, seconds, count=True):
+        with self._lock:
+            self.compressed += count
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'encodings': list(self.encodings),
+                'compressed': self.compressed,
+                'streamed': self.streamed,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+                'cpu_ms': self.seconds * 1000,
+            }
+
+
+class _GzipCompressor:
+    # zlib's compressobj behind the process/finish interface of brotli's Compressor
+
+    def __init__(self, level):
+        # wbits 31: a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def setup_compression(app):
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return None
+    compressor = ResponseCompressor(
+        min_bytes=app.config.get('COMPRESS_MIN_BYTES', 1024),
+        gzip_level=app.config.get('COMPRESS_GZIP_LEVEL', 6),
+        brotli_quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4),
+        encodings=app.config.get('COMPRESS_ENCODINGS', ('br', 'gzip')),
+    )
+    app.extensions['compression'] = compressor
+    app.after_request(compressor.after_request)
+    register_metrics(app, 'compression', compressor.stats)
+    return compressor
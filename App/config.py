@@ -16,4 +16,94 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
     for key in overrides:
-        app.config[key] = overrides[key]
\ No newline at end of file
+        app.config[key] = overrides[key]
+    apply_engine_profile(app.config)
+
+
+def apply_engine_profile(config):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS from the DB_ENGINE_PROFILE setting.
+
+    Profiles: "auto" (default, picked from the database URI), "sqlite",
+    "postgresql" or "none". Options set explicitly in
+    SQLALCHEMY_ENGINE_OPTIONS always win over the profile. DB_COOPERATIVE
+    is resolved here too (see App.cooperative).
+    """
+    from App.cooperative import cooperative_enabled
+    config['DB_COOPERATIVE'] = cooperative_enabled(config)
+    profile = config.get('DB_ENGINE_PROFILE', 'auto')
+    if profile == 'auto':
+        uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+        profile = uri.split(':', 1)[0].split('+', 1)[0]
+        if profile == 'postgres':
+            profile = 'postgresql'
+    builders = {'sqlite': sqlite_engine_options, 'postgresql': postgresql_engine_options}
+    if profile not in builders:
+        return
+    config['DB_ENGINE_PROFILE'] = profile
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **builders[profile](config),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+
+def sqlite_engine_options(config):
+    # the pragmas themselves are applied per connection by App.database
+    config.setdefault('SQLITE_PRAGMAS', {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    })
+    from App.database import TimedQueuePool
+    options = {'poolclass': TimedQueuePool}
+    if config['DB_COOPERATIVE'] and sqlite_file_database(config):
+        # queries run on DB_OFFLOAD_THREADS native threads; sessions keep
+        # their connection for the whole request, so allow more connections
+        # than threads for greenlets that are between queries
+        from App.cooperative import OffloadedSQLite
+        threads = config.get('DB_OFFLOAD_THREADS', 8)
+        _, greenlets = gunicorn_concurrency(config)
+        connections = max(threads, min(greenlets, config.get('SQLITE_MAX_CONNECTIONS', 32)))
+        options.update(
+            module=OffloadedSQLite(threads),
+            pool_size=threads,
+            max_overflow=connections - threads,
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 10),
+        )
+    return options
+
+
+def sqlite_file_database(config):
+    # in-memory databases live on one shared connection (StaticPool)
+    database = (config.get('SQLALCHEMY_DATABASE_URI') or '').partition(':///')[2].split('?', 1)[0]
+    return database not in ('', ':memory:')
+
+
+def postgresql_engine_options(config):
+    """Size each worker's pool so all gunicorn workers fit under max_connections.
+
+    Greenlets beyond the pool wait cooperatively for a connection (up to
+    pool_timeout), which is cheaper than letting each open its own. Under
+    gevent, queries yield to other greenlets through psycopg2's wait
+    callback (App.cooperative), so the pool is sized up to the greenlets.
+    """
+    from App.database import TimedQueuePool
+    workers, greenlets = gunicorn_concurrency(config)
+    budget = config.get('DB_MAX_CONNECTIONS', 100) - config.get('DB_RESERVED_CONNECTIONS', 10)
+    per_worker = max(2, min(budget // workers, greenlets))
+    pool_size = max(1, per_worker * 3 // 4)
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': per_worker - pool_size,
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+
+def gunicorn_concurrency(config):
+    """(worker processes, greenlets per worker), read the same way as gunicorn_config.py."""
+    workers = config.get('GUNICORN_WORKERS') or int(os.environ.get('WEB_CONCURRENCY', 4))
+    greenlets = config.get('GUNICORN_WORKER_CONNECTIONS') or int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+    return max(1, int(workers)), max(1, int(greenlets))
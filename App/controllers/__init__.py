@@ -1,3 +1,12 @@
 from .user import *
 from .auth import *
+from .route import *
+from .street import *
+from .driver import *
+from .geofence import *
+from .demand import *
+from .dashboard import *
+from .notification import *
+from .dataset import *
+from .bulk_import import *
 from .initialize import *
@@ -1,19 +1,164 @@
-from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request, get_current_user
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_polymorphic
 
 from App.models import User
 from App.database import db
+from App.metrics import register_metrics
 
 def login(username, password):
   result = db.session.execute(db.select(User).filter_by(username=username))
   user = result.scalar_one_or_none()
   if user and user.check_password(password):
+    # transparently upgrade hashes made with older parameters
+    if user.password_needs_rehash():
+      user.set_password(password)
+      db.session.commit()
     # Store ONLY the user id as a string in JWT 'sub'
     return create_access_token(identity=str(user.id))
   return None
 
 
+class UserIdentityCache:
+  """Short-TTL LRU of detached, fully loaded users keyed by id.
+
+  Entries are merged into the request's session with load=False, so a hit
+  costs no SQL. ORM writes and deletes of a user evict it (see the session
+  listeners below). Columns written by bulk Core statements, such as the
+  driver location buffer, can be stale for up to ``ttl`` seconds.
+
+  The cache lives in one process and eviction only reaches that process:
+  other gunicorn workers (and other hosts) keep serving a deleted or
+  renamed user, or one whose type changed, until their entry's ``ttl``
+  runs out, so keep USER_CACHE_TTL as short as that can be tolerated.
+  """
+
+  def __init__(self, maxsize=1024, ttl=30.0, clock=time.monotonic):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._clock = clock
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, user_id):
+    with self._lock:
+      entry = self._entries.get(user_id)
+      if entry is None or entry[0] < self._clock():
+        self._entries.pop(user_id, None)
+        self.misses += 1
+        return None
+      self._entries.move_to_end(user_id)
+      self.hits += 1
+      return entry[1]
+
+  def put(self, user_id, user):
+    with self._lock:
+      self._entries[user_id] = (self._clock() + self.ttl, user)
+      self._entries.move_to_end(user_id)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, user_id):
+    with self._lock:
+      self._entries.pop(user_id, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self):
+    with self._lock:
+      return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def setup_user_cache(app):
+  cache = UserIdentityCache(
+    maxsize=app.config.get('USER_CACHE_SIZE', 1024),
+    ttl=app.config.get('USER_CACHE_TTL', 30.0),
+  )
+  app.extensions['user_cache'] = cache
+  register_metrics(app, 'user_cache', cache.stats)
+  return cache
+
+
+# Evict users changed or deleted through the ORM, e.g. update_user or
+# set_password, from the current app's cache. Registered once here rather
+# than per app so creating apps doesn't stack listeners. Evicting again
+# after commit stops another request from re-caching the old row while the
+# transaction is still open.
+def _current_user_cache():
+  if not has_app_context():
+    return None
+  return current_app.extensions.get('user_cache')
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, _flush_context):
+  changed = {obj.id for obj in list(session.dirty) + list(session.deleted)
+             if isinstance(obj, User) and obj.id is not None}
+  if not changed:
+    return
+  cache = _current_user_cache()
+  if cache is not None:
+    for user_id in changed:
+      cache.invalidate(user_id)
+  session.info.setdefault('changed_user_ids', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_users(session):
+  changed = session.info.pop('changed_user_ids', ())
+  cache = _current_user_cache()
+  if cache is not None:
+    for user_id in changed:
+      cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_users(session):
+  session.info.pop('changed_user_ids', None)
+
+
+def invalidate_user(user_id):
+  current_app.extensions['user_cache'].invalidate(user_id)
+
+
+def get_cached_user(user_id):
+  """Load a user once per request and at most once per TTL across requests."""
+  per_request = g.setdefault('_user_identity_cache', {})
+  if user_id in per_request:
+    return per_request[user_id]
+  cache = current_app.extensions['user_cache']
+  detached = cache.get(user_id)
+  if detached is None:
+    detached = _load_detached_user(user_id)
+    if detached is not None:
+      cache.put(user_id, detached)
+  user = db.session.merge(detached, load=False) if detached is not None else None
+  per_request[user_id] = user
+  return user
+
+
+def _load_detached_user(user_id):
+  # A private session that never commits, so the instance stays fully
+  # loaded (subclass columns included) after it is detached.
+  users = with_polymorphic(User, '*')
+  with Session(db.engine, expire_on_commit=False) as session:
+    return session.scalars(db.select(users).where(users.id == user_id)).one_or_none()
+
+
 def setup_jwt(app):
   jwt = JWTManager(app)
+  setup_user_cache(app)
 
   # Always store a string user id in the JWT identity (sub),
   # whether a User object or a raw id is passed.
@@ -30,7 +175,7 @@ def setup_jwt(app):
       user_id = int(identity)
     except (TypeError, ValueError):
       return None
-    return db.session.get(User, user_id)
+    return get_cached_user(user_id)
 
   return jwt
 
@@ -40,13 +185,11 @@ def add_auth_context(app):
   @app.context_processor
   def inject_user():
       try:
-          verify_jwt_in_request()
-          identity = get_jwt_identity()
-          user_id = int(identity) if identity is not None else None
-          current_user = db.session.get(User, user_id) if user_id is not None else None
-          is_authenticated = current_user is not None
-      except Exception as e:
-          print(e)
-          is_authenticated = False
+          # reuse the identity if @jwt_required already verified this request
+          if g.get('_jwt_extended_jwt') is None:
+              verify_jwt_in_request(optional=True)
+          current_user = get_current_user()
+      except (JWTExtendedException, PyJWTError, RuntimeError):
+          # missing, expired or invalid tokens render the page anonymously
           current_user = None
-      return dict(is_authenticated=is_authenticated, current_user=current_user)
\ No newline at end of file
+      return dict(is_authenticated=current_user is not None, current_user=current_user)
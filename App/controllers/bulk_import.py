@@ -0,0 +1,425 @@
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy.exc import IntegrityError
+
+from App.models import User, Resident, Street, Route, StopRequest, RouteDemand
+from App.database import db
+from App.hashing import get_password_hasher
+
+IMPORT_KINDS = ('streets', 'residents', 'stop_requests')
+IMPORT_FORMATS = ('csv', 'jsonl')
+# rows validated, hashed and written per transaction
+IMPORT_CHUNK_SIZE = 1000
+# per-row errors listed in the summary; 'rejected' counts all of them
+IMPORT_MAX_ERRORS = 100
+IMPORT_STOP_STATUSES = ("requested", "confirmed", "cancelled")
+
+
+class ImportRowError(ValueError):
+    """A row that can't be imported; the rest of the file still is."""
+
+
+def read_import_rows(stream, fmt):
+    """(line, row) pairs from a binary stream of CSV (with a header row) or JSON Lines.
+
+    Lines are decoded one at a time, so a line that isn't UTF-8 or isn't
+    valid JSON comes through as (line, ImportRowError) instead of ending
+    the import. Nothing is read ahead of the rows being consumed.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    bad_lines = set()
+    lines = _decoded_lines(stream, bad_lines)
+    if fmt == 'csv':
+        return _csv_rows(lines, bad_lines)
+    return _jsonl_rows(lines, bad_lines)
+
+
+def _decoded_lines(stream, bad_lines):
+    for number, raw in enumerate(stream, 1):
+        if number == 1 and raw.startswith(b'\xef\xbb\xbf'):
+            raw = raw[3:]
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(number)
+            yield raw.decode('utf-8', 'replace')
+
+
+def _csv_rows(lines, bad_lines):
+    reader = csv.DictReader(lines)
+    last = 1
+    for row in reader:
+        # a quoted field can span lines; the row ends at reader.line_num
+        first, last = last + 1, reader.line_num
+        if bad_lines and any(first <= n <= last for n in bad_lines):
+            yield last, ImportRowError("line is not valid UTF-8")
+        elif None in row:
+            yield last, ImportRowError(f"{len(row[None])} more value(s) than header columns")
+        else:
+            yield last, row
+
+
+def _jsonl_rows(lines, bad_lines):
+    for number, text in enumerate(lines, 1):
+        if number in bad_lines:
+            yield number, ImportRowError("line is not valid UTF-8")
+            continue
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield number, ImportRowError(f"invalid JSON: {e}")
+            continue
+        if isinstance(row, dict):
+            yield number, row
+        else:
+            yield number, ImportRowError("each line must be a JSON object")
+
+
+def import_rows(kind, rows, chunk_size=IMPORT_CHUNK_SIZE, max_errors=IMPORT_MAX_ERRORS, report=None):
+    """Import (line, row) pairs, e.g. from read_import_rows, as streets, residents or stop_requests.
+
+    Rows are taken chunk_size at a time: each chunk is validated with one
+    lookup query per referenced table, written with executemany INSERTs and
+    committed on its own, so memory stays flat and a bad row only costs
+    itself. A chunk the database refuses (say a username taken by a
+    concurrent signup) is retried one row at a time. report, if given, is
+    called with a progress line after every chunk.
+
+    Returns a summary: rows read, imported and rejected, the first
+    max_errors errors as {line, error}, seconds and rows_per_second.
+    """
+    if kind not in IMPORTERS:
+        raise ValueError(f"kind must be one of {', '.join(IMPORT_KINDS)}")
+    importer = IMPORTERS[kind]()
+    summary = {'kind': kind, 'rows': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+
+    def reject(line, error):
+        summary['rejected'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'line': line, 'error': str(error)})
+
+    start = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        summary['rows'] += len(chunk)
+        parsed = []
+        for line, row in chunk:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                parsed.append((line, importer.parse(row)))
+            except ImportRowError as e:
+                reject(line, e)
+        summary['imported'] += _write_chunk(importer, importer.check(parsed, reject), reject)
+        if report:
+            elapsed = time.perf_counter() - start
+            report(f"   {summary['rows']:>10} rows {summary['imported']:>10} imported "
+                   f"{summary['rejected']:>8} rejected {summary['rows'] / max(elapsed, 1e-9):>10.0f} rows/s")
+
+    elapsed = time.perf_counter() - start
+    summary['errors'].sort(key=lambda error: error['line'])
+    summary['seconds'] = round(elapsed, 3)
+    summary['rows_per_second'] = round(summary['rows'] / max(elapsed, 1e-9), 1)
+    return summary
+
+
+def _write_chunk(importer, valid, reject):
+    if not valid:
+        return 0
+    try:
+        written_rows = importer.write([values for _, values in valid])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    else:
+        importer.remember(written_rows)
+        return len(valid)
+    written = 0
+    for line, values in valid:
+        try:
+            written_rows = importer.write([values])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            reject(line, f"rejected by the database: {e.orig}")
+            continue
+        importer.remember(written_rows)
+        written += 1
+    return written
+
+
+def _text(row, key, max_length, required=True, strip=True):
+    value = row.get(key)
+    value = value.strip() if strip and isinstance(value, str) else value
+    if value is None or value == '':
+        if required:
+            raise ImportRowError(f"{key} is required")
+        return None
+    if not isinstance(value, str):
+        raise ImportRowError(f"{key} must be a string")
+    if len(value) > max_length:
+        raise ImportRowError(f"{key} is longer than {max_length} characters")
+    return value
+
+
+def _number(row, key, kind, default=None):
+    value = row.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    if isinstance(value, bool):
+        raise ImportRowError(f"{key} must be a number")
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{key} must be {'an integer' if kind is int else 'a number'}")
+    if kind is int and isinstance(value, float) and number != value:
+        raise ImportRowError(f"{key} must be an integer")
+    return number
+
+
+class _Importer:
+    # parse() checks one row on its own, check() the chunk against the
+    # database, write() inserts it and remember() updates the lookup caches
+    # once the chunk is committed
+
+    def parse(self, row):
+        raise NotImplementedError
+
+    def check(self, parsed, reject):
+        return parsed
+
+    def write(self, rows):
+        raise NotImplementedError
+
+    def remember(self, written):
+        pass
+
+
+class _StreetNames:
+    # name -> street_id, filled one IN query per chunk for the names not seen yet
+
+    def __init__(self):
+        self.ids = {}
+        self.known_ids = set()
+
+    def load(self, names=(), street_ids=()):
+        names = sorted(set(names) - self.ids.keys())
+        if names:
+            self.ids.update(db.session.execute(
+                db.select(Street.name, Street.street_id).where(Street.name.in_(names))
+            ).all())
+        street_ids = sorted(set(street_ids) - self.known_ids)
+        if street_ids:
+            self.known_ids.update(db.session.scalars(
+                db.select(Street.street_id).where(Street.street_id.in_(street_ids))
+            ))
+
+
+class StreetImporter(_Importer):
+    """Columns: name, and optionally lat and lon."""
+
+    def __init__(self):
+        self.streets = _StreetNames()
+        self.names = set()
+
+    def parse(self, row):
+        lat, lon = _number(row, 'lat', float), _number(row, 'lon', float)
+        if (lat is None) != (lon is None):
+            raise ImportRowError("lat and lon must be given together")
+        if lat is not None and not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ImportRowError("lat and lon must be valid coordinates")
+        return {'name': _text(row, 'name', 100), 'lat': lat, 'lon': lon}
+
+    def check(self, parsed, reject):
+        self.streets.load(values['name'] for _, values in parsed)
+        valid = []
+        for line, values in parsed:
+            if values['name'] in self.streets.ids or values['name'] in self.names:
+                reject(line, f"street {values['name']!r} already exists")
+                continue
+            self.names.add(values['name'])
+            valid.append((line, values))
+        return valid
+
+    def write(self, rows):
+        return db.session.execute(
+            Street.__table__.insert().returning(Street.__table__.c.name, Street.__table__.c.street_id), rows
+        ).all()
+
+    def remember(self, written):
+        self.streets.ids.update(written)
+
+
+class ResidentImporter(_Importer):
+    """Columns: username, password, name, street (a name) or street_id, and optionally contact.
+
+    Passwords arrive in plain text and are hashed with the configured
+    method, the chunk's hashes spread over the password hasher's threads.
+    """
+
+    def __init__(self):
+        self.streets = _StreetNames()
+        self.usernames = set()
+
+    def parse(self, row):
+        values = {
+            'username': _text(row, 'username', 100),
+            # spaces in a password are part of it
+            'password': _text(row, 'password', 1000, strip=False),
+            'name': _text(row, 'name', 100),
+            'contact': _text(row, 'contact', 100, required=False),
+            'street': _text(row, 'street', 100, required=False),
+            'street_id': _number(row, 'street_id', int),
+        }
+        if values['street'] is None and values['street_id'] is None:
+            raise ImportRowError("street or street_id is required")
+        return values
+
+    def check(self, parsed, reject):
+        self.streets.load(
+            (values['street'] for _, values in parsed if values['street_id'] is None),
+            (values['street_id'] for _, values in parsed if values['street_id'] is not None),
+        )
+        usernames = sorted({values['username'] for _, values in parsed})
+        taken = set(db.session.scalars(db.select(User.username).where(User.username.in_(usernames)))) if usernames else set()
+        valid = []
+        for line, values in parsed:
+            if values['street_id'] is None:
+                values['street_id'] = self.streets.ids.get(values['street'])
+                if values['street_id'] is None:
+                    reject(line, f"street {values['street']!r} not found")
+                    continue
+            elif values['street_id'] not in self.streets.known_ids:
+                reject(line, f"street {values['street_id']} not found")
+                continue
+            if values['username'] in taken or values['username'] in self.usernames:
+                reject(line, f"username {values['username']!r} is taken")
+                continue
+            self.usernames.add(values['username'])
+            valid.append((line, values))
+        # only rows that will be written pay for a hash
+        hashes = get_password_hasher().hash_many(values['password'] for _, values in valid)
+        for (_, values), pwhash in zip(valid, hashes):
+            values['password'] = pwhash
+        return valid
+
+    def write(self, rows):
+        users = User.__table__
+        user_ids = dict(db.session.execute(
+            users.insert().returning(users.c.username, users.c.id),
+            [
+                {
+                    'username': values['username'],
+                    'password': values['password'],
+                    'name': values['name'],
+                    'contact': values['contact'],
+                    'user_type': 'resident',
+                }
+                for values in rows
+            ],
+        ).all())
+        db.session.execute(Resident.__table__.insert(), [
+            {'id': user_ids[values['username']], 'street_id': values['street_id'], 'unread_count': 0}
+            for values in rows
+        ])
+
+
+class StopRequestImporter(_Importer):
+    """Columns: route_id, resident (a username) or resident_id, and optionally quantity, notes and status.
+
+    The route_demand summary is updated in the same transaction; no
+    notifications are sent.
+    """
+
+    def __init__(self):
+        self.route_ids = set()
+        self.resident_ids = {}
+        self.known_resident_ids = set()
+
+    def parse(self, row):
+        values = {
+            'route_id': _number(row, 'route_id', int),
+            'resident': _text(row, 'resident', 100, required=False),
+            'resident_id': _number(row, 'resident_id', int),
+            'quantity': _number(row, 'quantity', int, default=1),
+            'notes': _text(row, 'notes', 200, required=False),
+            'status': _text(row, 'status', 50, required=False) or "requested",
+        }
+        if values['route_id'] is None:
+            raise ImportRowError("route_id is required")
+        if values['resident'] is None and values['resident_id'] is None:
+            raise ImportRowError("resident or resident_id is required")
+        if values['quantity'] < 1:
+            raise ImportRowError("quantity must be at least 1")
+        if values['status'] not in IMPORT_STOP_STATUSES:
+            raise ImportRowError(f"status must be one of {', '.join(IMPORT_STOP_STATUSES)}")
+        return values
+
+    def check(self, parsed, reject):
+        route_ids = sorted({values['route_id'] for _, values in parsed} - self.route_ids)
+        if route_ids:
+            self.route_ids.update(db.session.scalars(db.select(Route.route_id).where(Route.route_id.in_(route_ids))))
+        usernames = sorted({values['resident'] for _, values in parsed if values['resident_id'] is None} - self.resident_ids.keys())
+        if usernames:
+            self.resident_ids.update(db.session.execute(
+                db.select(Resident.username, Resident.id).where(Resident.username.in_(usernames))
+            ).all())
+        resident_ids = sorted({values['resident_id'] for _, values in parsed if values['resident_id'] is not None} - self.known_resident_ids)
+        if resident_ids:
+            self.known_resident_ids.update(db.session.scalars(db.select(Resident.id).where(Resident.id.in_(resident_ids))))
+
+        valid = []
+        for line, values in parsed:
+            if values['route_id'] not in self.route_ids:
+                reject(line, f"route {values['route_id']} not found")
+                continue
+            if values['resident_id'] is None:
+                values['resident_id'] = self.resident_ids.get(values['resident'])
+                if values['resident_id'] is None:
+                    reject(line, f"resident {values['resident']!r} not found")
+                    continue
+            elif values['resident_id'] not in self.known_resident_ids:
+                reject(line, f"resident {values['resident_id']} not found")
+                continue
+            valid.append((line, values))
+        return valid
+
+    def write(self, rows):
+        now = datetime.utcnow()
+        db.session.execute(StopRequest.__table__.insert(), [
+            {
+                'route_id': values['route_id'],
+                'resident_id': values['resident_id'],
+                'status': values['status'],
+                'quantity': values['quantity'],
+                'notes': values['notes'],
+                'created_at': now,
+            }
+            for values in rows
+        ])
+        # Core inserts skip the mapper events that keep route_demand in step
+        totals = {}
+        for values in rows:
+            key = (values['route_id'], values['status'])
+            requests, quantity = totals.get(key, (0, 0))
+            totals[key] = (requests + 1, quantity + values['quantity'])
+        connection = db.session.connection()
+        for (route_id, status), (requests, quantity) in sorted(totals.items()):
+            RouteDemand.apply(connection, route_id, status, requests, quantity)
+
+
+IMPORTERS = {
+    'streets': StreetImporter,
+    'residents': ResidentImporter,
+    'stop_requests': StopRequestImporter,
+}
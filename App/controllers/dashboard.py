@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import aliased
+
+from App.models import User, Driver, Route, Street, StopRequest
+from App.database import db
+from .demand import ACTIVE_STOP_STATUSES
+from .driver import get_driver_buffer
+
+DASHBOARD_DAYS = 7
+# bounds the payload; a wider window should be paged by the client
+DASHBOARD_MAX_DAYS = 31
+
+REQUEST_FIELDS = ('request_id', 'resident_id', 'resident_name', 'status', 'quantity', 'notes')
+
+
+def get_driver_dashboard(driver_id, start=None, end=None):
+    """A driver's routes in [start, end) with streets and stop requests, or None.
+
+    start defaults to now and end to DASHBOARD_DAYS later. On SQLite and
+    PostgreSQL the whole payload is one query: routes are outer joined to
+    the driver and each route's stop requests are aggregated into a JSON
+    array by the database, so the number of round trips doesn't grow with
+    the routes or requests. Other databases take a second query for the
+    requests.
+    """
+    start = start or datetime.utcnow()
+    end = end or start + timedelta(days=DASHBOARD_DAYS)
+    dialect = db.session.get_bind().dialect.name
+    aggregate = _json_requests(dialect)
+    routes = (
+        db.select(
+            Driver.id, Driver.name, Driver.status, Driver.location, Driver.lat, Driver.lon,
+            Route.route_id, Route.scheduled_time, Route.duration, Route.status,
+            Street.street_id, Street.name,
+        )
+        .select_from(Driver)
+        .outerjoin(Route, db.and_(
+            Route.driver_id == Driver.id,
+            Route.scheduled_time >= start,
+            Route.scheduled_time < end,
+        ))
+        .outerjoin(Street, Street.street_id == Route.street_id)
+        .where(Driver.id == driver_id)
+        .order_by(Route.scheduled_time, Route.route_id)
+    )
+    if aggregate is not None:
+        resident = aliased(User)
+        routes = (
+            routes.add_columns(aggregate(resident))
+            .outerjoin(StopRequest, StopRequest.route_id == Route.route_id)
+            .outerjoin(resident, resident.id == StopRequest.resident_id)
+            .group_by(*routes.selected_columns)
+        )
+    rows = db.session.execute(routes).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    driver = {'id': first[0], 'name': first[1], 'status': first[2], 'location': first[3], 'lat': first[4], 'lon': first[5]}
+    # updates still in this worker's write-behind buffer are newer than the row
+    driver.update(get_driver_buffer().get(driver_id) or {})
+    rows = [row for row in rows if row[6] is not None]
+    if aggregate is not None:
+        requests = {row[6]: _decode(row[12]) for row in rows}
+    else:
+        requests = _load_requests([row[6] for row in rows])
+
+    payload_routes = []
+    for row in rows:
+        route_requests = sorted(requests.get(row[6], []), key=lambda request: request['request_id'])
+        active = [request for request in route_requests if request['status'] in ACTIVE_STOP_STATUSES]
+        payload_routes.append({
+            'route_id': row[6],
+            'scheduled_time': row[7].isoformat(),
+            'duration': row[8],
+            'status': row[9],
+            'street': {'street_id': row[10], 'name': row[11]},
+            'stop_requests': route_requests,
+            'requests': len(active),
+            'quantity': sum(request['quantity'] or 0 for request in active),
+        })
+    return {
+        'driver': driver,
+        'window': {'start': start.isoformat(), 'end': end.isoformat()},
+        'routes': payload_routes,
+        'totals': {
+            'routes': len(payload_routes),
+            'requests': sum(route['requests'] for route in payload_routes),
+            'quantity': sum(route['quantity'] for route in payload_routes),
+        },
+    }
+
+
+def _json_requests(dialect):
+    # builds the aggregate of a route's stop requests, or None without JSON support
+    if dialect == 'sqlite':
+        build_object, build_array = db.func.json_object, db.func.json_group_array
+    elif dialect == 'postgresql':
+        build_object, build_array = db.func.json_build_object, db.func.json_agg
+    else:
+        return None
+
+    def aggregate(resident):
+        columns = (
+            StopRequest.request_id, StopRequest.resident_id, resident.name,
+            StopRequest.status, StopRequest.quantity, StopRequest.notes,
+        )
+        pairs = [part for name, column in zip(REQUEST_FIELDS, columns) for part in (db.literal(name), column)]
+        array = build_array(build_object(*pairs)).filter(StopRequest.request_id.is_not(None))
+        # json_agg over no rows is NULL, json_group_array gives '[]'
+        return db.func.coalesce(array, db.literal_column("'[]'")) if dialect == 'postgresql' else array
+    return aggregate
+
+
+def _decode(value):
+    # SQLite returns the array as text, psycopg parses it
+    return json.loads(value) if isinstance(value, str) else (value or [])
+
+
+def _load_requests(route_ids):
+    requests = {}
+    if not route_ids:
+        return requests
+    resident = aliased(User)
+    rows = db.session.execute(
+        db.select(
+            StopRequest.route_id, StopRequest.request_id, StopRequest.resident_id, resident.name,
+            StopRequest.status, StopRequest.quantity, StopRequest.notes,
+        )
+        .join(resident, resident.id == StopRequest.resident_id)
+        .where(StopRequest.route_id.in_(route_ids))
+    )
+    for route_id, *values in rows:
+        requests.setdefault(route_id, []).append(dict(zip(REQUEST_FIELDS, values)))
+    return requests
@@ -0,0 +1,176 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from App.models import User, Driver, Resident, Street, Route, StopRequest, RouteDemand, Notification
+from App.database import db, reset_sequences
+from App.hashing import get_password_hasher
+
+# Rows generated per unit of --scale; scale 500 gives 1M residents and
+# roughly 7M notifications.
+STREETS_PER_SCALE = 20
+RESIDENTS_PER_STREET = 100
+DRIVERS_PER_SCALE = 10
+ROUTES_PER_DRIVER_PER_DAY = 2
+DAYS = 7
+STOP_REQUEST_RATE = 0.1
+
+DATASET_PASSWORD = "bakerypass"
+# fixed, so datasets generated from the same seed are identical
+DATASET_EPOCH = datetime(2025, 1, 6, 6, 0)
+# streets are scattered in a square around this point, DATASET_SPREAD_DEGREES
+# wide at scale 1 and growing with sqrt(scale) so density stays constant
+DATASET_CENTER = (10.65, -61.50)
+DATASET_SPREAD_DEGREES = 0.05
+
+FIRST_NAMES = ["Alice", "Bob", "Chen", "Dana", "Eve", "Farah", "Gus", "Hana", "Ivan", "Jade", "Kofi", "Lena"]
+LAST_NAMES = ["Baker", "Miller", "Crumb", "Loaf", "Rye", "Wheat", "Barley", "Oats", "Dough", "Yeast"]
+STREET_KINDS = ["Street", "Avenue", "Lane", "Drive", "Close", "Road"]
+
+
+def generate_dataset(scale, seed=42, chunk_size=10000, report=print):
+    """Fill an empty database with a reproducible synthetic dataset.
+
+    Rows go in through Core executemany inserts with explicit ids, committed
+    per chunk, and the id sequences are moved past them afterwards. Every
+    user shares a few precomputed password hashes of DATASET_PASSWORD.
+    Returns {table: rows written}.
+    """
+    rng = random.Random(seed)
+    hashes = [get_password_hasher().hash(DATASET_PASSWORD) for _ in range(4)]
+    street_count = STREETS_PER_SCALE * scale
+    resident_count = street_count * RESIDENTS_PER_STREET
+    driver_count = DRIVERS_PER_SCALE * scale
+    counts = {}
+
+    def timed(table, rows):
+        start = time.perf_counter()
+        written = _insert_chunks(table, rows, chunk_size)
+        elapsed = time.perf_counter() - start
+        counts[table.name] = counts.get(table.name, 0) + written
+        report(f"   {table.name:<15} {written:>10} rows {elapsed:8.2f}s {written / max(elapsed, 1e-9):>12.0f} rows/s")
+
+    spread = DATASET_SPREAD_DEGREES * math.sqrt(scale)
+
+    def position():
+        return {
+            'lat': round(DATASET_CENTER[0] + rng.uniform(-spread, spread) / 2, 6),
+            'lon': round(DATASET_CENTER[1] + rng.uniform(-spread, spread) / 2, 6),
+        }
+
+    timed(Street.__table__, (
+        {'street_id': i, 'name': f"{rng.choice(LAST_NAMES)} {STREET_KINDS[i % len(STREET_KINDS)]} {i}", **position()}
+        for i in range(1, street_count + 1)
+    ))
+
+    driver_ids = range(1, driver_count + 1)
+    resident_ids = range(driver_count + 1, driver_count + resident_count + 1)
+    timed(User.__table__, (
+        {
+            'id': i,
+            'username': f"driver{i}" if i <= driver_count else f"resident{i}",
+            'password': hashes[i % len(hashes)],
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'contact': None,
+            'user_type': 'driver' if i <= driver_count else 'resident',
+        }
+        for i in range(1, driver_count + resident_count + 1)
+    ))
+    timed(Driver.__table__, (
+        {'id': i, 'status': rng.choice(["available", "on_route", "on_break", "offline"]), 'location': "Depot", **position()}
+        for i in driver_ids
+    ))
+    # residents are spread evenly, so street s holds a contiguous id block
+    timed(Resident.__table__, (
+        {'id': i, 'street_id': (i - driver_count - 1) // RESIDENTS_PER_STREET + 1, 'unread_count': 0}
+        for i in resident_ids
+    ))
+
+    routes = []
+    now = DATASET_EPOCH + timedelta(days=DAYS // 2)
+    for day in range(DAYS):
+        for driver_id in driver_ids:
+            for slot in range(ROUTES_PER_DRIVER_PER_DAY):
+                start = DATASET_EPOCH + timedelta(days=day, hours=3 * slot + rng.randint(0, 2))
+                status = "completed" if start < now - timedelta(hours=2) else "in_progress" if start < now else "scheduled"
+                routes.append({
+                    'route_id': len(routes) + 1,
+                    'driver_id': driver_id,
+                    'street_id': rng.randint(1, street_count),
+                    'scheduled_time': start,
+                    'status': status,
+                })
+    timed(Route.__table__, routes)
+
+    def stop_requests():
+        request_id = 0
+        per_route = max(1, int(RESIDENTS_PER_STREET * STOP_REQUEST_RATE))
+        for route in routes:
+            first = driver_count + (route['street_id'] - 1) * RESIDENTS_PER_STREET + 1
+            for resident_id in rng.sample(range(first, first + RESIDENTS_PER_STREET), per_route):
+                request_id += 1
+                yield {
+                    'request_id': request_id,
+                    'status': rng.choices(["requested", "confirmed", "cancelled"], [5, 4, 1])[0],
+                    'route_id': route['route_id'],
+                    'resident_id': resident_id,
+                    'quantity': rng.randint(1, 6),
+                    'notes': None,
+                    'created_at': route['scheduled_time'] - timedelta(hours=rng.randint(1, 48)),
+                }
+    timed(StopRequest.__table__, stop_requests())
+    # every id above came from here, so PostgreSQL's sequences still start at 1
+    reset_sequences([Street.__table__, User.__table__, Route.__table__, StopRequest.__table__])
+    db.session.commit()
+
+    # bulk inserts skip the StopRequest mapper events, so summarise in one pass
+    start = time.perf_counter()
+    written = RouteDemand.rebuild()
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    counts[RouteDemand.__tablename__] = written
+    report(f"   {RouteDemand.__tablename__:<15} {written:>10} rows {elapsed:8.2f}s {written / max(elapsed, 1e-9):>12.0f} rows/s")
+
+    # schedule notifications are set-based: one INSERT ... SELECT per chunk of
+    # routes, and the counters are rebuilt once below instead of bumped per route
+    start = time.perf_counter()
+    written = Notification.fan_out_to_streets((
+        (
+            route['route_id'], route['street_id'],
+            f"Driver scheduled to visit at {route['scheduled_time']:%a %H:%M}",
+            route['scheduled_time'] - timedelta(days=1),
+        )
+        for route in routes
+    ), bump_unread=False)
+    notifications = Notification.__table__
+    completed = [route['route_id'] for route in routes if route['status'] == "completed"]
+    for i in range(0, len(completed), 500):
+        db.session.execute(
+            notifications.update()
+            .where(notifications.c.route_id.in_(completed[i:i + 500]))
+            .values(is_read=True)
+        )
+    Notification.rebuild_unread_counts()
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    counts[notifications.name] = written
+    report(f"   {notifications.name:<15} {written:>10} rows {elapsed:8.2f}s {written / max(elapsed, 1e-9):>12.0f} rows/s")
+    return counts
+
+
+def _insert_chunks(table, rows, chunk_size):
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        written += len(chunk)
+    return written
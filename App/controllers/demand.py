@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+from App.models import Route, Street, StopRequest, RouteDemand
+from App.database import db
+
+# statuses a driver still has to load bread for
+ACTIVE_STOP_STATUSES = ("requested", "confirmed")
+
+
+def _totals(rows):
+    # rows decremented to zero stay behind until the next rebuild
+    by_status = {
+        status: {'requests': requests, 'quantity': quantity}
+        for status, requests, quantity in rows if requests
+    }
+    active = [by_status[status] for status in ACTIVE_STOP_STATUSES if status in by_status]
+    return {
+        'by_status': by_status,
+        'requests': sum(totals['requests'] for totals in active),
+        'quantity': sum(totals['quantity'] for totals in active),
+    }
+
+
+def get_route_demand(route_id):
+    """Stop request totals for one route, read from route_demand."""
+    rows = db.session.execute(
+        db.select(RouteDemand.status, RouteDemand.requests, RouteDemand.quantity)
+        .where(RouteDemand.route_id == route_id)
+    ).all()
+    return _totals(rows)
+
+
+def get_loading_sheet(route_id):
+    """What a driver needs to load for a route, or None if it doesn't exist.
+
+    Two primary key lookups regardless of how many stop requests the route
+    has; the individual requests are not read.
+    """
+    route = db.session.get(Route, route_id)
+    if not route:
+        return None
+    sheet = {
+        'route_id': route.route_id,
+        'driver_id': route.driver_id,
+        'driver_name': route.driver.name,
+        'street_id': route.street_id,
+        'street_name': route.street.name,
+        'scheduled_time': route.scheduled_time.isoformat(),
+        'status': route.status,
+    }
+    sheet.update(get_route_demand(route_id))
+    return sheet
+
+
+def get_demand_by_route(start, end, driver_id=None):
+    """{route_id: totals} for routes scheduled in [start, end), optionally one driver's.
+
+    One query: the routes are found through ix_routes_driver_scheduled (or
+    a scan of scheduled_time without a driver) and their summary rows joined on.
+    """
+    query = (
+        db.select(RouteDemand.route_id, RouteDemand.status, RouteDemand.requests, RouteDemand.quantity)
+        .join(Route, Route.route_id == RouteDemand.route_id)
+        .where(Route.scheduled_time >= start, Route.scheduled_time < end)
+    )
+    if driver_id is not None:
+        query = query.where(Route.driver_id == driver_id)
+    rows = {}
+    for route_id, status, requests, quantity in db.session.execute(query):
+        rows.setdefault(route_id, []).append((status, requests, quantity))
+    return {route_id: _totals(route_rows) for route_id, route_rows in rows.items()}
+
+
+def get_daily_demand(day, driver_id=None):
+    """Loaves to bake for a day: active requests and quantity per street."""
+    start = datetime(day.year, day.month, day.day)
+    query = (
+        db.select(Street.street_id, Street.name, db.func.sum(RouteDemand.requests), db.func.sum(RouteDemand.quantity))
+        .join(Route, Route.route_id == RouteDemand.route_id)
+        .join(Street, Street.street_id == Route.street_id)
+        .where(
+            Route.scheduled_time >= start,
+            Route.scheduled_time < start + timedelta(days=1),
+            RouteDemand.status.in_(ACTIVE_STOP_STATUSES),
+        )
+        .group_by(Street.street_id, Street.name)
+        .order_by(Street.name)
+    )
+    if driver_id is not None:
+        query = query.where(Route.driver_id == driver_id)
+    return [
+        {'street_id': street_id, 'street_name': name, 'requests': requests, 'quantity': quantity}
+        for street_id, name, requests, quantity in db.session.execute(query)
+    ]
+
+
+def _set_stop_status(request_id, status):
+    stop_request = db.session.get(StopRequest, request_id)
+    if not stop_request:
+        return None
+    stop_request.status = status
+    db.session.commit()
+    return stop_request
+
+
+def confirm_stop_request(request_id):
+    return _set_stop_status(request_id, "confirmed")
+
+
+def cancel_stop_request(request_id):
+    return _set_stop_status(request_id, "cancelled")
+
+
+def rebuild_route_demand():
+    """Recompute route_demand from stop_requests; returns rows written."""
+    written = RouteDemand.rebuild()
+    db.session.commit()
+    return written
+
+
+def verify_route_demand(repair=False):
+    """Mismatches between route_demand and stop_requests, rebuilt first if repair is set."""
+    mismatches = RouteDemand.verify()
+    if mismatches and repair:
+        rebuild_route_demand()
+    return mismatches
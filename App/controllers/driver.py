@@ -0,0 +1,513 @@
+import atexit
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from App.models import Driver, Route, Street
+from App.database import db
+from App.geo import valid_position
+from App.metrics import register_metrics
+from .geofence import check_geofences
+
+# free-text columns drivers report into, and their lengths
+DRIVER_TEXT_LENGTHS = {
+    'status': Driver.__table__.c.status.type.length,
+    'location': Driver.__table__.c.location.type.length,
+}
+
+
+def valid_driver_text(value, limit):
+    # None clears the column
+    return value is None or (isinstance(value, str) and len(value) <= limit)
+
+
+class DriverStateBuffer:
+    """Write-behind store for high-frequency driver status/location updates.
+
+    Updates are coalesced per driver so only the latest value of each field
+    survives, and are written to the drivers table in one batched UPDATE once
+    ``max_pending`` drivers are dirty or ``flush_interval`` seconds have
+    passed. Reads of the current state are served from memory. The buffer is
+    per process, so each gunicorn worker flushes its own updates; state it
+    has read or been sent goes stale after ``state_ttl`` seconds (the driver
+    may be reporting to another worker) unless it is still waiting to be
+    written.
+    """
+
+    def __init__(self, max_pending=500, flush_interval=2.0, state_ttl=10.0, clock=time.monotonic):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}
+        # batches taken by flush() and not committed yet
+        self._in_flight = []
+        self._current = {}
+        self._seen = {}
+        self._last_flush = clock()
+        self.updates_received = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def record(self, driver_id, **fields):
+        """Buffer an update; returns True when a flush is now due.
+
+        Raises ValueError, recording nothing, when a text field is not None
+        or a string that fits its column.
+        """
+        for name, value in fields.items():
+            limit = DRIVER_TEXT_LENGTHS.get(name)
+            if limit is not None and not valid_driver_text(value, limit):
+                raise ValueError(f"{name} must be a string of at most {limit} characters")
+        with self._lock:
+            self.updates_received += 1
+            self._pending.setdefault(driver_id, {}).update(fields)
+            self._current.setdefault(driver_id, {}).update(fields)
+            self._seen[driver_id] = self._clock()
+            return self._flush_due()
+
+    def get(self, driver_id):
+        """The driver's state held in memory, or None when there is none or it is stale."""
+        with self._lock:
+            state = self._current.get(driver_id)
+            if state is None:
+                return None
+            if not self._unflushed(driver_id) and self._clock() - self._seen[driver_id] > self.state_ttl:
+                return None
+            return dict(state)
+
+    def remember(self, driver_id, **fields):
+        """Replace the state with fields loaded from the database without marking anything dirty.
+
+        Updates not written yet are newer than the row and are kept.
+        """
+        with self._lock:
+            self._current[driver_id] = {**fields, **self._unflushed(driver_id)}
+            self._seen[driver_id] = self._clock()
+
+    def snapshot(self):
+        """Copy of the updates this worker holds that are not written yet, per driver."""
+        with self._lock:
+            drivers = set(self._pending).union(*self._in_flight)
+            return {driver_id: self._unflushed(driver_id) for driver_id in drivers}
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush_if_due(self):
+        with self._lock:
+            due = self._flush_due()
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Write every dirty driver in batched UPDATEs; returns rows written.
+
+        If the batch fails it is written again one driver at a time, and
+        drivers whose update still fails (a value the database refuses) are
+        logged and dropped so they can't hold up everyone else's. When the
+        database itself is unavailable (OperationalError) the updates are
+        kept for the next flush and the error is raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = self._clock()
+            if not pending:
+                return 0
+            self._in_flight.append(pending)
+        try:
+            try:
+                written = self._write(pending)
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                self._requeue(pending)
+                raise
+            except Exception:
+                db.session.rollback()
+                written = self._write_each(pending)
+        finally:
+            with self._lock:
+                self._in_flight.remove(pending)
+        with self._lock:
+            self.rows_written += written
+            self.flushes += 1
+        return written
+
+    def _write_each(self, pending):
+        written = 0
+        items = list(pending.items())
+        for n, (driver_id, fields) in enumerate(items):
+            try:
+                written += self._write({driver_id: fields})
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                self._requeue(dict(items[n:]))
+                raise
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("dropped buffered update for driver %s: %r", driver_id, fields)
+                with self._lock:
+                    self.dropped += 1
+        return written
+
+    def _requeue(self, pending):
+        # put the updates back unless newer ones arrived in the meantime
+        with self._lock:
+            for driver_id, fields in pending.items():
+                self._pending[driver_id] = {**fields, **self._pending.get(driver_id, {})}
+
+    def _unflushed(self, driver_id):
+        # caller holds the lock; older batches first so newer values win
+        fields = {}
+        for batch in self._in_flight:
+            fields.update(batch.get(driver_id, {}))
+        fields.update(self._pending.get(driver_id, {}))
+        return fields
+
+    def _write(self, pending):
+        # one executemany UPDATE per distinct set of changed columns
+        drivers = Driver.__table__
+        batches = {}
+        for driver_id, fields in pending.items():
+            batches.setdefault(tuple(sorted(fields)), []).append({'driver_id': driver_id, **fields})
+        written = 0
+        for columns, rows in batches.items():
+            stmt = (
+                drivers.update()
+                .where(drivers.c.id == db.bindparam('driver_id'))
+                .values({name: db.bindparam(name) for name in columns})
+            )
+            result = db.session.execute(stmt, rows)
+            written += result.rowcount if result.rowcount >= 0 else len(rows)
+        return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'updates_received': self.updates_received,
+                'rows_written': self.rows_written,
+                'flushes': self.flushes,
+                'dropped': self.dropped,
+                'pending': len(self._pending),
+            }
+
+    def _flush_due(self):
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_pending
+            or self._clock() - self._last_flush >= self.flush_interval
+        )
+
+
+def setup_driver_buffer(app):
+    buffer = DriverStateBuffer(
+        max_pending=app.config.get('DRIVER_BUFFER_MAX_PENDING', 500),
+        flush_interval=app.config.get('DRIVER_BUFFER_FLUSH_SECONDS', 2.0),
+        state_ttl=app.config.get('DRIVER_STATE_TTL_SECONDS', 10.0),
+    )
+    app.extensions['driver_buffer'] = buffer
+    register_metrics(app, 'driver_buffer', buffer.stats)
+
+    # updates still buffered when the process exits are written out
+    def flush_on_exit():
+        with app.app_context():
+            try:
+                buffer.flush()
+            except Exception:
+                app.logger.exception("could not flush buffered driver updates at exit")
+    atexit.register(flush_on_exit)
+
+    if app.config.get('DRIVER_BUFFER_BACKGROUND_FLUSH', not app.testing):
+        _start_flusher(app, buffer)
+    return buffer
+
+
+def _start_flusher(app, buffer):
+    # Started per process on first use so forked workers each get their own.
+    started_in = {}
+
+    def run():
+        while True:
+            time.sleep(buffer.flush_interval)
+            with app.app_context():
+                try:
+                    buffer.flush_if_due()
+                except Exception:
+                    app.logger.exception("driver buffer flush failed")
+
+    def ensure_started():
+        if started_in.get('pid') != os.getpid():
+            started_in['pid'] = os.getpid()
+            threading.Thread(target=run, name='driver-buffer-flush', daemon=True).start()
+
+    app.before_request(ensure_started)
+
+
+def get_driver_buffer():
+    return current_app.extensions['driver_buffer']
+
+
+def report_driver_location(driver_id, location):
+    _record(driver_id, location=location)
+
+
+def report_driver_status(driver_id, status):
+    _record(driver_id, status=status)
+
+
+def report_driver_position(driver_id, lat, lon):
+    if not valid_position(lat, lon):
+        raise ValueError(f"invalid position ({lat}, {lon})")
+    get_driver_grid().update(driver_id, lat, lon)
+    _record(driver_id, lat=lat, lon=lon)
+    check_geofences(driver_id, lat, lon)
+
+
+def _record(driver_id, **fields):
+    buffer = get_driver_buffer()
+    if buffer.record(driver_id, **fields):
+        buffer.flush()
+    publish_driver_state(driver_id)
+
+
+STATE_FIELDS = ('status', 'location', 'lat', 'lon')
+
+
+def get_driver_state(driver_id):
+    return get_driver_states([driver_id]).get(driver_id)
+
+
+def get_driver_states(driver_ids):
+    """{driver_id: state} from memory, loading unknown drivers in one query."""
+    buffer = get_driver_buffer()
+    states = {driver_id: buffer.get(driver_id) for driver_id in driver_ids}
+    missing = [
+        driver_id for driver_id, state in states.items()
+        if state is None or any(name not in state for name in STATE_FIELDS)
+    ]
+    if missing:
+        drivers = Driver.__table__
+        rows = db.session.execute(
+            db.select(drivers.c.id, *(drivers.c[name] for name in STATE_FIELDS))
+            .where(drivers.c.id.in_(missing))
+        )
+        for driver_id, *values in rows:
+            buffer.remember(driver_id, **dict(zip(STATE_FIELDS, values)))
+            states[driver_id] = buffer.get(driver_id)
+    return {
+        driver_id: {'id': driver_id, **{name: state[name] for name in STATE_FIELDS}}
+        for driver_id, state in states.items()
+        if state is not None and all(name in state for name in STATE_FIELDS)
+    }
+
+
+def get_driver_grid():
+    """This worker's grid of driver positions, reloaded when it is stale."""
+    grid = current_app.extensions['driver_grid']
+    if grid.refresh_due():
+        drivers = Driver.__table__
+        rows = db.session.execute(
+            db.select(drivers.c.id, drivers.c.lat, drivers.c.lon)
+            .where(drivers.c.lat.is_not(None), drivers.c.lon.is_not(None))
+        ).all()
+        positions = {driver_id: (lat, lon) for driver_id, lat, lon in rows}
+        # positions reported to this worker but not flushed yet are newer
+        for driver_id, state in get_driver_buffer().snapshot().items():
+            if state.get('lat') is not None and state.get('lon') is not None:
+                positions[driver_id] = (state['lat'], state['lon'])
+        grid.replace_all((driver_id, lat, lon) for driver_id, (lat, lon) in positions.items())
+        grid.mark_loaded()
+    return grid
+
+
+def find_nearest_drivers(lat, lon, k=5, radius_km=None):
+    """States of the drivers closest to (lat, lon), nearest first, with distance_km.
+
+    With radius_km every driver within it is returned (capped at k), otherwise
+    the k nearest wherever they are.
+    """
+    grid = get_driver_grid()
+    if radius_km is not None:
+        found = grid.within(lat, lon, radius_km)[:k]
+    else:
+        found = grid.nearest(lat, lon, k)
+    states = get_driver_states([driver_id for _, driver_id in found])
+    return [
+        {**states[driver_id], 'distance_km': round(distance, 3)}
+        for distance, driver_id in found
+        if driver_id in states
+    ]
+
+
+def find_drivers_near_street(street_id, k=5, radius_km=None):
+    """find_nearest_drivers from a street's point; None if it has no coordinates."""
+    point = db.session.execute(
+        db.select(Street.lat, Street.lon).where(Street.street_id == street_id)
+    ).first()
+    if point is None or not valid_position(*point):
+        return None
+    return find_nearest_drivers(point.lat, point.lon, k, radius_km)
+
+
+def flush_driver_updates():
+    return get_driver_buffer().flush()
+
+
+ACTIVE_ROUTE_STATUSES = ("scheduled", "in_progress")
+
+
+def get_event_hub():
+    return current_app.extensions['event_hub']
+
+
+def publish_driver_state(driver_id):
+    """Push a driver's current state to listeners of its active routes and streets."""
+    hub = get_event_hub()
+    if not hub.has_subscribers():
+        return 0
+    routes = db.session.execute(
+        db.select(Route.route_id, Route.street_id)
+        .where(Route.driver_id == driver_id, Route.status.in_(ACTIVE_ROUTE_STATUSES))
+    ).all()
+    if not routes:
+        return 0
+    topics = [f"route:{route_id}" for route_id, _ in routes]
+    topics += [f"street:{street_id}" for _, street_id in routes]
+    state = get_driver_state(driver_id)
+    get_driver_relay().note(driver_id, state)
+    return hub.publish(topics, driver_id, state)
+
+
+class DriverStateRelay:
+    """Carries driver updates handled by other workers to this worker's listeners.
+
+    The event hub is per process, so a report sent to one gunicorn worker is
+    only pushed to the SSE listeners of that worker. While this worker has
+    listeners, poll() reads the state of the drivers on their streets' and
+    routes' active routes in one query and publishes the drivers whose state
+    changed since it was last published here. An update made elsewhere
+    arrives once that worker has flushed it (DRIVER_BUFFER_FLUSH_SECONDS)
+    and the next poll runs (``interval``).
+    """
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._seen = {}
+        self.polls = 0
+        self.relayed = 0
+
+    def note(self, driver_id, state):
+        """Record a state this worker published itself, so it isn't relayed again."""
+        with self._lock:
+            self._seen[driver_id] = state
+
+    def poll(self):
+        """Publish changed states of drivers listened for here; returns how many."""
+        hub = get_event_hub()
+        streets, routes = [], []
+        for topic in hub.topics():
+            kind, _, topic_id = topic.partition(':')
+            (streets if kind == 'street' else routes).append(int(topic_id))
+        if not streets and not routes:
+            return 0
+        drivers = Driver.__table__
+        rows = db.session.execute(
+            db.select(Route.route_id, Route.street_id, drivers.c.id, *(drivers.c[name] for name in STATE_FIELDS))
+            .join_from(Route, drivers, drivers.c.id == Route.driver_id)
+            .where(
+                Route.status.in_(ACTIVE_ROUTE_STATUSES),
+                db.or_(Route.street_id.in_(streets), Route.route_id.in_(routes)),
+            )
+        ).all()
+        topics, states = {}, {}
+        for route_id, street_id, driver_id, *values in rows:
+            topics.setdefault(driver_id, set()).update((f"route:{route_id}", f"street:{street_id}"))
+            states[driver_id] = {'id': driver_id, **dict(zip(STATE_FIELDS, values))}
+        buffer = get_driver_buffer()
+        # this worker's unflushed updates are newer than the table
+        pending = buffer.snapshot()
+        changed = []
+        with self._lock:
+            self.polls += 1
+            for driver_id, state in states.items():
+                if driver_id in pending or self._seen.get(driver_id) == state:
+                    continue
+                changed.append(driver_id)
+                self._seen[driver_id] = state
+            for driver_id in self._seen.keys() - states.keys():
+                del self._seen[driver_id]
+            self.relayed += len(changed)
+        for driver_id in changed:
+            state = states[driver_id]
+            buffer.remember(driver_id, **{name: state[name] for name in STATE_FIELDS})
+            hub.publish(sorted(topics[driver_id]), driver_id, state)
+        return len(changed)
+
+    def stats(self):
+        with self._lock:
+            return {'polls': self.polls, 'relayed': self.relayed, 'drivers': len(self._seen)}
+
+
+def setup_driver_relay(app):
+    relay = DriverStateRelay(interval=app.config.get('SSE_RELAY_SECONDS', 2.0))
+    app.extensions['driver_relay'] = relay
+    register_metrics(app, 'driver_relay', relay.stats)
+    if app.config.get('SSE_RELAY_BACKGROUND', not app.testing):
+        _start_relay(app, relay)
+    return relay
+
+
+def _start_relay(app, relay):
+    # like the buffer's flusher: one thread per process, started on first use
+    started_in = {}
+
+    def run():
+        while True:
+            time.sleep(relay.interval)
+            with app.app_context():
+                try:
+                    relay.poll()
+                except Exception:
+                    app.logger.exception("driver state relay poll failed")
+
+    def ensure_started():
+        if started_in.get('pid') != os.getpid():
+            started_in['pid'] = os.getpid()
+            threading.Thread(target=run, name='driver-state-relay', daemon=True).start()
+
+    app.before_request(ensure_started)
+
+
+def get_driver_relay():
+    return current_app.extensions['driver_relay']
+
+
+def subscribe_driver_updates(street_id=None, route_id=None):
+    """Subscribe to driver updates for a street or route.
+
+    Returns ``(subscription, snapshot)`` where snapshot holds the current
+    state of the drivers already active there, or ``(None, [])`` when the
+    worker has no room for another listener.
+    """
+    sub = get_event_hub().subscribe(f"street:{street_id}" if street_id is not None else f"route:{route_id}")
+    if sub is None:
+        return None, []
+    query = db.select(Route.driver_id).where(Route.status.in_(ACTIVE_ROUTE_STATUSES)).distinct()
+    if street_id is not None:
+        query = query.where(Route.street_id == street_id)
+    else:
+        query = query.where(Route.route_id == route_id)
+    snapshot = list(get_driver_states(db.session.scalars(query).all()).values())
+    relay = get_driver_relay()
+    for state in snapshot:
+        relay.note(state['id'], state)
+    # the caller is about to idle on the stream; don't hold a pooled connection
+    db.session.close()
+    return sub, snapshot
@@ -0,0 +1,168 @@
+import threading
+import time
+
+from flask import current_app
+
+from App.models import Driver, Route, Street, RouteAlert, Job, NOTIFY_STREET_JOB
+from App.database import db, upsert_insert
+from App.geo import haversine_km
+from App.metrics import register_metrics
+
+
+class Fence:
+    """The circles around one in-progress route's street."""
+
+    __slots__ = ('route_id', 'street_id', 'street_name', 'driver_name', 'lat', 'lon', 'fired')
+
+    def __init__(self, route_id, street_id, street_name, driver_name, lat, lon, fired=()):
+        self.route_id = route_id
+        self.street_id = street_id
+        self.street_name = street_name
+        self.driver_name = driver_name
+        self.lat = lat
+        self.lon = lon
+        self.fired = set(fired)
+
+
+class GeofenceEngine:
+    """Turns driver positions into "N minutes away" alerts.
+
+    Fences are indexed by driver, so a position update is only measured
+    against the streets of that driver's in-progress routes. Thresholds are
+    minutes at ``speed_kmh``; entering several at once (a sparse update)
+    fires only the tightest. The index is rebuilt from the routes table
+    every ``refresh_interval`` seconds so new and finished routes are
+    picked up; which alerts have fired is kept in route_alerts.
+    """
+
+    def __init__(self, thresholds=(10, 5, 2), speed_kmh=20.0, refresh_interval=15.0, clock=time.monotonic):
+        self.thresholds = sorted(thresholds, reverse=True)
+        self.speed_kmh = speed_kmh
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fences = {}
+        self.loaded_at = None
+        self.checks = 0
+        self.alerts_sent = 0
+        self.duplicates = 0
+
+    def radius_km(self, minutes):
+        return self.speed_kmh * minutes / 60
+
+    def refresh_due(self):
+        return self.loaded_at is None or self._clock() - self.loaded_at >= self.refresh_interval
+
+    def load(self, fences_by_driver):
+        with self._lock:
+            self._fences = fences_by_driver
+            self.loaded_at = self._clock()
+
+    def crossed(self, driver_id, lat, lon):
+        """[(fence, thresholds)] newly entered at this position, tightest first.
+
+        Thresholds returned are marked fired in memory; the caller records
+        them and notifies for the first one.
+        """
+        entered = []
+        with self._lock:
+            self.checks += 1
+            for fence in self._fences.get(driver_id, ()):
+                distance = haversine_km(lat, lon, fence.lat, fence.lon)
+                inside = [t for t in self.thresholds if t not in fence.fired and distance <= self.radius_km(t)]
+                if inside:
+                    fence.fired.update(inside)
+                    entered.append((fence, sorted(inside)))
+        return entered
+
+    def stats(self):
+        with self._lock:
+            return {
+                'fences': sum(len(fences) for fences in self._fences.values()),
+                'checks': self.checks,
+                'alerts_sent': self.alerts_sent,
+                'duplicates': self.duplicates,
+            }
+
+
+def setup_geofences(app):
+    engine = GeofenceEngine(
+        thresholds=app.config.get('GEOFENCE_THRESHOLDS_MINUTES', (10, 5, 2)),
+        speed_kmh=app.config.get('GEOFENCE_SPEED_KMH', 20.0),
+        refresh_interval=app.config.get('GEOFENCE_REFRESH_SECONDS', 15.0),
+    )
+    app.extensions['geofences'] = engine
+    register_metrics(app, 'geofences', engine.stats)
+    return engine
+
+
+def get_geofence_engine():
+    """This worker's geofence index, reloaded when it is stale."""
+    engine = current_app.extensions['geofences']
+    if engine.refresh_due():
+        engine.load(_load_fences())
+    return engine
+
+
+def _load_fences():
+    # one query for the fences, one for the alerts they have already fired
+    rows = db.session.execute(
+        db.select(Route.route_id, Route.driver_id, Route.street_id, Street.name, Street.lat, Street.lon, Driver.name)
+        .join(Street, Street.street_id == Route.street_id)
+        .join(Driver, Driver.id == Route.driver_id)
+        .where(Route.status == "in_progress", Street.lat.is_not(None), Street.lon.is_not(None))
+    ).all()
+    fired = {}
+    if rows:
+        alerts = db.session.execute(
+            db.select(RouteAlert.route_id, RouteAlert.threshold_minutes)
+            .where(RouteAlert.route_id.in_([row[0] for row in rows]))
+        )
+        for route_id, threshold in alerts:
+            fired.setdefault(route_id, set()).add(threshold)
+    fences = {}
+    for route_id, driver_id, street_id, street_name, lat, lon, driver_name in rows:
+        fences.setdefault(driver_id, []).append(
+            Fence(route_id, street_id, street_name, driver_name, lat, lon, fired.get(route_id, ()))
+        )
+    return fences
+
+
+def check_geofences(driver_id, lat, lon):
+    """Queue the alerts a driver's new position triggers; returns how many."""
+    engine = get_geofence_engine()
+    entered = engine.crossed(driver_id, lat, lon)
+    if not entered:
+        return 0
+    sent = 0
+    for fence, thresholds in entered:
+        # only the first worker to record the tightest threshold notifies
+        if not _record_alerts(fence.route_id, thresholds):
+            engine.duplicates += 1
+            continue
+        Job.enqueue(NOTIFY_STREET_JOB, {
+            'route_id': fence.route_id,
+            'street_id': fence.street_id,
+            'message': f"Driver {fence.driver_name} is {thresholds[0]} minutes away from {fence.street_name}!",
+        })
+        sent += 1
+    engine.alerts_sent += sent
+    db.session.commit()
+    return sent
+
+
+def _record_alerts(route_id, thresholds):
+    """Insert route_alerts rows, skipping existing ones; True if thresholds[0] was new."""
+    table = RouteAlert.__table__
+    first = True
+    for i, threshold in enumerate(thresholds):
+        row = {'route_id': route_id, 'threshold_minutes': threshold}
+        insert = upsert_insert(table)
+        if insert is not None:
+            inserted = db.session.execute(insert.values(row).on_conflict_do_nothing()).rowcount
+        else:
+            exists = db.session.execute(db.select(table.c.route_id).filter_by(**row)).first()
+            inserted = 0 if exists else db.session.execute(table.insert().values(row)).rowcount
+        if i == 0:
+            first = bool(inserted)
+    return first
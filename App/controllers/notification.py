@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from App.models import Notification, Resident, Route, NOTIFY_STREET_JOB, NOTIFY_RESIDENT_JOB
+from App.database import db
+from App.jobs import job_handler
+
+INBOX_PAGE_MAX = 100
+
+
+def encode_inbox_cursor(notification):
+    return f"{notification.timestamp.isoformat()}_{notification.notification_id}"
+
+
+def decode_inbox_cursor(cursor):
+    """Parse a cursor from encode_inbox_cursor; raises ValueError if malformed."""
+    timestamp, _, notification_id = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp), int(notification_id)
+
+
+def get_inbox(resident_id, cursor=None, limit=20, unread_only=False):
+    """Newest-first page of a resident's notifications.
+
+    Returns (notifications, next_cursor). Each page is a range read on the
+    (resident_id, timestamp, notification_id) index, so its cost does not
+    grow with the resident's history.
+    """
+    limit = max(1, min(limit, INBOX_PAGE_MAX))
+    query = (
+        db.select(Notification)
+        .where(Notification.resident_id == resident_id)
+        .order_by(Notification.timestamp.desc(), Notification.notification_id.desc())
+        .limit(limit + 1)
+    )
+    if unread_only:
+        query = query.where(Notification.is_read == db.false())
+    if cursor:
+        timestamp, notification_id = decode_inbox_cursor(cursor)
+        query = query.where(
+            db.tuple_(Notification.timestamp, Notification.notification_id) < (timestamp, notification_id)
+        )
+    notifications = db.session.scalars(query).all()
+    next_cursor = encode_inbox_cursor(notifications[limit - 1]) if len(notifications) > limit else None
+    return notifications[:limit], next_cursor
+
+
+def get_unread_count(resident_id):
+    residents = Resident.__table__
+    return db.session.scalar(db.select(residents.c.unread_count).where(residents.c.id == resident_id))
+
+
+def mark_notification_read(resident_id, notification_id):
+    updated = Notification.mark_read(resident_id, notification_id)
+    db.session.commit()
+    return updated
+
+
+def mark_all_notifications_read(resident_id):
+    updated = Notification.mark_all_read(resident_id)
+    db.session.commit()
+    return updated
+
+
+def _existing_routes(payloads):
+    # a route may be deleted between enqueue and delivery
+    route_ids = {payload['route_id'] for payload in payloads}
+    return set(db.session.scalars(db.select(Route.route_id).where(Route.route_id.in_(route_ids))))
+
+
+@job_handler(NOTIFY_STREET_JOB, batch_size=200)
+def deliver_street_notifications(payloads):
+    """Payloads: {route_id, street_id, message}; one set-based fan-out per batch."""
+    routes = _existing_routes(payloads)
+    Notification.fan_out_to_streets(
+        (payload['route_id'], payload['street_id'], payload['message'])
+        for payload in payloads
+        if payload['route_id'] in routes
+    )
+
+
+@job_handler(NOTIFY_RESIDENT_JOB, batch_size=200)
+def deliver_resident_notifications(payloads):
+    """Payloads: {resident_id, route_id, message}."""
+    routes = _existing_routes(payloads)
+    for payload in payloads:
+        if payload['route_id'] in routes:
+            Notification.notify(payload['resident_id'], payload['route_id'], payload['message'])
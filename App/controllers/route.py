@@ -0,0 +1,217 @@
+from bisect import bisect_right
+from datetime import datetime, timezone, timedelta
+
+from App.models import Driver, Street, Route, Job, DEFAULT_ROUTE_MINUTES, NOTIFY_STREET_JOB
+from App.database import db
+
+# longest booking accepted; bounds how far back existing routes are loaded
+MAX_ROUTE_MINUTES = 24 * 60
+# entries accepted in one POST /api/routes/batch
+ROUTE_BATCH_MAX = 1000
+
+
+def schedule_route(driver_id, street_id, scheduled_time=None, notify=True):
+    driver = db.session.get(Driver, driver_id)
+    street = db.session.get(Street, street_id)
+    if not driver or not street:
+        return None
+    scheduled_time = scheduled_time or datetime.now(timezone.utc)
+    return driver.schedule_drive(street, scheduled_time, notify=notify)
+
+
+def get_route_json(route_id):
+    route = db.session.get(Route, route_id)
+    return route.get_json() if route else None
+
+
+class DriverSchedule:
+    """One driver's busy time as sorted, non-overlapping blocks.
+
+    Each block is [start, end, labels]; labels name the routes it covers.
+    Blocks are disjoint, so a candidate can only clash with the block that
+    starts at or before it and the one after, both found by bisect.
+    Intervals are half-open: a route may start when the previous one ends.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._blocks = []
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def conflict(self, start, end):
+        """Return the labels of the booking overlapping [start, end), or None."""
+        i = bisect_right(self._starts, start)
+        if i and self._blocks[i - 1][1] > start:
+            return self._blocks[i - 1][2]
+        if i < len(self._blocks) and self._blocks[i][0] < end:
+            return self._blocks[i][2]
+        return None
+
+    def add(self, start, end, label):
+        """Book [start, end), merging with any blocks it overlaps."""
+        i = bisect_right(self._starts, start)
+        lo = i - 1 if i and self._blocks[i - 1][1] > start else i
+        hi = i
+        while hi < len(self._blocks) and self._blocks[hi][0] < end:
+            hi += 1
+        merged = self._blocks[lo:hi]
+        block = [
+            min([start] + [b[0] for b in merged]),
+            max([end] + [b[1] for b in merged]),
+            [label for b in merged for label in b[2]] + [label],
+        ]
+        self._blocks[lo:hi] = [block]
+        self._starts[lo:hi] = [block[0]]
+
+
+def _naive_utc(value):
+    # scheduled_time is a naive column holding UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_route_entry(row):
+    """Build a schedule_routes entry from a CSV row or a JSON object.
+
+    driver_id and street_id are integers (or their strings), scheduled_time
+    an ISO 8601 string and duration optional minutes. Raises ValueError
+    naming the first bad field.
+    """
+    entry = {}
+    for name in ('driver_id', 'street_id', 'duration'):
+        value = row.get(name)
+        if value is None or value == '':
+            if name != 'duration':
+                raise ValueError(f"{name} is required")
+            entry[name] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"{name} must be an integer")
+        try:
+            entry[name] = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer") from None
+    value = row.get('scheduled_time')
+    if not value:
+        raise ValueError("scheduled_time is required")
+    try:
+        entry['scheduled_time'] = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("scheduled_time must be an ISO 8601 date and time") from None
+    return entry
+
+
+def _load_schedules(driver_ids, window_start, window_end):
+    """Build a DriverSchedule per driver from existing routes in one query."""
+    schedules = {driver_id: DriverSchedule() for driver_id in driver_ids}
+    rows = db.session.execute(
+        db.select(Route.driver_id, Route.route_id, Route.scheduled_time, Route.duration)
+        .where(
+            Route.driver_id.in_(sorted(driver_ids)),
+            Route.scheduled_time >= window_start - timedelta(minutes=MAX_ROUTE_MINUTES),
+            Route.scheduled_time < window_end,
+        )
+        .order_by(Route.driver_id, Route.scheduled_time)
+    )
+    for driver_id, route_id, start, duration in rows:
+        start = _naive_utc(start)
+        end = start + timedelta(minutes=duration or DEFAULT_ROUTE_MINUTES)
+        schedules[driver_id].add(start, end, f"route {route_id}")
+    return schedules
+
+
+def schedule_routes(entries, notify=True, dry_run=False):
+    """Schedule many routes at once, refusing double-bookings.
+
+    entries are dicts with driver_id, street_id, scheduled_time and an
+    optional duration in minutes. Existing routes of every driver involved
+    are read in one query into per-driver interval indexes; each entry is
+    checked against those and against the entries accepted before it. The
+    accepted routes are written with a single bulk INSERT and committed
+    together.
+
+    Returns (accepted, rejected): accepted entries gain a route_id (None on
+    a dry run), rejected ones carry an error string.
+    """
+    entries = [dict(entry) for entry in entries]
+    if not entries:
+        return [], []
+    driver_names = dict(db.session.execute(
+        db.select(Driver.id, Driver.name).where(Driver.id.in_(sorted({e['driver_id'] for e in entries})))
+    ).all())
+    street_names = dict(db.session.execute(
+        db.select(Street.street_id, Street.name).where(Street.street_id.in_(sorted({e['street_id'] for e in entries})))
+    ).all())
+
+    accepted, rejected, candidates = [], [], []
+    for n, entry in enumerate(entries, 1):
+        entry['scheduled_time'] = _naive_utc(entry['scheduled_time'])
+        if entry.get('duration') is None:
+            entry['duration'] = DEFAULT_ROUTE_MINUTES
+        if entry['driver_id'] not in driver_names:
+            entry['error'] = f"driver {entry['driver_id']} not found"
+        elif entry['street_id'] not in street_names:
+            entry['error'] = f"street {entry['street_id']} not found"
+        elif not 0 < entry['duration'] <= MAX_ROUTE_MINUTES:
+            entry['error'] = f"duration must be between 1 and {MAX_ROUTE_MINUTES} minutes"
+        else:
+            candidates.append((n, entry))
+            continue
+        rejected.append(entry)
+
+    if candidates:
+        window_start = min(e['scheduled_time'] for _, e in candidates)
+        window_end = max(e['scheduled_time'] + timedelta(minutes=e['duration']) for _, e in candidates)
+        schedules = _load_schedules({e['driver_id'] for _, e in candidates}, window_start, window_end)
+        for n, entry in candidates:
+            start = entry['scheduled_time']
+            end = start + timedelta(minutes=entry['duration'])
+            schedule = schedules[entry['driver_id']]
+            clash = schedule.conflict(start, end)
+            if clash:
+                entry['error'] = f"driver {entry['driver_id']} is already booked ({', '.join(clash)})"
+                rejected.append(entry)
+            else:
+                schedule.add(start, end, f"entry {n}")
+                accepted.append(entry)
+
+    if dry_run or not accepted:
+        for entry in accepted:
+            entry['route_id'] = None
+        return accepted, rejected
+
+    # accepted routes never share (driver, start), so that pair maps the
+    # RETURNING rows back to entries; asking for parameter order instead
+    # makes SQLite fall back to one INSERT per row
+    inserted = db.session.execute(
+        db.insert(Route).returning(Route.route_id, Route.driver_id, Route.scheduled_time),
+        [
+            {
+                'driver_id': e['driver_id'],
+                'street_id': e['street_id'],
+                'scheduled_time': e['scheduled_time'],
+                'duration': e['duration'],
+                'status': "scheduled",
+            }
+            for e in accepted
+        ],
+    ).all()
+    route_ids = {(driver_id, _naive_utc(start)): route_id for route_id, driver_id, start in inserted}
+    for entry in accepted:
+        entry['route_id'] = route_ids[entry['driver_id'], entry['scheduled_time']]
+    if notify:
+        # delivered in batches by the worker's notify_street handler
+        Job.enqueue_many(NOTIFY_STREET_JOB, [
+            {
+                'route_id': e['route_id'],
+                'street_id': e['street_id'],
+                'message': f"Driver {driver_names[e['driver_id']]} scheduled to visit "
+                           f"{street_names[e['street_id']]} at {e['scheduled_time']}",
+            }
+            for e in accepted
+        ])
+    db.session.commit()
+    return accepted, rejected
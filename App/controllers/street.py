@@ -0,0 +1,7 @@
+from App.models import Street
+from App.database import db
+
+
+def get_all_streets_json():
+    streets = db.session.scalars(db.select(Street).order_by(Street.name)).all()
+    return [street.get_json() for street in streets]
@@ -1,6 +1,8 @@
 from App.models import Resident
 from App.database import db
 
+USERS_PAGE_MAX = 500
+
 def create_user(username, password):
 	newuser = Resident(username=username, password=password)
 	db.session.add(newuser)
@@ -18,11 +20,36 @@ def get_all_users():
 	return db.session.scalars(db.select(Resident)).all()
 
 def get_all_users_json():
-	users = get_all_users()
-	if not users:
-		return []
-	users = [user.get_json() for user in users]
-	return users
+	# plain rows, no Resident instances to build and discard
+	return [row._asdict() for row in db.session.execute(Resident.json_select())]
+
+def get_users_page(cursor=None, limit=50):
+	"""Keyset page of residents ordered by id.
+
+	Returns (users, next_cursor); next_cursor is the last id of the page, or
+	None on the last page. Pass it back as ``cursor`` to continue.
+	"""
+	limit = max(1, min(limit, USERS_PAGE_MAX))
+	query = (
+		db.select(Resident)
+		.order_by(Resident.id)
+		.limit(limit + 1)
+	)
+	if cursor is not None:
+		query = query.where(Resident.id > cursor)
+	users = db.session.scalars(query).all()
+	next_cursor = users[limit - 1].id if len(users) > limit else None
+	return users[:limit], next_cursor
+
+def iter_users_json(batch_size=500):
+	"""Yield every resident's JSON, fetching batch_size rows at a time."""
+	query = (
+		Resident.json_select()
+		.order_by(Resident.id)
+		.execution_options(yield_per=batch_size)
+	)
+	for row in db.session.execute(query):
+		yield row._asdict()
 
 def update_user(id, username):
 	user = get_user(id)
@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from App.metrics import register_metrics
+
+
+def gevent_patched():
+    """True when gevent has monkey-patched this process (the gunicorn gevent worker)."""
+    # never import gevent just to find out it isn't in use
+    if 'gevent.monkey' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def cooperative_enabled(config):
+    """Resolve DB_COOPERATIVE: "auto" (the default) follows gevent_patched()."""
+    setting = config.get('DB_COOPERATIVE', 'auto')
+    if setting == 'auto':
+        return gevent_patched()
+    return bool(setting)
+
+
+class OffloadedSQLite:
+    """Stands in for the sqlite3 module so queries run on native threads.
+
+    sqlite3 releases the GIL while SQLite works but blocks the calling OS
+    thread, which under gevent is the thread every greenlet runs on. Passed
+    to create_engine as ``module``, this hands execute, executemany, the
+    fetches that step through rows, commit and rollback to a pool of
+    ``threads`` OS threads and waits for them cooperatively, so one slow
+    query (or a busy_timeout wait on a lock) only holds up its own greenlet.
+    Each connection is used by one greenlet at a time through the engine's
+    pool, never by two threads at once.
+    """
+
+    def __init__(self, threads=8):
+        self.threads = threads
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def __getattr__(self, name):
+        # paramstyle, sqlite_version_info, the exception classes, ...
+        return getattr(sqlite3, name)
+
+    def connect(self, *args, **kwargs):
+        # connections move between the pool's threads
+        kwargs['check_same_thread'] = False
+        return _OffloadedConnection(self, self.run(sqlite3.connect, *args, **kwargs))
+
+    def run(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            pool = self._get_pool()
+            if hasattr(pool, 'apply'):
+                return pool.apply(fn, args, kwargs)
+            return pool.submit(fn, *args, **kwargs).result()
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.seconds += seconds
+                self.max_seconds = max(self.max_seconds, seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threads': self.threads,
+                'calls': self.calls,
+                'avg_ms': self.seconds * 1000 / self.calls if self.calls else 0.0,
+                'max_ms': self.max_seconds * 1000,
+            }
+
+    def _get_pool(self):
+        # pools don't survive fork, so each worker process builds its own
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    self._pool = _native_pool(self.threads)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+
+def _native_pool(threads):
+    if gevent_patched():
+        from gevent.threadpool import ThreadPool
+        return ThreadPool(threads)
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix='sqlite')
+
+
+class _OffloadedConnection:
+    # a sqlite3.Connection whose blocking calls go through OffloadedSQLite.run
+
+    def __init__(self, module, connection):
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, '_connection', connection)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        # isolation_level, row_factory, ...
+        setattr(self._connection, name, value)
+
+    def cursor(self, *args):
+        return _OffloadedCursor(self._module, self._connection.cursor(*args))
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        self._module.run(self._connection.commit)
+
+    def rollback(self):
+        self._module.run(self._connection.rollback)
+
+
+class _OffloadedCursor:
+    # fetchone stays inline: it steps a single row, cheaper than a thread hop
+
+    def __init__(self, module, cursor):
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, '_cursor', cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args):
+        self._module.run(self._cursor.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        self._module.run(self._cursor.executemany, *args)
+        return self
+
+    def executescript(self, *args):
+        self._module.run(self._cursor.executescript, *args)
+        return self
+
+    def fetchmany(self, *args):
+        return self._module.run(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._module.run(self._cursor.fetchall)
+
+
+def gevent_wait_callback(connection, timeout=None):
+    """psycopg2 wait callback that yields to other greenlets while PostgreSQL works."""
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state!r}")
+
+
+def setup_cooperative_db(app, engine):
+    """Make the engine's driver yield to other greenlets; None unless DB_COOPERATIVE is on."""
+    if not app.config.get('DB_COOPERATIVE'):
+        return None
+    if engine.dialect.driver == 'psycopg2':
+        # process wide: every psycopg2 connection from here on is green
+        from psycopg2 import extensions
+        extensions.set_wait_callback(gevent_wait_callback)
+        return 'psycopg2'
+    if isinstance(engine.dialect.dbapi, OffloadedSQLite):
+        register_metrics(app, 'db_offload', engine.dialect.dbapi.stats)
+        return 'sqlite'
+    app.logger.warning("DB_COOPERATIVE is on but %s can't be made cooperative", engine.dialect.driver)
+    return None
@@ -1,14 +1,161 @@
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from App.cooperative import setup_cooperative_db
+from App.metrics import register_metrics
 
 
 db = SQLAlchemy()
 
+
+class PoolWaitStats:
+    """How long pool checkouts waited for a connection, for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+            self.slow_checkouts = 0
+
+    def record(self, seconds, slow_after=0.005):
+        with self._lock:
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if seconds >= slow_after:
+                self.slow_checkouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'avg_wait_ms': self.total_seconds * 1000 / self.checkouts if self.checkouts else 0.0,
+                'max_wait_ms': self.max_seconds * 1000,
+                'slow_checkouts': self.slow_checkouts,
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time in pool_wait_stats."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_stats.record(time.perf_counter() - start)
+
 def get_migrate(app):
-    return Migrate(app, db)
+    # alembic is slow to import; only `flask db ...` needs it
+    from flask_migrate import Migrate
+    # SQLite can't ALTER most column changes; batch mode rebuilds the table
+    return Migrate(app, db, render_as_batch=True)
 
 def create_db():
     db.create_all()
     
 def init_db(app):
-    db.init_app(app)
\ No newline at end of file
+    db.init_app(app)
+    with app.app_context():
+        engine = db.engine
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if pragmas and engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _sqlite_pragma_setter(pragmas))
+    setup_cooperative_db(app, engine)
+    register_metrics(app, 'db_pool', lambda: _pool_metrics(engine))
+
+
+def _sqlite_pragma_setter(pragmas):
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+
+def _pool_metrics(engine):
+    metrics = pool_wait_stats.snapshot()
+    if isinstance(engine.pool, QueuePool):
+        metrics.update(
+            size=engine.pool.size(),
+            checked_out=engine.pool.checkedout(),
+            overflow=engine.pool.overflow(),
+        )
+    return metrics
+
+def create_indexes():
+    """Create model indexes missing from the current schema; returns their names.
+
+    Safe to run repeatedly. Fresh databases get every index from create_all()
+    and upgraded ones from `flask db upgrade`; this only repairs an index that
+    was dropped by hand, and needs the columns the indexes cover to exist.
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+
+def upsert_insert(table, bind=None):
+    """INSERT for the bind's dialect with on_conflict_do_nothing/do_update.
+
+    SQLite and PostgreSQL, the two engine profiles, both support it; other
+    dialects get None and callers fall back to select-then-write.
+    """
+    name = (bind or db.session.get_bind()).dialect.name
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(table)
+
+
+def reset_sequences(tables, bind=None):
+    """Move PostgreSQL id sequences past rows inserted with explicit ids.
+
+    Bulk loads that write their own primary keys leave the serial sequence
+    behind, and the next ORM insert then collides with an existing id.
+    SQLite picks max(rowid) + 1 by itself, so other dialects are left
+    alone. Returns the tables whose sequence moved; the caller commits.
+    """
+    bind = bind or db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return []
+    quote = bind.dialect.identifier_preparer.quote
+    moved = []
+    for table in tables:
+        for column in table.primary_key.columns:
+            if column.foreign_keys:
+                continue
+            # setval(NULL, ...) is NULL for columns without a sequence; an
+            # empty table's sequence is left to start at 1
+            value = db.session.execute(db.text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"COALESCE(MAX({quote(column.name)}), 1), MAX({quote(column.name)}) IS NOT NULL) "
+                f"FROM {quote(table.name)}"
+            ), {'table': table.name, 'column': column.name}).scalar()
+            if value is not None:
+                moved.append(table.name)
+    return moved
@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+
+from App.metrics import register_metrics
+
+
+class Subscription:
+    """One listener's mailbox.
+
+    Events carry a key (e.g. the driver id). A newer event replaces a queued
+    one with the same key, so a slow consumer only ever sees the latest
+    state. If more than ``max_pending`` distinct keys are waiting, the oldest
+    are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, topics, max_pending=32):
+        self.topics = tuple(topics)
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def push(self, key, event):
+        with self._lock:
+            if key in self._pending:
+                self._pending.move_to_end(key)
+                self.coalesced += 1
+            self._pending[key] = event
+            dropped = 0
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                dropped += 1
+            self.dropped += dropped
+        self._ready.set()
+        return dropped
+
+    def get(self, timeout=None):
+        """Wait for events; returns an empty list on timeout or close."""
+        if not self._ready.wait(timeout):
+            return []
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+        return events
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class EventHub:
+    """In-process topic pub/sub used to push updates to idle SSE connections.
+
+    Only this process's listeners are reached; updates made on other
+    workers arrive through App.controllers.driver.DriverStateRelay.
+    """
+
+    def __init__(self, max_subscribers=5000, max_pending=32):
+        self.max_subscribers = max_subscribers
+        self.max_pending = max_pending
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._subscribers = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, *topics):
+        """Register a listener, or return None when the worker is at capacity."""
+        sub = Subscription(topics, self.max_pending)
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if not sub.closed:
+                self._subscribers -= 1
+                for topic in sub.topics:
+                    listeners = self._topics.get(topic, set())
+                    listeners.discard(sub)
+                    if not listeners:
+                        self._topics.pop(topic, None)
+            sub.close()
+
+    def has_subscribers(self):
+        return bool(self._topics)
+
+    def topics(self):
+        """The topics that have at least one listener right now."""
+        with self._lock:
+            return list(self._topics)
+
+    def publish(self, topics, key, event):
+        """Deliver ``event`` once to every listener of any of ``topics``."""
+        with self._lock:
+            listeners = set()
+            for topic in topics:
+                listeners.update(self._topics.get(topic, ()))
+            self.published += 1
+        dropped = 0
+        for sub in listeners:
+            dropped += sub.push(key, event)
+        with self._lock:
+            self.delivered += len(listeners)
+            self.dropped += dropped
+        return len(listeners)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._subscribers,
+                'topics': len(self._topics),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+            }
+
+
+def setup_event_hub(app):
+    hub = EventHub(
+        max_subscribers=app.config.get('SSE_MAX_SUBSCRIBERS', 5000),
+        max_pending=app.config.get('SSE_MAX_PENDING', 32),
+    )
+    app.extensions['event_hub'] = hub
+    register_metrics(app, 'event_hub', hub.stats)
+    return hub
@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+
+from App.metrics import register_metrics
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_position(lat, lon):
+    return lat is not None and lon is not None and -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+class SpatialGrid:
+    """In-memory index of moving points in fixed lat/lon cells.
+
+    Points are bucketed by (floor(lat / cell), floor(lon / cell)); a radius
+    query only looks at the cells its bounding box covers, and a k-nearest
+    query walks rings of cells outwards from the query point until the
+    k-th best distance is closer than any unvisited cell. Moving a point is
+    two dict operations, so positions can be updated on every report.
+    """
+
+    def __init__(self, cell_degrees=0.01):
+        self.cell_degrees = cell_degrees
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._points = {}
+        self.updates = 0
+        self.queries = 0
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def update(self, key, lat, lon):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            self.updates += 1
+            previous = self._points.get(key)
+            if previous is not None and previous[2] != cell:
+                self._discard(key, previous[2])
+            self._points[key] = (lat, lon, cell)
+            self._cells.setdefault(cell, {})[key] = (lat, lon)
+
+    def remove(self, key):
+        with self._lock:
+            previous = self._points.pop(key, None)
+            if previous is not None:
+                self._discard(key, previous[2])
+
+    def get(self, key):
+        with self._lock:
+            point = self._points.get(key)
+        return point[:2] if point is not None else None
+
+    def replace_all(self, points):
+        """Swap in a fresh set of (key, lat, lon) points."""
+        cells, positions = {}, {}
+        for key, lat, lon in points:
+            cell = self._cell(lat, lon)
+            positions[key] = (lat, lon, cell)
+            cells.setdefault(cell, {})[key] = (lat, lon)
+        with self._lock:
+            self._cells, self._points = cells, positions
+
+    def _discard(self, key, cell):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(key, None)
+            if not members:
+                del self._cells[cell]
+
+    def within(self, lat, lon, radius_km):
+        """(distance_km, key) pairs within radius_km, nearest first."""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(89.0, abs(lat) + lat_span))), 1e-6))
+        low = self._cell(lat - lat_span, lon - lon_span)
+        high = self._cell(lat + lat_span, lon + lon_span)
+        found = []
+        with self._lock:
+            self.queries += 1
+            for row in range(low[0], high[0] + 1):
+                for col in range(low[1], high[1] + 1):
+                    for key, (plat, plon) in self._cells.get((row, col), {}).items():
+                        distance = haversine_km(lat, lon, plat, plon)
+                        if distance <= radius_km:
+                            found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """The k (distance_km, key) pairs closest to (lat, lon), nearest first."""
+        row, col = self._cell(lat, lon)
+        found = []
+        with self._lock:
+            self.queries += 1
+            seen, total = 0, len(self._points)
+            ring = 0
+            while seen < total:
+                # every cell of this ring is at least `reach` km away
+                reach = self._cell_km(lat, ring) * max(ring - 1, 0)
+                if len(found) >= k and found[k - 1][0] <= reach:
+                    break
+                if max_km is not None and reach > max_km:
+                    break
+                if 8 * ring > len(self._cells):
+                    # sparse points far away: scanning the cells is cheaper than the ring
+                    found = [
+                        (haversine_km(lat, lon, plat, plon), key)
+                        for members in self._cells.values()
+                        for key, (plat, plon) in members.items()
+                    ]
+                    found.sort()
+                    break
+                for cell in _ring(row, col, ring):
+                    members = self._cells.get(cell)
+                    if not members:
+                        continue
+                    seen += len(members)
+                    for key, (plat, plon) in members.items():
+                        found.append((haversine_km(lat, lon, plat, plon), key))
+                found.sort()
+                ring += 1
+        if max_km is not None:
+            found = [pair for pair in found if pair[0] <= max_km]
+        return found[:k]
+
+    def _cell_km(self, lat, ring):
+        # narrowest cell width (east-west, nearest the pole) within `ring` cells
+        edge = min(89.0, abs(lat) + (ring + 1) * self.cell_degrees)
+        return self.cell_degrees * KM_PER_DEGREE * max(math.cos(math.radians(edge)), 1e-6)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'points': len(self._points),
+                'cells': len(self._cells),
+                'updates': self.updates,
+                'queries': self.queries,
+            }
+
+
+def _ring(row, col, radius):
+    if radius == 0:
+        yield (row, col)
+        return
+    for c in range(col - radius, col + radius + 1):
+        yield (row - radius, c)
+        yield (row + radius, c)
+    for r in range(row - radius + 1, row + radius):
+        yield (r, col - radius)
+        yield (r, col + radius)
+
+
+class DriverGrid(SpatialGrid):
+    """SpatialGrid of driver positions, reloaded from the drivers table.
+
+    Each worker keeps its own grid current from the positions it receives,
+    and reloads the table every ``refresh_interval`` seconds to pick up the
+    positions other workers have flushed.
+    """
+
+    def __init__(self, cell_degrees=0.01, refresh_interval=10.0, clock=time.monotonic):
+        super().__init__(cell_degrees)
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self.loaded_at = None
+
+    def refresh_due(self):
+        return self.loaded_at is None or self._clock() - self.loaded_at >= self.refresh_interval
+
+    def mark_loaded(self):
+        self.loaded_at = self._clock()
+
+
+def setup_driver_grid(app):
+    grid = DriverGrid(
+        cell_degrees=app.config.get('DRIVER_GRID_CELL_DEGREES', 0.01),
+        refresh_interval=app.config.get('DRIVER_GRID_REFRESH_SECONDS', 10.0),
+    )
+    app.extensions['driver_grid'] = grid
+    register_metrics(app, 'driver_grid', grid.stats)
+    return grid
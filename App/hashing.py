@@ -0,0 +1,110 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from App.metrics import register_metrics
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded pool of native threads.
+
+    scrypt/pbkdf2 release the GIL, so a gevent worker can keep serving other
+    greenlets while logins hash in parallel. Under gevent monkey-patching the
+    pool is a gevent ThreadPool (real OS threads, cooperative wait);
+    otherwise a ThreadPoolExecutor. ``workers=0`` hashes inline.
+    """
+
+    def __init__(self, method="scrypt", workers=None):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._pool = None
+        self._pool_pid = None
+        self._method_prefix = None
+        self._lock = threading.Lock()
+        self.hashes = 0
+        self.checks = 0
+
+    def hash(self, password):
+        with self._lock:
+            self.hashes += 1
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords at once, spread over the pool's threads."""
+        passwords = list(passwords)
+        with self._lock:
+            self.hashes += len(passwords)
+        if not self.workers or len(passwords) < 2:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        method = self.method
+        return list(self._get_pool().map(lambda password: generate_password_hash(password, method), passwords))
+
+    def check(self, pwhash, password):
+        with self._lock:
+            self.checks += 1
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with other method or parameters."""
+        return pwhash.split("$", 1)[0] != self.method_prefix()
+
+    def method_prefix(self):
+        # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"),
+        # so learn the full prefix from one real hash
+        if self._method_prefix is None:
+            self._method_prefix = self.hash("").split("$", 1)[0]
+        return self._method_prefix
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'hashes': self.hashes, 'checks': self.checks}
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        pool = self._get_pool()
+        if hasattr(pool, 'apply'):
+            return pool.apply(fn, args)
+        return pool.submit(fn, *args).result()
+
+    def _get_pool(self):
+        # pools don't survive fork, so each worker process builds its own
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    self._pool = _native_pool(self.workers)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+
+def _native_pool(workers):
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPool
+            return ThreadPool(workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+
+_default_hasher = PasswordHasher()
+
+
+def setup_password_hasher(app):
+    hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS'),
+    )
+    app.extensions['password_hasher'] = hasher
+    register_metrics(app, 'password_hasher', hasher.stats)
+    return hasher
+
+
+def get_password_hasher():
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return current_app.extensions['password_hasher']
+    return _default_hasher
@@ -0,0 +1,114 @@
+import heapq
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from App.database import db
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """Normalise SQL so the same query with a different IN-list length compares equal."""
+    return _IN_LIST.sub("(?)", _SPACE.sub(" ", statement).strip())
+
+
+class RequestQueryStats:
+    """SQL statements and timings collected while serving one request."""
+
+    def __init__(self, keep_slowest=3):
+        self.started = time.perf_counter()
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+        self._slowest = []
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        entry = (seconds, self.count, statement)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def slowest(self):
+        return [(seconds, statement) for seconds, _, statement in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def setup_instrumentation(app):
+    """Opt-in (SQL_INSTRUMENTATION=True) per-request query count, DB time and N+1 warnings.
+
+    Each response gets a Server-Timing header and one JSON log line on the
+    "App.instrumentation" logger. A warning is logged when one statement
+    shape runs more than SQL_REPEAT_THRESHOLD times in a request. Queries
+    run while a streamed body is being sent are not counted.
+    """
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+    repeat_threshold = app.config.get('SQL_REPEAT_THRESHOLD', 10)
+    keep_slowest = app.config.get('SQL_SLOWEST_STATEMENTS', 3)
+    with app.app_context():
+        engine = db.engine
+
+    def current_stats():
+        return g.get('_query_stats') if has_request_context() else None
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if current_stats() is not None:
+            conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats()
+        started = conn.info.get('_query_started')
+        if stats is not None and started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+    @app.before_request
+    def start_request_stats():
+        g._query_stats = RequestQueryStats(keep_slowest)
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = g.pop('_query_stats', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_seconds * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.2f};desc="{stats.count} queries", app;dur={total_ms - db_ms:.2f}, total;dur={total_ms:.2f}'
+        )
+        repeated = stats.repeated(repeat_threshold)
+        for shape, count in repeated:
+            logger.warning("possible N+1: %s %s ran the same statement %d times: %s",
+                           request.method, request.path, count, shape[:300])
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'queries': stats.count,
+            'repeated_statements': len(repeated),
+            'slowest': [
+                {'ms': round(seconds * 1000, 2), 'sql': statement[:200]}
+                for seconds, statement in stats.slowest()
+            ],
+        }))
+        return response
@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from App.database import db
+from App.models import Job
+
+# kind -> (handler, batch_size); filled by @job_handler
+JOB_HANDLERS = {}
+
+
+def job_handler(kind, batch_size=1):
+    """Register handler(payloads) for a job kind.
+
+    The handler always receives a list of payloads, at most batch_size of
+    them, and runs inside the transaction that deletes those jobs, so its
+    writes and the jobs' completion commit together. If a batch raises, its
+    jobs are retried one at a time so one bad payload can't sink the rest.
+    """
+    def register(fn):
+        JOB_HANDLERS[kind] = (fn, batch_size)
+        return fn
+    return register
+
+
+class JobWorker:
+    """Claims due jobs from the jobs table and runs their handlers.
+
+    A claim is a single UPDATE ... RETURNING over the oldest due jobs (with
+    FOR UPDATE SKIP LOCKED on PostgreSQL), so any number of worker
+    processes can share the table. Claimed jobs are grouped by kind and
+    handed to their handler in batches. A failed job is retried after
+    retry_base * 2**(attempt - 1) seconds, capped at retry_max, until it
+    runs out of attempts. Jobs locked longer than lock_timeout (their
+    worker died) are claimed again.
+    """
+
+    def __init__(self, worker_id=None, batch_size=100, retry_base=2.0, retry_max=300.0,
+                 lock_timeout=300.0, clock=datetime.utcnow):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lock_timeout = lock_timeout
+        self._clock = clock
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def claim(self):
+        jobs = Job.__table__
+        now = self._clock()
+        due = db.or_(
+            db.and_(jobs.c.status == "queued", jobs.c.run_at <= now),
+            db.and_(jobs.c.status == "running", jobs.c.locked_at < now - timedelta(seconds=self.lock_timeout)),
+        )
+        oldest = (
+            db.select(jobs.c.id)
+            .where(due)
+            .order_by(jobs.c.run_at, jobs.c.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = db.session.execute(
+            jobs.update()
+            .where(jobs.c.id.in_(oldest.scalar_subquery()), due)
+            .values(status="running", locked_by=self.worker_id, locked_at=now, attempts=jobs.c.attempts + 1)
+            .returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+        ).all()
+        db.session.commit()
+        return sorted(claimed, key=lambda job: job.id)
+
+    def run_once(self):
+        """Claim and run one batch; returns the number of jobs claimed."""
+        claimed = self.claim()
+        by_kind = {}
+        for job in claimed:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, jobs in by_kind.items():
+            if kind not in JOB_HANDLERS:
+                for job in jobs:
+                    self._fail(job, f"no handler for job kind {kind!r}", retry=False)
+                continue
+            handler, batch_size = JOB_HANDLERS[kind]
+            for i in range(0, len(jobs), batch_size):
+                self._run_batch(handler, jobs[i:i + batch_size])
+        return len(claimed)
+
+    def _run_batch(self, handler, jobs):
+        try:
+            handler([job.payload for job in jobs])
+            self._complete(jobs)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            if len(jobs) > 1:
+                for job in jobs:
+                    self._run_batch(handler, [job])
+                return
+            self._fail(jobs[0], traceback.format_exc(limit=5))
+            return
+        self.processed += len(jobs)
+
+    def _complete(self, jobs):
+        table = Job.__table__
+        db.session.execute(table.delete().where(table.c.id.in_([job.id for job in jobs])))
+
+    def _fail(self, job, error, retry=True):
+        table = Job.__table__
+        now = self._clock()
+        if retry and job.attempts < job.max_attempts:
+            delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+            values = {'status': "queued", 'run_at': now + timedelta(seconds=delay)}
+            self.retried += 1
+        else:
+            values = {'status': "failed"}
+            self.failed += 1
+        db.session.execute(
+            table.update().where(table.c.id == job.id)
+            .values(locked_by=None, locked_at=None, last_error=error[-2000:], **values)
+        )
+        db.session.commit()
+
+    def run(self, stop=None, idle_sleep=0.5, once=False):
+        """Work until stop is set (or, with once, until nothing is due)."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_once():
+                continue
+            if once:
+                break
+            stop.wait(idle_sleep)
+        return self.processed
+
+    def stats(self):
+        return {'processed': self.processed, 'retried': self.retried, 'failed': self.failed}
+
+
+def make_worker(app, worker_id=None):
+    return JobWorker(
+        worker_id=worker_id,
+        batch_size=app.config.get('JOB_CLAIM_BATCH', 100),
+        retry_base=app.config.get('JOB_RETRY_BASE_SECONDS', 2.0),
+        retry_max=app.config.get('JOB_RETRY_MAX_SECONDS', 300.0),
+        lock_timeout=app.config.get('JOB_LOCK_TIMEOUT_SECONDS', 300.0),
+    )
+
+
+def run_pending_jobs(app):
+    """Run every job that is due now in this process; returns how many succeeded."""
+    return make_worker(app).run(once=True)
+
+
+def run_workers(app, processes=1, once=False, idle_sleep=0.5):
+    """Run `processes` worker processes until SIGINT/SIGTERM (or an empty queue with once)."""
+    if processes <= 1:
+        with app.app_context():
+            return _work(app, once, idle_sleep)
+    # forked children share nothing but the app object; each opens its own connections
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=_child, args=(app, once, idle_sleep), daemon=False) for _ in range(processes)]
+    with app.app_context():
+        db.engine.dispose()
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+    return sum(child.exitcode == 0 for child in children)
+
+
+def _child(app, once, idle_sleep):
+    with app.app_context():
+        db.engine.dispose(close=False)
+        _work(app, once, idle_sleep)
+
+
+def _work(app, once, idle_sleep):
+    stop = threading.Event()
+    # finish the batch in hand, then exit
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    worker = make_worker(app)
+    started = time.perf_counter()
+    try:
+        worker.run(stop, idle_sleep=idle_sleep, once=once)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - started
+    app.logger.info("worker %s: %s in %.1fs", worker.worker_id, worker.stats(), elapsed)
+    return worker.processed
+
+
+def queue_stats(now=None):
+    """Depth per (kind, status) and the lag of the oldest due job, in seconds."""
+    jobs = Job.__table__
+    now = now or datetime.utcnow()
+    depth = db.session.execute(
+        db.select(jobs.c.kind, jobs.c.status, db.func.count(), db.func.min(jobs.c.run_at))
+        .group_by(jobs.c.kind, jobs.c.status)
+        .order_by(jobs.c.kind, jobs.c.status)
+    ).all()
+    oldest_due = db.session.scalar(
+        db.select(db.func.min(jobs.c.run_at)).where(jobs.c.status == "queued", jobs.c.run_at <= now)
+    )
+    return {
+        'depth': [
+            {'kind': kind, 'status': status, 'jobs': count, 'oldest_run_at': oldest}
+            for kind, status, count, oldest in depth
+        ],
+        'lag_seconds': (now - oldest_due).total_seconds() if oldest_due else 0.0,
+    }
+
+
+def retry_failed_jobs(kind=None):
+    """Queue failed jobs again with fresh attempts; returns how many."""
+    jobs = Job.__table__
+    stmt = (
+        jobs.update().where(jobs.c.status == "failed")
+        .values(status="queued", attempts=0, run_at=datetime.utcnow(), locked_by=None, locked_at=None)
+    )
+    if kind:
+        stmt = stmt.where(jobs.c.kind == kind)
+    retried = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return retried
@@ -1,41 +1,112 @@
 import os
 from flask import Flask, render_template
-from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
-from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.datastructures import  FileStorage
 
-from App.database import init_db
+from App.database import db, init_db
 from App.config import load_config
+from App.events import setup_event_hub
+from App.geo import setup_driver_grid
+from App.hashing import setup_password_hasher
+from App.instrumentation import setup_instrumentation
+from App.versions import setup_response_cache
+from App.serialization import setup_json
+from App.compression import setup_compression
 
 
 from App.controllers import (
     setup_jwt,
-    add_auth_context
+    add_auth_context,
+    setup_driver_buffer,
+    setup_driver_relay,
+    setup_geofences
 )
 
-from App.views import views, setup_admin
+# web serves HTTP; cli and worker only need the models, controllers and
+# per-process services, so they skip the blueprints, Flask-Admin, uploads,
+# CORS and the response post-processing
+APP_ROLES = ('web', 'cli', 'worker')
 
+# flask subcommands that need the web app; `flask worker ...` runs jobs
+WEB_COMMANDS = ('run', 'routes', 'shell')
+WORKER_COMMANDS = ('worker',)
+# options of the flask command itself that take a value
+FLASK_VALUE_OPTIONS = ('--app', '-A', '--env-file', '-e')
 
 
 def add_views(app):
+    from App.views import views
     for view in views:
         app.register_blueprint(view)
 
-def create_app(overrides={}):
-    app = Flask(__name__, static_url_path='/static')
-    load_config(app, overrides)
-    CORS(app)
-    add_auth_context(app)
+def setup_uploads(app):
+    from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
-    add_views(app)
+
+def setup_cors(app):
+    from flask_cors import CORS
+    CORS(app)
+
+def flask_command(argv):
+    """The subcommand of a `flask ...` command line, or None for any other program."""
+    program = os.path.basename(argv[0]) if argv else ''
+    if program != 'flask' and not argv[0].endswith(os.path.join('flask', '__main__.py')):
+        return None
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in FLASK_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return None
+
+def process_role(command=None):
+    """APP_ROLE from the environment, otherwise the role a flask subcommand needs."""
+    role = os.environ.get('APP_ROLE')
+    if role:
+        return role
+    if command is None or command in WEB_COMMANDS:
+        return 'web'
+    return 'worker' if command in WORKER_COMMANDS else 'cli'
+
+def create_app(overrides={}, role=None):
+    app = Flask(__name__, static_url_path='/static')
+    load_config(app, overrides)
+    role = role or app.config.get('APP_ROLE', 'web')
+    if role not in APP_ROLES:
+        raise ValueError(f"unknown app role {role!r}, expected one of {', '.join(APP_ROLES)}")
+    app.config['APP_ROLE'] = role
+    web = role == 'web'
+    setup_json(app)
+    setup_password_hasher(app)
+    if web:
+        setup_cors(app)
+        add_auth_context(app)
+        setup_uploads(app)
+        add_views(app)
     init_db(app)
+    if web:
+        setup_instrumentation(app)
     jwt = setup_jwt(app)
-    setup_admin(app)
+    setup_driver_buffer(app)
+    setup_driver_grid(app)
+    setup_geofences(app)
+    setup_event_hub(app)
+    setup_driver_relay(app)
+    if web:
+        setup_response_cache(app)
+        setup_compression(app)
+        if app.config.get('ADMIN_ENABLED', True):
+            from App.views import setup_admin
+            setup_admin(app)
     @jwt.invalid_token_loader
     @jwt.unauthorized_loader
     def custom_unauthorized_response(error):
         return render_template('401.html', error=error), 401
     app.app_context().push()
-    return app
\ No newline at end of file
+    return app
+
+def reset_after_fork(app):
+    """Per-process cleanup for a worker forked from a preloaded app."""
+    with app.app_context():
+        # the master's pooled connections must not be shared with its children
+        db.engine.dispose(close=False)
@@ -0,0 +1,11 @@
+from flask import current_app
+
+
+def register_metrics(app, name, collect):
+    """Expose the dict returned by ``collect()`` under ``name`` on /metrics."""
+    app.extensions.setdefault('metrics', {})[name] = collect
+
+
+def collect_metrics(app=None):
+    app = app or current_app
+    return {name: collect() for name, collect in app.extensions.get('metrics', {}).items()}
@@ -6,4 +6,8 @@ from .resident import *
 from .street import *
 from .route import *
 from .stop_request import *
-from .notification import *
\ No newline at end of file
+from .notification import *
+from .route_alert import *
+from .route_demand import *
+from .job import *
+from .collection_version import *
\ No newline at end of file
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from App.database import upsert_insert
+from . import db
+
+class CollectionVersion(db.Model):
+    """A counter per API collection, bumped in every transaction that changes it.
+
+    Conditional GETs compare these instead of reading the collection's rows;
+    the tables feeding each collection are listed in App.versions.
+    """
+    __tablename__ = "collection_versions"
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    @classmethod
+    def bump(cls, connection, names):
+        """Increment each named counter, creating missing ones, on connection's transaction."""
+        table = cls.__table__
+        now = datetime.utcnow()
+        insert = upsert_insert(table, connection)
+        # a fixed order so concurrent writers lock the rows the same way
+        for name in sorted(names):
+            if insert is not None:
+                connection.execute(insert.values(name=name, version=1, updated_at=now).on_conflict_do_update(
+                    index_elements=[table.c.name],
+                    set_={'version': table.c.version + 1, 'updated_at': now},
+                ))
+                continue
+            updated = connection.execute(
+                table.update().where(table.c.name == name).values(version=table.c.version + 1, updated_at=now)
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(name=name, version=1, updated_at=now))
+    
+    @classmethod
+    def read(cls, names):
+        """{name: (version, updated_at)}; collections never written are (0, None)."""
+        table = cls.__table__
+        rows = db.session.execute(
+            db.select(table.c.name, table.c.version, table.c.updated_at).where(table.c.name.in_(sorted(names)))
+        )
+        versions = {name: (0, None) for name in names}
+        versions.update((name, (version, updated_at)) for name, version, updated_at in rows)
+        return versions
+    
+    def __repr__(self):
+        return f"<CollectionVersion {self.name}={self.version}>"
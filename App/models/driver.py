@@ -8,12 +8,17 @@ class Driver(User):
     id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     status = db.Column(db.String(50), default="available")
     location = db.Column(db.String(200), nullable=True)
+    # last reported position; location stays as the human readable label
+    lat = db.Column(db.Float, nullable=True)
+    lon = db.Column(db.Float, nullable=True)
     
     # relationships
     routes = db.relationship("Route", back_populates="driver", cascade="all, delete-orphan")
     
     __mapper_args__ = {
         'polymorphic_identity': 'driver',
+        # load drivers' columns in the same SELECT whenever User is queried
+        'polymorphic_load': 'inline',
     }
     
     def __init__(self, username, password, name, contact=None, status="available", location=None):
@@ -21,30 +26,44 @@ class Driver(User):
         self.status = status
         self.location = location
     
-    def schedule_drive(self, street, scheduled_time):
+    def schedule_drive(self, street, scheduled_time, notify=True):
         from .route import Route
+        from .job import Job
+        from .notification import NOTIFY_STREET_JOB
         route = Route(driver_id=self.id, street_id=street.street_id, scheduled_time=scheduled_time)
         db.session.add(route)
+        # flush once so the route id exists for the notification job
+        db.session.flush()
+        if notify:
+            # the street is notified by a background worker, not in this request
+            Job.enqueue(NOTIFY_STREET_JOB, {
+                'route_id': route.route_id,
+                'street_id': street.street_id,
+                'message': f"Driver {self.name} scheduled to visit {street.name} at {route.scheduled_time}",
+            })
         db.session.commit()
         return route
     
-    def update_status(self, status):
-        self.status = status
-        db.session.commit()
-    
-    def update_location(self, location):
-        self.location = location
-        db.session.commit()
-    
     def cancel_route(self, route):
         db.session.delete(route)
         db.session.commit()
     
+    @classmethod
+    def json_select(cls):
+        return super().json_select().add_columns(
+            cls.status.label('status'),
+            cls.location.label('location'),
+            cls.lat.label('lat'),
+            cls.lon.label('lon'),
+        )
+    
     def get_json(self):
         data = super().get_json()
         data.update({
             'status': self.status,
-            'location': self.location
+            'location': self.location,
+            'lat': self.lat,
+            'lon': self.lon
         })
         return data
     
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from . import db
+
+class Job(db.Model):
+    """A unit of background work, run by `flask worker run`.
+
+    Jobs are enqueued in the caller's transaction, so they only exist if the
+    change that caused them commits. Finished jobs are deleted; jobs that
+    run out of attempts stay behind with status "failed".
+    """
+    __tablename__ = "jobs"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    __table_args__ = (
+        # workers claim the oldest due jobs: WHERE status = ? AND run_at <= ? ORDER BY run_at, id
+        db.Index("ix_jobs_status_run_at", "status", "run_at", "id"),
+    )
+    
+    @classmethod
+    def enqueue(cls, kind, payload, delay=0, max_attempts=5):
+        """Add a job to the session; it is queued when the caller commits."""
+        job = cls(
+            kind=kind,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        db.session.add(job)
+        return job
+    
+    @classmethod
+    def enqueue_many(cls, kind, payloads, max_attempts=5):
+        """Queue many jobs of one kind with a single executemany INSERT."""
+        now = datetime.utcnow()
+        rows = [
+            {'kind': kind, 'payload': payload, 'status': "queued", 'attempts': 0,
+             'max_attempts': max_attempts, 'run_at': now, 'created_at': now}
+            for payload in payloads
+        ]
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+        return len(rows)
+    
+    def __repr__(self):
+        return f"<Job id={self.id} kind={self.kind} status={self.status} attempts={self.attempts}>"
@@ -1,6 +1,13 @@
+from collections import Counter
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from . import db
 
+# background job kinds that deliver notifications (handled in App.controllers.notification)
+NOTIFY_STREET_JOB = "notify_street"
+NOTIFY_RESIDENT_JOB = "notify_resident"
+
 class Notification(db.Model):
     __tablename__ = "notifications"
     
@@ -9,10 +16,202 @@ class Notification(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     resident_id = db.Column(db.Integer, db.ForeignKey("residents.id"), nullable=False)
     route_id = db.Column(db.Integer, db.ForeignKey("routes.route_id"), nullable=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     
     # relationships
     resident = db.relationship("Resident", back_populates="notifications")
     route = db.relationship("Route", back_populates="notifications")
     
+    __table_args__ = (
+        # newest-first inbox pages: WHERE resident_id = ? ORDER BY timestamp DESC, notification_id DESC
+        db.Index("ix_notifications_resident_timestamp", "resident_id", "timestamp", "notification_id"),
+        # route deletes cascade to its notifications
+        db.Index("ix_notifications_route_id", "route_id"),
+        db.Index(
+            "ix_notifications_resident_unread", "resident_id", "timestamp", "notification_id",
+            sqlite_where=db.text("is_read = 0"),
+            postgresql_where=db.text("NOT is_read"),
+        ),
+    )
+    
+    @classmethod
+    def notify(cls, resident_id, route_id, message):
+        """Add one notification and bump the resident's unread counter."""
+        notification = cls(resident_id=resident_id, route_id=route_id, message=message)
+        db.session.add(notification)
+        cls._bump_unread(cls._residents().c.id == resident_id)
+        return notification
+    
+    @classmethod
+    def fan_out_to_street(cls, route_id, street_id, message, timestamp=None):
+        """Notify every resident of a street with a single INSERT ... SELECT.
+
+        The route must already have an id (flush it first). Returns the
+        number of notifications written; the caller owns the commit.
+        """
+        residents = cls._residents()
+        timestamp = timestamp or datetime.utcnow()
+        rows = db.select(
+            db.literal(message, db.String),
+            db.literal(timestamp, db.DateTime),
+            residents.c.id,
+            db.literal(route_id, db.Integer),
+        ).where(residents.c.street_id == street_id)
+        stmt = db.insert(cls.__table__).from_select(
+            ["message", "timestamp", "resident_id", "route_id"], rows
+        )
+        written = db.session.execute(stmt).rowcount
+        cls._bump_unread(residents.c.street_id == street_id)
+        return written
+    
+    @classmethod
+    def fan_out_to_streets(cls, announcements, timestamp=None, chunk_size=200, bump_unread=True):
+        """fan_out_to_street for many routes: (route_id, street_id, message) triples.
+
+        An announcement may carry a fourth item, its own timestamp. Each
+        chunk of routes is one INSERT ... SELECT joining the residents to a
+        UNION ALL of the announcements (chunk_size stays under SQLite's
+        500-term compound select limit), and unread counters are bumped with
+        one UPDATE per distinct number of new routes on a street, unless
+        bump_unread is False (bulk loads that rebuild the counters after).
+        """
+        residents = cls._residents()
+        timestamp = timestamp or datetime.utcnow()
+        announcements = [(*announcement, timestamp)[:4] for announcement in announcements]
+        written = 0
+        for i in range(0, len(announcements), chunk_size):
+            batch = db.union_all(*(
+                db.select(
+                    db.literal(route_id, db.Integer).label("route_id"),
+                    db.literal(street_id, db.Integer).label("street_id"),
+                    db.literal(message, db.String).label("message"),
+                    db.literal(sent, db.DateTime).label("timestamp"),
+                )
+                for route_id, street_id, message, sent in announcements[i:i + chunk_size]
+            )).subquery("announcements")
+            rows = db.select(
+                batch.c.message,
+                batch.c.timestamp,
+                residents.c.id,
+                batch.c.route_id,
+            ).join_from(residents, batch, residents.c.street_id == batch.c.street_id)
+            stmt = db.insert(cls.__table__).from_select(
+                ["message", "timestamp", "resident_id", "route_id"], rows
+            )
+            written += db.session.execute(stmt).rowcount
+        if not bump_unread:
+            return written
+        by_delta = {}
+        for street_id, delta in Counter(street_id for _, street_id, _, _ in announcements).items():
+            by_delta.setdefault(delta, []).append(street_id)
+        for delta, street_ids in by_delta.items():
+            cls._bump_unread(residents.c.street_id.in_(street_ids), delta)
+        return written
+    
+    @classmethod
+    def mark_read(cls, resident_id, notification_id):
+        """Mark one notification read; returns False if it was already read or isn't theirs."""
+        table = cls.__table__
+        updated = db.session.execute(
+            table.update()
+            .where(
+                table.c.notification_id == notification_id,
+                table.c.resident_id == resident_id,
+                table.c.is_read == db.false(),
+            )
+            .values(is_read=True)
+        ).rowcount
+        if updated:
+            cls._bump_unread(cls._residents().c.id == resident_id, -updated)
+        return bool(updated)
+    
+    @classmethod
+    def mark_all_read(cls, resident_id):
+        table = cls.__table__
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.resident_id == resident_id, table.c.is_read == db.false())
+            .values(is_read=True)
+        ).rowcount
+        if updated:
+            cls._bump_unread(cls._residents().c.id == resident_id, -updated)
+        return updated
+    
+    @classmethod
+    def adjust_unread(cls, resident_id, delta):
+        """Move one resident's unread counter, for writes that bypass notify/mark_read (the admin)."""
+        cls._bump_unread(cls._residents().c.id == resident_id, delta)
+    
+    @classmethod
+    def rebuild_unread_counts(cls, connection=None):
+        """Recount every resident's unread counter from the rows (repair/seed only).
+
+        Runs on the session unless a connection is given (migrations pass theirs).
+        """
+        residents = cls._residents()
+        table = cls.__table__
+        unread = (
+            db.select(db.func.count())
+            .where(table.c.resident_id == residents.c.id, table.c.is_read == db.false())
+            .scalar_subquery()
+        )
+        executor = db.session if connection is None else connection
+        executor.execute(residents.update().values(unread_count=unread).execution_options(bump_versions=False))
+    
+    @staticmethod
+    def _residents():
+        from .resident import Resident
+        return Resident.__table__
+    
+    @classmethod
+    def _bump_unread(cls, where, delta=1):
+        residents = cls._residents()
+        # the counter isn't part of any cached payload, so leave the residents version alone
+        db.session.execute(
+            residents.update().where(where).values(unread_count=residents.c.unread_count + delta)
+            .execution_options(bump_versions=False)
+        )
+    
+    def get_json(self):
+        return {
+            'id': self.notification_id,
+            'message': self.message,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'route_id': self.route_id,
+            'is_read': self.is_read
+        }
+    
     def __repr__(self):
-        return f"<Notification id={self.notification_id} route={self.route_id} resident={self.resident_id}>"
\ No newline at end of file
+        return f"<Notification id={self.notification_id} route={self.route_id} resident={self.resident_id}>"
+
+
+# Deleting a route, street or notification through the ORM cascades to the
+# notifications one by one; their unread ones are tallied per resident and
+# taken off the counters in one UPDATE per distinct count after the flush.
+@event.listens_for(Notification, "after_delete")
+def _tally_deleted_unread(mapper, connection, notification):
+    if not notification.is_read:
+        object_session(notification).info.setdefault('deleted_unread', Counter())[notification.resident_id] += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _uncount_deleted_unread(session, flush_context):
+    deleted = session.info.pop('deleted_unread', None)
+    if not deleted:
+        return
+    residents = Notification._residents()
+    by_count = {}
+    for resident_id, count in deleted.items():
+        by_count.setdefault(count, []).append(resident_id)
+    connection = session.connection()
+    for count, resident_ids in by_count.items():
+        connection.execute(
+            residents.update().where(residents.c.id.in_(resident_ids))
+            .values(unread_count=residents.c.unread_count - count)
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_deleted_unread(session):
+    session.info.pop('deleted_unread', None)
+
@@ -7,26 +7,45 @@ class Resident(User):
     
     id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     street_id = db.Column(db.Integer, db.ForeignKey("streets.street_id"), nullable=False)
+    # maintained incrementally by Notification.notify/fan_out_to_street/mark_read
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     
     # relationships
-    street = db.relationship("Street", back_populates="residents")
+    # street is read by get_json and every listing, so it is joined in
+    street = db.relationship("Street", back_populates="residents", lazy="joined")
     stop_requests = db.relationship("StopRequest", back_populates="resident", cascade="all, delete-orphan")
-    notifications = db.relationship("Notification", back_populates="resident", cascade="all, delete-orphan")
+    # unbounded; read it through get_inbox, never by lazy loading
+    notifications = db.relationship("Notification", back_populates="resident", cascade="all, delete-orphan", lazy="raise_on_sql")
     
     __mapper_args__ = {
         'polymorphic_identity': 'resident',
+        # load residents' columns in the same SELECT whenever User is queried
+        'polymorphic_load': 'inline',
     }
     
+    __table_args__ = (
+        # street fan-out and per-street listings
+        db.Index("ix_residents_street_id", "street_id"),
+    )
+    
     def __init__(self, username, password, name, street, contact=None):
         super().__init__(username, password, name, contact)
         if street:
             self.street_id = street.street_id
             self.street = street
     
-    def request_stop(self, route, quantity=1, notes=""):
+    def request_stop(self, route, quantity=1, notes="", notify=True):
         from .stop_request import StopRequest
+        from .job import Job
+        from .notification import NOTIFY_RESIDENT_JOB
         sr = StopRequest(route_id=route.route_id, resident_id=self.id, quantity=quantity, notes=notes)
         db.session.add(sr)
+        if notify:
+            Job.enqueue(NOTIFY_RESIDENT_JOB, {
+                'resident_id': self.id,
+                'route_id': route.route_id,
+                'message': f"Stop requested on {route.street.name} by {self.name}. Notes: {notes}",
+            })
         db.session.commit()
         return sr
     
@@ -37,6 +56,15 @@ class Resident(User):
     def view_driver_status_and_location(self, driver):
         return {"status": driver.status, "location": driver.location}
     
+    @classmethod
+    def json_select(cls):
+        from .street import Street
+        return (
+            super().json_select()
+            .add_columns(cls.street_id.label('street_id'), Street.name.label('street_name'))
+            .outerjoin(Street, Street.street_id == cls.street_id)
+        )
+    
     def get_json(self):
         data = super().get_json()
         data.update({
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from . import db
 
+DEFAULT_ROUTE_MINUTES = 60
+
 class Route(db.Model):
     __tablename__ = "routes"
     
@@ -9,12 +11,39 @@ class Route(db.Model):
     street_id = db.Column(db.Integer, db.ForeignKey("streets.street_id"), nullable=False)
     scheduled_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(50), default="scheduled")
+    # how long the driver is booked from scheduled_time, in minutes
+    duration = db.Column(db.Integer, nullable=False, default=DEFAULT_ROUTE_MINUTES, server_default=str(DEFAULT_ROUTE_MINUTES))
     
     # relationships
-    driver = db.relationship("Driver", back_populates="routes")
-    street = db.relationship("Street", back_populates="routes")
+    # a route is always shown with its driver and street, so both are joined in
+    driver = db.relationship("Driver", back_populates="routes", lazy="joined")
+    street = db.relationship("Street", back_populates="routes", lazy="joined")
     stop_requests = db.relationship("StopRequest", back_populates="route", cascade="all, delete-orphan")
-    notifications = db.relationship("Notification", back_populates="route", cascade="all, delete-orphan")
+    # one row per resident of the street; never lazy load it
+    notifications = db.relationship("Notification", back_populates="route", cascade="all, delete-orphan", lazy="raise_on_sql")
+    alerts = db.relationship("RouteAlert", back_populates="route", cascade="all, delete-orphan", lazy="raise_on_sql")
+    
+    __table_args__ = (
+        # a driver's schedule / active routes, and a street's upcoming visits
+        db.Index("ix_routes_driver_scheduled", "driver_id", "scheduled_time"),
+        db.Index("ix_routes_street_scheduled", "street_id", "scheduled_time"),
+    )
+    
+    @property
+    def end_time(self):
+        return self.scheduled_time + timedelta(minutes=self.duration or DEFAULT_ROUTE_MINUTES)
+    
+    def get_json(self):
+        return {
+            'route_id': self.route_id,
+            'driver_id': self.driver_id,
+            'driver_name': self.driver.name if self.driver else None,
+            'street_id': self.street_id,
+            'street_name': self.street.name if self.street else None,
+            'scheduled_time': self.scheduled_time.isoformat(),
+            'duration': self.duration,
+            'status': self.status
+        }
     
     def __repr__(self):
         return f"<Route id={self.route_id} driver={self.driver_id} street={self.street_id} status={self.status}>"
\ No newline at end of file
@@ -0,0 +1,20 @@
+from datetime import datetime
+from . import db
+
+class RouteAlert(db.Model):
+    """A proximity alert already sent for a route.
+
+    The primary key makes each (route, threshold) alert fire once, even when
+    several workers see the driver cross the same geofence.
+    """
+    __tablename__ = "route_alerts"
+    
+    route_id = db.Column(db.Integer, db.ForeignKey("routes.route_id"), primary_key=True)
+    threshold_minutes = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # relationships
+    route = db.relationship("Route", back_populates="alerts")
+    
+    def __repr__(self):
+        return f"<RouteAlert route={self.route_id} threshold={self.threshold_minutes}>"
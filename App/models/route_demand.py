@@ -0,0 +1,131 @@
+from sqlalchemy import event, inspect
+
+from App.database import upsert_insert
+from . import db
+from .route import Route
+from .stop_request import StopRequest
+
+class RouteDemand(db.Model):
+    """Stop request totals per route and status, kept in step with stop_requests.
+
+    Mapper events on StopRequest apply +1/-1 deltas in the same flush as the
+    change, so every ORM insert, status change and delete (cascades
+    included) is reflected. Bulk Core writes bypass them; run rebuild()
+    afterwards, as the dataset generator does.
+    """
+    __tablename__ = "route_demand"
+    
+    route_id = db.Column(db.Integer, db.ForeignKey("routes.route_id", ondelete="CASCADE"), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    # unspecified quantities count as 0
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def apply(cls, connection, route_id, status, requests, quantity):
+        """Add deltas to one (route, status) row, creating it if needed."""
+        table = cls.__table__
+        insert = upsert_insert(table, connection)
+        row = {'route_id': route_id, 'status': status, 'requests': requests, 'quantity': quantity}
+        if insert is not None:
+            connection.execute(insert.values(row).on_conflict_do_update(
+                index_elements=[table.c.route_id, table.c.status],
+                set_={
+                    'requests': table.c.requests + insert.excluded.requests,
+                    'quantity': table.c.quantity + insert.excluded.quantity,
+                },
+            ))
+            return
+        updated = connection.execute(
+            table.update()
+            .where(table.c.route_id == route_id, table.c.status == status)
+            .values(requests=table.c.requests + requests, quantity=table.c.quantity + quantity)
+        ).rowcount
+        if not updated:
+            connection.execute(table.insert().values(row))
+    
+    @classmethod
+    def expected(cls):
+        """The summary as recomputed from stop_requests."""
+        requests = StopRequest.__table__
+        return (
+            db.select(
+                requests.c.route_id,
+                requests.c.status,
+                db.func.count().label("requests"),
+                db.func.coalesce(db.func.sum(requests.c.quantity), 0).label("quantity"),
+            )
+            .group_by(requests.c.route_id, requests.c.status)
+        )
+    
+    @classmethod
+    def rebuild(cls, connection=None):
+        """Recompute every row from stop_requests; returns rows written. Caller commits.
+
+        Runs on the session unless a connection is given (migrations pass theirs).
+        """
+        table = cls.__table__
+        executor = db.session if connection is None else connection
+        executor.execute(table.delete())
+        return executor.execute(
+            table.insert().from_select(["route_id", "status", "requests", "quantity"], cls.expected())
+        ).rowcount
+    
+    @classmethod
+    def verify(cls):
+        """[(route_id, status, (requests, quantity) expected, found)] for every row that disagrees."""
+        table = cls.__table__
+        expected = {(r.route_id, r.status): (r.requests, r.quantity) for r in db.session.execute(cls.expected())}
+        found = {
+            (r.route_id, r.status): (r.requests, r.quantity)
+            for r in db.session.execute(db.select(table.c.route_id, table.c.status, table.c.requests, table.c.quantity))
+            # rows decremented to zero are the same as missing ones
+            if r.requests or r.quantity
+        }
+        return [
+            (route_id, status, expected.get((route_id, status)), found.get((route_id, status)))
+            for route_id, status in sorted(expected.keys() | found.keys(), key=lambda key: (key[0], str(key[1])))
+            if expected.get((route_id, status)) != found.get((route_id, status))
+        ]
+    
+    def __repr__(self):
+        return f"<RouteDemand route={self.route_id} status={self.status} requests={self.requests} quantity={self.quantity}>"
+
+
+def _key(stop_request, attribute):
+    # (old, new) value of an attribute from the flush's history
+    history = inspect(stop_request).attrs[attribute].history
+    new = getattr(stop_request, attribute)
+    old = history.deleted[0] if history.deleted else new
+    return old, new
+
+
+@event.listens_for(StopRequest, "after_insert")
+def _demand_after_insert(mapper, connection, stop_request):
+    RouteDemand.apply(connection, stop_request.route_id, stop_request.status, 1, stop_request.quantity or 0)
+
+
+@event.listens_for(StopRequest, "after_update")
+def _demand_after_update(mapper, connection, stop_request):
+    old_route, new_route = _key(stop_request, "route_id")
+    old_status, new_status = _key(stop_request, "status")
+    old_quantity, new_quantity = _key(stop_request, "quantity")
+    if (old_route, old_status, old_quantity) == (new_route, new_status, new_quantity):
+        return
+    RouteDemand.apply(connection, old_route, old_status, -1, -(old_quantity or 0))
+    RouteDemand.apply(connection, new_route, new_status, 1, new_quantity or 0)
+
+
+@event.listens_for(StopRequest, "after_delete")
+def _demand_after_delete(mapper, connection, stop_request):
+    route_id, _ = _key(stop_request, "route_id")
+    status, _ = _key(stop_request, "status")
+    quantity, _ = _key(stop_request, "quantity")
+    RouteDemand.apply(connection, route_id, status, -1, -(quantity or 0))
+
+
+@event.listens_for(Route, "after_delete")
+def _demand_route_deleted(mapper, connection, route):
+    # SQLite doesn't enforce ON DELETE CASCADE unless foreign keys are on
+    table = RouteDemand.__table__
+    connection.execute(table.delete().where(table.c.route_id == route.route_id))
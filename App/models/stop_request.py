@@ -5,10 +5,12 @@ class StopRequest(db.Model):
     __tablename__ = "stop_requests"
     
     request_id = db.Column(db.Integer, primary_key=True)
-    status = db.Column(db.String(50), default="requested")
-    route_id = db.Column(db.Integer, db.ForeignKey("routes.route_id"), nullable=False)
+    # active_history keeps the old values of the columns route_demand is
+    # keyed on, so an update can move the request between summary rows
+    status = db.column_property(db.Column(db.String(50), default="requested"), active_history=True)
+    route_id = db.column_property(db.Column(db.Integer, db.ForeignKey("routes.route_id"), nullable=False), active_history=True)
     resident_id = db.Column(db.Integer, db.ForeignKey("residents.id"), nullable=False)
-    quantity = db.Column(db.Integer, nullable=True)
+    quantity = db.column_property(db.Column(db.Integer, nullable=True), active_history=True)
     notes = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -16,5 +18,15 @@ class StopRequest(db.Model):
     resident = db.relationship("Resident", back_populates="stop_requests")
     route = db.relationship("Route", back_populates="stop_requests")
     
+    __table_args__ = (
+        # loading sheets (route's requests by status) and a resident's history
+        db.Index("ix_stop_requests_route_status", "route_id", "status"),
+        db.Index("ix_stop_requests_resident_created", "resident_id", "created_at"),
+    )
+    
+    def confirm(self):
+        self.status = "confirmed"
+        db.session.commit()
+    
     def __repr__(self):
         return f"<StopRequest id={self.request_id} route={self.route_id} resident={self.resident_id}>"
\ No newline at end of file
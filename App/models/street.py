@@ -5,10 +5,22 @@ class Street(db.Model):
     
     street_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
+    # a representative point (e.g. the middle of the street)
+    lat = db.Column(db.Float, nullable=True)
+    lon = db.Column(db.Float, nullable=True)
     
     # relationships
-    residents = db.relationship("Resident", back_populates="street", cascade="all, delete-orphan")
-    routes = db.relationship("Route", back_populates="street", cascade="all, delete-orphan")
+    # both grow without bound; query them with filters instead of lazy loading
+    residents = db.relationship("Resident", back_populates="street", cascade="all, delete-orphan", lazy="raise_on_sql")
+    routes = db.relationship("Route", back_populates="street", cascade="all, delete-orphan", lazy="raise_on_sql")
+    
+    def get_json(self):
+        return {
+            'street_id': self.street_id,
+            'name': self.name,
+            'lat': self.lat,
+            'lon': self.lon
+        }
     
     def __repr__(self):
         return f"<Street id={self.street_id} name={self.name}>"
\ No newline at end of file
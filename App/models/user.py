@@ -1,4 +1,4 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+from App.hashing import get_password_hasher
 from . import db
 
 class User(db.Model):
@@ -24,11 +24,30 @@ class User(db.Model):
     
     def set_password(self, password):
         """Create hashed password."""
-        self.password = generate_password_hash(password)
+        self.password = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Check hashed password."""
-        return check_password_hash(self.password, password)
+        return get_password_hasher().check(self.password, password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash predates the configured hash method."""
+        return get_password_hasher().needs_rehash(self.password)
+    
+    @classmethod
+    def json_select(cls):
+        """SELECT of get_json's fields as labelled columns, for listings.
+
+        The rows serialise straight to JSON objects (see App.serialization)
+        without building model instances.
+        """
+        return db.select(
+            cls.id.label('id'),
+            cls.username.label('username'),
+            cls.name.label('name'),
+            cls.contact.label('contact'),
+            cls.user_type.label('user_type'),
+        ).select_from(cls)
     
     def get_json(self):
         return {
@@ -0,0 +1,98 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Row, RowMapping
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def to_json(o):
+    """The default= hook shared by both encoders, so they produce the same JSON.
+
+    Dates and times are ISO 8601 (Flask's own provider sends RFC 822 dates),
+    result rows become objects keyed by their column labels, and models are
+    encoded through their get_json().
+    """
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Row):
+        return o._asdict()
+    if isinstance(o, RowMapping):
+        return dict(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if callable(getattr(o, 'get_json', None)):
+        return o.get_json()
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed.
+
+    Falls back to the stdlib json module with the same rules (see to_json)
+    when orjson is missing or was not asked for. Keys are not sorted and
+    output is compact outside debug mode. jsonify() responses are encoded
+    straight to bytes, skipping the str round trip.
+    """
+
+    sort_keys = False
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        if backend is None:
+            backend = 'orjson' if orjson is not None else 'json'
+        if backend == 'orjson' and orjson is None:
+            app.logger.warning("JSON_BACKEND is orjson but it is not installed; using json")
+            backend = 'json'
+        self.backend = backend
+
+    def _orjson_options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self._indent():
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps(self, obj, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.dumps(obj, default=to_json, option=self._orjson_options()).decode()
+        kwargs.setdefault('default', to_json)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.backend == 'orjson':
+            body = orjson.dumps(obj, default=to_json, option=self._orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        elif self._indent():
+            body = self.dumps(obj, indent=2) + "\n"
+        else:
+            body = self.dumps(obj, separators=(",", ":")) + "\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def setup_json(app):
+    provider = FastJSONProvider(app, backend=app.config.get('JSON_BACKEND'))
+    app.json = provider
+    return provider
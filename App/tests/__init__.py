@@ -1 +1,25 @@
-from .test_app import *
\ No newline at end of file
+from .test_app import *
+from .test_routes import *
+from .test_drivers import *
+from .test_users import *
+from .test_notifications import *
+from .test_auth import *
+from .test_query_plans import *
+from .test_config import *
+from .test_dataset import *
+from .test_benchmarks import *
+from .test_instrumentation import *
+from .test_loading import *
+from .test_geo import *
+from .test_geofence import *
+from .test_jobs import *
+from .test_demand import *
+from .test_dashboard import *
+from .test_versions import *
+from .test_serialization import *
+from .test_startup import *
+from .test_cooperative import *
+from .test_admin import *
+from .test_bulk_import import *
+from .test_migrations import *
+from .test_events import *
\ No newline at end of file
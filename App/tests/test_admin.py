@@ -0,0 +1,207 @@
+import html, re
+import pytest, unittest
+from datetime import datetime
+
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import User, Driver, Resident, Street, Route, StopRequest, Notification
+from App.views.admin import ADMIN_VIEWS, TableCounts, encode_cursor
+
+ROW_ID = re.compile(r'name="rowid" class="action-checkbox" value="([^"]+)"')
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'ADMIN_COUNT_CACHE_SECONDS': 0})
+    create_db()
+    street = Street(name="Admin Street")
+    driver = Driver("admin_driver", "pass", "Admin Driver")
+    db.session.add_all([street, driver])
+    db.session.flush()
+    residents = [Resident(f"admin_resident_{i:02}", "pass", f"Admin Resident {i}", street) for i in range(25)]
+    route = Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime(2025, 3, 3, 8))
+    db.session.add_all(residents + [route])
+    db.session.flush()
+    db.session.add_all([StopRequest(route_id=route.route_id, resident_id=resident.id, quantity=1) for resident in residents])
+    db.session.commit()
+    yield app.test_client()
+    db.drop_all()
+
+
+def _indexed(table):
+    # columns a lookup or ORDER BY can start an index scan on
+    columns = {index.columns.values()[0] for index in table.indexes}
+    columns.update(column for column in table.columns if column.primary_key or column.unique)
+    return columns
+
+
+class AdminViewUnitTests(unittest.TestCase):
+
+    def test_sort_and_filter_columns_are_indexed(self):
+        admin = current_app.extensions['admin'][0]
+        views = {type(view): view for view in admin._views if hasattr(view, 'model')}
+        for view_class, model in ADMIN_VIEWS:
+            view = views[view_class]
+            for name, column in view._sortable_columns.items():
+                column = getattr(column, 'expression', column)
+                assert column in _indexed(column.table), f"{view_class.__name__} sorts on {name}"
+            for flt in view._filters:
+                assert flt.column.expression in _indexed(flt.column.table), f"{view_class.__name__} filters on {flt.name}"
+
+    def test_cursor_round_trip(self):
+        view = next(view for view in current_app.extensions['admin'][0]._views if getattr(view, 'model', None) is Route)
+        columns = view._key_columns(None)
+        assert len(columns) == 1
+        assert view._key_values(db.session.scalars(db.select(Route)).first(), columns) == [1]
+        assert encode_cursor([1]) == "WzFd"
+
+
+class AdminListIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        driver = db.session.scalars(db.select(Driver).filter_by(username="admin_driver")).one()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=driver)}'}
+        self.statements = []
+
+    def _count(self, *args):
+        self.statements.append(args[2])
+
+    def _get(self, url):
+        event.listen(db.engine, "before_cursor_execute", self._count)
+        try:
+            response = current_app.test_client().get(url, headers=self.headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", self._count)
+        assert response.status_code == 200
+        return response.get_data(as_text=True)
+
+    def _link(self, body, arg):
+        links = re.findall(rf'href="([^"]*{arg}=[^"]*)"', body)
+        return html.unescape(links[0]) if links else None
+
+    def test_keyset_pages_follow_the_sort(self):
+        expected = [str(i) for i in db.session.scalars(db.select(User.id).order_by(User.username.desc(), User.id.desc()))]
+        pages, url = [], "/admin/user/?sort=1&desc=1&page_size=10"
+        while url:
+            body = self._get(url)
+            pages.append(ROW_ID.findall(body))
+            url = self._link(body, 'after')
+        assert sum(pages, []) == expected
+        assert [len(page) for page in pages] == [10, 10, 6]
+        # back from the last page
+        assert ROW_ID.findall(self._get(self._link(body, 'before'))) == pages[1]
+
+    def test_page_cost_does_not_grow(self):
+        first = self._get("/admin/stoprequest/?page_size=5")
+        first_statements = len(self.statements)
+        self.statements.clear()
+        self._get(f"/admin/stoprequest/?page_size=5&page=4&after={encode_cursor([20])}")
+        assert len(self.statements) == first_statements
+        # the residents' names come with the list query
+        assert "Admin Resident 0" in first
+        assert len([s for s in self.statements if "stop_requests.request_id" in s]) == 1
+
+    def test_bad_cursor_serves_first_page(self):
+        first = ROW_ID.findall(self._get("/admin/stoprequest/?page_size=5"))
+        assert ROW_ID.findall(self._get("/admin/stoprequest/?page_size=5&page=3&after=not-a-cursor")) == first
+        assert ROW_ID.findall(self._get(f"/admin/stoprequest/?page_size=5&page=3&after={encode_cursor([[1]])}")) == first
+
+    def test_filter_on_indexed_column(self):
+        route_id = db.session.scalars(db.select(Route.route_id)).first()
+        assert len(ROW_ID.findall(self._get(f"/admin/stoprequest/?flt0_0={route_id}"))) == 25
+        assert ROW_ID.findall(self._get(f"/admin/stoprequest/?flt0_0={route_id + 1}")) == []
+
+    def test_every_model_lists(self):
+        for name in ('user', 'driver', 'resident', 'street', 'route', 'stoprequest', 'notification'):
+            self._get(f"/admin/{name}/")
+
+
+class AdminFormIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        driver = db.session.scalars(db.select(Driver).filter_by(username="admin_driver")).one()
+        self.client = current_app.test_client()
+        self.client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {create_access_token(identity=driver)}'
+
+    def _resident(self, username):
+        db.session.expire_all()
+        return db.session.scalars(db.select(Resident).filter_by(username=username)).one()
+
+    def test_notification_edits_keep_unread_counts(self):
+        first, second = self._resident("admin_resident_00"), self._resident("admin_resident_01")
+        route_id = db.session.scalars(db.select(Route.route_id)).first()
+        data = {'message': "Admin says hi", 'resident': first.id, 'route': route_id, 'timestamp': "2025-03-03 08:00:00"}
+        assert self.client.post("/admin/notification/new/", data=data).status_code == 302
+        notification = db.session.scalars(db.select(Notification).filter_by(message="Admin says hi")).one()
+        assert self._resident("admin_resident_00").unread_count == 1
+
+        # moved to another resident, then read
+        url = f"/admin/notification/edit/?id={notification.notification_id}"
+        assert self.client.post(url, data=dict(data, resident=second.id)).status_code == 302
+        assert (self._resident("admin_resident_00").unread_count, self._resident("admin_resident_01").unread_count) == (0, 1)
+        assert self.client.post(url, data=dict(data, resident=second.id, is_read='y')).status_code == 302
+        assert self._resident("admin_resident_01").unread_count == 0
+
+        assert self.client.post(url, data=dict(data, resident=second.id)).status_code == 302
+        assert self._resident("admin_resident_01").unread_count == 1
+        response = self.client.post("/admin/notification/delete/", data={'id': notification.notification_id})
+        assert response.status_code == 302
+        assert db.session.get(Notification, notification.notification_id) is None
+        assert self._resident("admin_resident_01").unread_count == 0
+
+    def test_route_and_street_deletes_keep_unread_counts(self):
+        resident = self._resident("admin_resident_03")
+        driver = db.session.scalars(db.select(Driver).filter_by(username="admin_driver")).one()
+        street = Street(name="Admin Deleted Street")
+        db.session.add(street)
+        db.session.flush()
+        # routes elsewhere can still notify this resident (e.g. a stop request)
+        routes = [
+            Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime(2025, 4, day, 8))
+            for day in (1, 2)
+        ]
+        db.session.add_all(routes)
+        db.session.flush()
+        for route in routes:
+            Notification.notify(resident.id, route.route_id, "Elsewhere")
+            Notification.notify(resident.id, route.route_id, "Elsewhere again")
+        db.session.commit()
+        assert self._resident("admin_resident_03").unread_count == 4
+
+        assert self.client.post("/admin/route/delete/", data={'id': routes[0].route_id}).status_code == 302
+        assert self._resident("admin_resident_03").unread_count == 2
+        assert self.client.post("/admin/street/delete/", data={'id': street.street_id}).status_code == 302
+        assert db.session.get(Street, street.street_id) is None
+        assert self._resident("admin_resident_03").unread_count == 0
+
+    def test_accounts_cannot_be_created_or_retyped(self):
+        for name in ('user', 'driver', 'resident'):
+            assert self.client.get(f"/admin/{name}/new/").status_code == 302
+        resident = self._resident("admin_resident_02")
+        body = self.client.get(f"/admin/resident/edit/?id={resident.id}").get_data(as_text=True)
+        assert 'name="name"' in body and 'name="user_type"' not in body
+
+
+class TableCountsIntegrationTests(unittest.TestCase):
+
+    def test_exact_then_bounded_then_estimated(self):
+        assert TableCounts(limit=100).label(StopRequest) == "25"
+        assert TableCounts(limit=10).label(StopRequest) == "10+"
+        db.session.execute(db.text("ANALYZE"))
+        assert TableCounts(limit=10).label(StopRequest) == "~25"
+        db.session.execute(db.text("DROP TABLE sqlite_stat1"))
+        db.session.commit()
+
+    def test_cached(self):
+        counts = TableCounts(ttl=60, limit=100)
+        assert counts.label(Street) == "1"
+        db.session.add(Street(name="Admin Counted Street"))
+        db.session.flush()
+        assert counts.label(Street) == "1"
+        counts.clear()
+        assert counts.label(Street) == "2"
+        db.session.rollback()
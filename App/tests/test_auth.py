@@ -0,0 +1,150 @@
+import pytest, unittest
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db, create_db
+from App.hashing import PasswordHasher, get_password_hasher
+from App.models import Driver, Resident, Street
+from App.controllers import login, get_cached_user, update_user, setup_user_cache, UserIdentityCache
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 2,
+    })
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class PasswordHasherUnitTests(unittest.TestCase):
+
+    def test_pool_round_trip(self):
+        hasher = PasswordHasher("pbkdf2:sha256:1000", workers=2)
+        pwhash = hasher.hash("mypass")
+        assert pwhash.startswith("pbkdf2:sha256:1000$")
+        assert hasher.check(pwhash, "mypass")
+        assert not hasher.check(pwhash, "wrong")
+
+    def test_inline_and_rehash_detection(self):
+        hasher = PasswordHasher("pbkdf2:sha256:1000", workers=0)
+        assert not hasher.needs_rehash(hasher.hash("mypass"))
+        assert hasher.needs_rehash(PasswordHasher("pbkdf2:sha256:2000", workers=0).hash("mypass"))
+
+    def test_counters_from_many_threads(self):
+        hasher = PasswordHasher("pbkdf2:sha256:1", workers=2)
+        pwhash = hasher.hash("mypass")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: hasher.check(pwhash, "mypass"), range(200)))
+            list(pool.map(lambda _: hasher.hash_many(["a", "b"]), range(50)))
+        assert hasher.stats() == {'workers': 2, 'hashes': 101, 'checks': 200}
+
+
+class LoginIntegrationTests(unittest.TestCase):
+
+    def test_login_rehashes_when_parameters_change(self):
+        user = Resident("rehash_me", "secret", "Rehash Me", Street(name="Hash Street"))
+        db.session.add(user)
+        db.session.commit()
+        original = get_password_hasher()
+        assert original is current_app.extensions['password_hasher']
+
+        stronger = PasswordHasher("pbkdf2:sha256:2000", workers=2)
+        current_app.extensions['password_hasher'] = stronger
+        try:
+            assert login("rehash_me", "wrong") is None
+            assert user.password.startswith("pbkdf2:sha256:1000$")
+            assert login("rehash_me", "secret") is not None
+            db.session.refresh(user)
+            assert user.password.startswith("pbkdf2:sha256:2000$")
+            assert login("rehash_me", "secret") is not None
+        finally:
+            current_app.extensions['password_hasher'] = original
+
+
+class UserIdentityCacheUnitTests(unittest.TestCase):
+
+    def test_ttl_and_lru_eviction(self):
+        now = [0.0]
+        cache = UserIdentityCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.put(1, "a")
+        cache.put(2, "b")
+        assert cache.get(1) == "a"
+        cache.put(3, "c")
+        assert cache.get(2) is None
+        now[0] = 11
+        assert cache.get(1) is None
+
+
+class UserIdentityCacheIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+        current_app.extensions['user_cache'].clear()
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_lookups_are_cached_within_and_across_requests(self):
+        user = Resident("cached_user", "secret", "Cached User", Street(name="Cache Street"))
+        db.session.add(user)
+        db.session.commit()
+        user_id, street_id = user.id, user.street_id
+        self.statements.clear()
+        with current_app.app_context(), current_app.test_request_context():
+            first = get_cached_user(user_id)
+            assert get_cached_user(user_id) is first
+            assert first.street_id == street_id
+        assert len(self.statements) == 1
+        with current_app.app_context(), current_app.test_request_context():
+            assert get_cached_user(user_id).username == "cached_user"
+        assert len(self.statements) == 1
+
+    def test_update_user_invalidates(self):
+        user = Resident("rename_me", "secret", "Rename Me", Street(name="Rename Street"))
+        db.session.add(user)
+        db.session.commit()
+        with current_app.app_context(), current_app.test_request_context():
+            assert get_cached_user(user.id).username == "rename_me"
+        update_user(user.id, "renamed")
+        with current_app.app_context(), current_app.test_request_context():
+            assert get_cached_user(user.id).username == "renamed"
+
+    def test_setting_up_another_app_adds_no_session_listeners(self):
+        listeners = len(db.session().dispatch.after_flush)
+        other = Flask("other")
+        setup_user_cache(other)
+        assert len(db.session().dispatch.after_flush) == listeners
+
+        # writes only evict from the cache of the app they run in
+        user = Resident("other_app_user", "secret", "Other App", Street(name="Other App Street"))
+        db.session.add(user)
+        db.session.commit()
+        other.extensions['user_cache'].put(user.id, "cached elsewhere")
+        update_user(user.id, "other_app_renamed")
+        assert other.extensions['user_cache'].get(user.id) == "cached elsewhere"
+
+    def test_pages_reuse_verified_identity(self):
+        driver = Driver("page_driver", "secret", "Page Driver")
+        db.session.add(driver)
+        db.session.commit()
+        client = current_app.test_client()
+        token = create_access_token(identity=str(driver.id))
+        # separate app contexts so each request gets its own g
+        with current_app.app_context():
+            page = client.get("/", headers={"Authorization": f"Bearer {token}"})
+            assert b"Welcome page_driver" in page.data
+        with current_app.app_context():
+            anonymous = client.get("/", headers={"Authorization": "Bearer not-a-token"})
+            assert anonymous.status_code == 200 and b"Welcome" not in anonymous.data
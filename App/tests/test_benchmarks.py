@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks.suite import compare, percentile
+
+
+class BenchmarkSuiteUnitTests(unittest.TestCase):
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 51
+        assert percentile(samples, 99) == 99
+        assert percentile([3.0], 95) == 3.0
+
+    def test_compare_flags_only_real_regressions(self):
+        baseline = {
+            "inbox@1": {"p50_ms": 10.0, "p95_ms": 20.0, "statements": 2.0, "peak_kb": 100.0},
+            "login@1": {"p50_ms": 0.1, "p95_ms": 0.2, "statements": 1.0, "peak_kb": 10.0},
+        }
+        results = {
+            "inbox@1": {"p50_ms": 11.0, "p95_ms": 30.0, "statements": 3.0, "peak_kb": 110.0},
+            # large relative changes inside the noise floor are ignored
+            "login@1": {"p50_ms": 0.3, "p95_ms": 0.9, "statements": 1.0, "peak_kb": 40.0},
+            "new@1": {"p50_ms": 1.0, "p95_ms": 1.0, "statements": 1.0, "peak_kb": 1.0},
+        }
+        assert compare(results, baseline, 0.2) == [
+            "inbox@1: p95_ms 20.00 -> 30.00",
+            "inbox@1: statements 2.00 -> 3.00",
+        ]
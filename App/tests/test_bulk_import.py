@@ -0,0 +1,163 @@
+import io, json
+import pytest, unittest
+from datetime import datetime
+from unittest import mock
+
+from flask import current_app
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import User, Driver, Resident, Street, Route, StopRequest
+from App.controllers import (
+    read_import_rows,
+    import_rows,
+    ImportRowError,
+    StreetImporter,
+    get_route_demand,
+    login
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+    create_db()
+    street = Street(name="Import Street")
+    driver = Driver("import_driver", "pass", "Import Driver")
+    db.session.add_all([street, driver])
+    db.session.flush()
+    db.session.add_all([
+        Resident("import_resident", "pass", "Import Resident", street),
+        Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime(2025, 3, 3, 8)),
+    ])
+    db.session.commit()
+    yield app.test_client()
+    db.drop_all()
+
+
+def csv_rows(text):
+    return read_import_rows(io.BytesIO(text.encode()), 'csv')
+
+
+def jsonl_rows(*rows):
+    return read_import_rows(io.BytesIO(b"".join(json.dumps(row).encode() + b"\n" for row in rows)), 'jsonl')
+
+
+class ImportReaderUnitTests(unittest.TestCase):
+
+    def test_csv_rows_keep_their_line_numbers(self):
+        text = '\ufeffname,lat\n"Two\nLines",1\nx,1,extra\n'
+        rows = list(read_import_rows(io.BytesIO(text.encode() + b"bad \xff,2\nlast,3\n"), 'csv'))
+        assert rows[0] == (3, {'name': "Two\nLines", 'lat': "1"})
+        assert rows[1][0] == 4 and isinstance(rows[1][1], ImportRowError)
+        assert rows[2][0] == 5 and "UTF-8" in str(rows[2][1])
+        assert rows[3] == (6, {'name': "last", 'lat': "3"})
+
+    def test_jsonl_bad_lines_are_row_errors(self):
+        stream = io.BytesIO(b'{"name": "a"}\n\n[1]\n{oops\n{"name": "b"}\n')
+        rows = list(read_import_rows(stream, 'jsonl'))
+        assert [line for line, _ in rows] == [1, 3, 4, 5]
+        assert isinstance(rows[1][1], ImportRowError) and isinstance(rows[2][1], ImportRowError)
+        assert rows[3] == (5, {'name': "b"})
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            read_import_rows(io.BytesIO(b""), 'xml')
+
+
+class BulkImportIntegrationTests(unittest.TestCase):
+
+    def test_streets(self):
+        summary = import_rows('streets', csv_rows(
+            "name,lat,lon\nImported Avenue,10.6,-61.5\nImport Street,,\nImported Avenue,,\nHalf Street,10.6,\n"
+        ))
+        assert (summary['rows'], summary['imported'], summary['rejected']) == (4, 1, 3)
+        assert [error['line'] for error in summary['errors']] == [3, 4, 5]
+        street = db.session.scalars(db.select(Street).filter_by(name="Imported Avenue")).one()
+        assert (street.lat, street.lon) == (10.6, -61.5)
+
+    def test_residents_in_chunks(self):
+        rows = [
+            {'username': f"bulk{i}", 'password': f"secret{i}", 'name': f"Bulk {i}", 'street': "Import Street"}
+            for i in range(25)
+        ] + [
+            {'username': "bulk3", 'password': "x", 'name': "Again", 'street': "Import Street"},
+            {'username': "import_resident", 'password': "x", 'name': "Taken", 'street': "Import Street"},
+            {'username': "lost", 'password': "x", 'name': "Lost", 'street': "Nowhere Street"},
+            {'username': "nopass", 'name': "No Password", 'street': "Import Street"},
+        ]
+        lines = []
+        summary = import_rows('residents', jsonl_rows(*rows), chunk_size=10, report=lines.append)
+        assert (summary['imported'], summary['rejected']) == (25, 4)
+        assert len(lines) == 3 and summary['rows_per_second'] > 0
+        assert [error['line'] for error in summary['errors']] == [26, 27, 28, 29]
+        resident = db.session.scalars(db.select(Resident).filter_by(username="bulk7")).one()
+        assert resident.street.name == "Import Street" and resident.unread_count == 0
+        assert login("bulk7", "secret7") is not None
+
+    def test_passwords_keep_their_spaces(self):
+        summary = import_rows('residents', csv_rows(
+            "username,password,name,street\nspaced, pass word ,Spaced,Import Street\nblank,   ,Blank,Import Street\n"
+        ))
+        assert (summary['imported'], summary['rejected']) == (2, 0)
+        assert login("spaced", " pass word ") is not None
+        assert login("spaced", "pass word") is None
+
+    def test_stop_requests_update_demand(self):
+        route_id = db.session.scalars(db.select(Route.route_id)).first()
+        resident_id = db.session.scalars(db.select(Resident.id).filter_by(username="import_resident")).one()
+        before = get_route_demand(route_id)['quantity']
+        summary = import_rows('stop_requests', csv_rows(
+            "route_id,resident,resident_id,quantity,status,notes\n"
+            f"{route_id},import_resident,,3,,wholemeal\n"
+            f"{route_id},,{resident_id},2,confirmed,\n"
+            f"{route_id},,{resident_id},,cancelled,\n"
+            f"{route_id + 99},import_resident,,1,,\n"
+            f"{route_id},import_resident,,0,,\n"
+            f"{route_id},import_resident,,1,lost,\n"
+        ))
+        assert (summary['imported'], summary['rejected']) == (3, 3)
+        assert get_route_demand(route_id)['quantity'] == before + 5
+        assert db.session.scalars(db.select(StopRequest).filter_by(notes="wholemeal")).one().status == "requested"
+
+    def test_chunk_refused_by_the_database_is_retried_per_row(self):
+        # a name the checks missed, as if another session inserted it meanwhile
+        with mock.patch.object(StreetImporter, 'check', lambda self, parsed, reject: parsed):
+            summary = import_rows('streets', csv_rows("name\nRetry Lane\nImport Street\nRetry Close\n"))
+        assert (summary['imported'], summary['rejected']) == (2, 1)
+        assert summary['errors'][0]['line'] == 3
+        assert db.session.scalar(db.select(db.func.count()).where(Street.name.like("Retry %"))) == 2
+
+
+class ImportViewIntegrationTests(unittest.TestCase):
+
+    def _headers(self, username, content_type='text/csv'):
+        user = db.session.scalars(db.select(User).filter_by(username=username)).one()
+        return {'Authorization': f'Bearer {create_access_token(identity=user)}', 'Content-Type': content_type}
+
+    def test_import_over_http(self):
+        client = current_app.test_client()
+        response = client.post(
+            '/api/import/streets', headers=self._headers("import_driver"),
+            data=b"name,lat,lon\nPosted Road,10.6,-61.5\nPosted Road,,\n",
+        )
+        assert response.status_code == 200
+        assert (response.json['imported'], response.json['rejected']) == (1, 1)
+
+        response = client.post(
+            '/api/import/stop-requests?format=jsonl', headers=self._headers("import_driver", 'application/octet-stream'),
+            data=json.dumps({'route_id': 1, 'resident': "import_resident"}),
+        )
+        assert response.status_code == 200 and response.json['imported'] == 1
+
+    def test_refused_requests(self):
+        client = current_app.test_client()
+        assert client.post('/api/import/streets', headers=self._headers("import_resident"), data=b"name\n").status_code == 403
+        assert client.post('/api/import/drivers', headers=self._headers("import_driver"), data=b"name\n").status_code == 404
+        headers = self._headers("import_driver", 'text/plain')
+        assert client.post('/api/import/streets', headers=headers, data=b"name\n").status_code == 415
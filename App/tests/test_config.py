@@ -0,0 +1,54 @@
+import os, pytest, tempfile, unittest
+
+from App.main import create_app
+from App.config import apply_engine_profile
+from App.database import db, create_db, TimedQueuePool
+from App.metrics import collect_metrics
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    path = os.path.join(tempfile.mkdtemp(), "profile.db")
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class EngineProfileUnitTests(unittest.TestCase):
+
+    def test_postgresql_pool_fits_all_workers(self):
+        config = {
+            'SQLALCHEMY_DATABASE_URI': 'postgresql://app@db/app',
+            'GUNICORN_WORKERS': 4,
+            'GUNICORN_WORKER_CONNECTIONS': 1000,
+            'DB_MAX_CONNECTIONS': 100,
+        }
+        apply_engine_profile(config)
+        options = config['SQLALCHEMY_ENGINE_OPTIONS']
+        assert config['DB_ENGINE_PROFILE'] == 'postgresql'
+        assert options['poolclass'] is TimedQueuePool and options['pool_pre_ping']
+        assert 4 * (options['pool_size'] + options['max_overflow']) <= 90
+
+    def test_explicit_options_win_and_none_disables(self):
+        config = {'SQLALCHEMY_DATABASE_URI': 'postgres://db/app', 'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 3}}
+        apply_engine_profile(config)
+        assert config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 3
+        config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'DB_ENGINE_PROFILE': 'none'}
+        apply_engine_profile(config)
+        assert 'SQLALCHEMY_ENGINE_OPTIONS' not in config
+
+
+class SqliteProfileIntegrationTests(unittest.TestCase):
+
+    def test_connect_pragmas_applied(self):
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+    def test_pool_wait_metrics(self):
+        with db.engine.connect():
+            pass
+        metrics = collect_metrics()['db_pool']
+        assert metrics['checkouts'] >= 1 and 'checked_out' in metrics
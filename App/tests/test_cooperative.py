@@ -0,0 +1,71 @@
+import os, pytest, tempfile, unittest
+
+from sqlalchemy.exc import IntegrityError
+
+from App.main import create_app
+from App.config import apply_engine_profile
+from App.cooperative import OffloadedSQLite, cooperative_enabled, gevent_patched
+from App.database import db, create_db
+from App.metrics import collect_metrics
+from App.models import Street
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    path = os.path.join(tempfile.mkdtemp(), "cooperative.db")
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'DB_COOPERATIVE': True})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class CooperativeProfileUnitTests(unittest.TestCase):
+
+    def test_auto_follows_gevent(self):
+        assert cooperative_enabled({}) == gevent_patched()
+        assert cooperative_enabled({'DB_COOPERATIVE': False}) is False
+
+    def test_sqlite_file_offloaded_and_pool_sized(self):
+        config = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db',
+            'DB_COOPERATIVE': True,
+            'DB_OFFLOAD_THREADS': 4,
+            'GUNICORN_WORKER_CONNECTIONS': 1000,
+        }
+        apply_engine_profile(config)
+        options = config['SQLALCHEMY_ENGINE_OPTIONS']
+        assert isinstance(options['module'], OffloadedSQLite) and options['module'].threads == 4
+        assert options['pool_size'] == 4
+        assert options['pool_size'] + options['max_overflow'] == 32
+
+    def test_memory_database_not_offloaded(self):
+        config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'DB_COOPERATIVE': True}
+        apply_engine_profile(config)
+        assert 'module' not in config['SQLALCHEMY_ENGINE_OPTIONS']
+        config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'DB_COOPERATIVE': False}
+        apply_engine_profile(config)
+        assert 'module' not in config['SQLALCHEMY_ENGINE_OPTIONS']
+
+
+class OffloadedSQLiteIntegrationTests(unittest.TestCase):
+
+    def test_queries_run_through_the_pool(self):
+        assert isinstance(db.engine.dialect.dbapi, OffloadedSQLite)
+        before = collect_metrics()['db_offload']['calls']
+        db.session.add_all([Street(name=f"Offloaded Street {i}") for i in range(3)])
+        db.session.commit()
+        names = db.session.scalars(db.select(Street.name).where(Street.name.like("Offloaded Street%")).order_by(Street.name)).all()
+        assert names == [f"Offloaded Street {i}" for i in range(3)]
+        assert collect_metrics()['db_offload']['calls'] > before
+
+    def test_pragmas_still_applied(self):
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    def test_driver_errors_propagate(self):
+        db.session.add(Street(name="Offloaded Duplicate"))
+        db.session.commit()
+        db.session.add(Street(name="Offloaded Duplicate"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
@@ -0,0 +1,99 @@
+import pytest, unittest
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Driver, Resident, Street
+from App.controllers import get_driver_dashboard
+
+MONDAY = datetime(2025, 3, 3, 8)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class DriverDashboardIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.streets = [Street(name=f"Dashboard {self._testMethodName} {i}") for i in range(2)]
+        db.session.add_all(self.streets)
+        db.session.flush()
+        self.residents = [
+            Resident(f"dash_{self._testMethodName}_{i}", "pass", f"Dash Resident {i}", self.streets[i % 2])
+            for i in range(4)
+        ]
+        self.driver = Driver(f"dash_driver_{self._testMethodName}", "pass", "Dash Driver")
+        db.session.add_all(self.residents + [self.driver])
+        db.session.commit()
+        self.driver_id = self.driver.id
+        self.statements = []
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def _schedule(self, days, requests_per_route):
+        for day in range(days):
+            for i, street in enumerate(self.streets):
+                route = self.driver.schedule_drive(street, MONDAY + timedelta(days=day, hours=4 * i), notify=False)
+                for resident in self.residents[:requests_per_route]:
+                    resident.request_stop(route, quantity=2, notify=False)
+
+    def _dashboard(self, *args):
+        self.statements.clear()
+        event.listen(db.engine, "before_cursor_execute", self._count)
+        try:
+            return get_driver_dashboard(self.driver_id, *args)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", self._count)
+
+    def test_payload_is_nested_and_windowed(self):
+        self._schedule(days=3, requests_per_route=2)
+        cancelled = self.residents[0].stop_requests[0]
+        self.residents[0].cancel_stop_request(cancelled)
+        dashboard = self._dashboard(MONDAY, MONDAY + timedelta(days=2))
+        assert dashboard['driver']['name'] == "Dash Driver"
+        routes = dashboard['routes']
+        assert len(routes) == 4
+        assert [route['scheduled_time'] for route in routes] == sorted(route['scheduled_time'] for route in routes)
+        first = routes[0]
+        assert first['street']['name'] == self.streets[0].name
+        assert [request['resident_name'] for request in first['stop_requests']] == ["Dash Resident 0", "Dash Resident 1"]
+        assert first['stop_requests'][0]['status'] == "cancelled"
+        assert (first['requests'], first['quantity']) == (1, 2)
+        assert dashboard['totals'] == {'routes': 4, 'requests': 7, 'quantity': 14}
+
+    def test_query_count_does_not_grow(self):
+        assert self._dashboard(MONDAY, MONDAY + timedelta(days=7))['routes'] == []
+        assert len(self.statements) == 1
+        self._schedule(days=5, requests_per_route=4)
+        dashboard = self._dashboard(MONDAY, MONDAY + timedelta(days=7))
+        assert dashboard['totals']['routes'] == 10 and dashboard['totals']['requests'] == 40
+        assert len(self.statements) == 1
+
+    def test_unknown_driver(self):
+        assert get_driver_dashboard(999999) is None
+
+    def test_api_dashboard(self):
+        self._schedule(days=1, requests_per_route=1)
+        client = current_app.test_client()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.driver_id))}"}
+        url = f"/api/drivers/{self.driver_id}/dashboard"
+        response = client.get(f"{url}?from=2025-03-03T00:00:00&to=2025-03-04T00:00:00", headers=headers)
+        assert response.status_code == 200 and response.json['totals']['routes'] == 2
+        response = client.get(f"{url}?from=2025-03-03T04:00:00-04:00&to=2025-03-03T10:00:00Z", headers=headers)
+        assert response.json['totals']['routes'] == 1
+        assert client.get(f"{url}?from=2025-03-04&to=2025-03-03", headers=headers).status_code == 400
+        assert client.get(f"{url}?from=2025-03-01&to=2025-06-01", headers=headers).status_code == 400
+        assert client.get(f"{url}?from=yesterday", headers=headers).status_code == 400
+        other = self.residents[0].id
+        assert client.get(f"/api/drivers/{other}/dashboard", headers=headers).status_code == 403
+        assert client.get(url).status_code == 401
@@ -0,0 +1,90 @@
+import os, pytest, unittest
+from datetime import datetime, timedelta
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Resident, Street, Route, StopRequest, Notification
+from App.controllers import generate_dataset, login, DATASET_PASSWORD
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+def table_rows(model):
+    return db.session.execute(db.select(model.__table__).order_by(*model.__table__.primary_key)).all()
+
+
+class DatasetIntegrationTests(unittest.TestCase):
+
+    def test_generated_dataset_is_consistent_and_reproducible(self):
+        counts = generate_dataset(1, seed=7, chunk_size=500, report=lambda line: None)
+        assert counts["residents"] == 2000 and counts["drivers"] == 10
+        assert counts["routes"] == 140 and counts["stop_requests"] == 1400
+        assert counts["notifications"] == 140 * 100
+
+        residents = Resident.__table__
+        unread = db.session.scalar(db.select(db.func.sum(residents.c.unread_count)))
+        assert unread == db.session.scalar(
+            db.select(db.func.count()).where(Notification.__table__.c.is_read == db.false())
+        )
+        # each route's notifications are dated the day before its visit
+        for route in db.session.scalars(db.select(Route).limit(5)):
+            sent = db.session.scalars(
+                db.select(db.distinct(Notification.timestamp)).where(Notification.route_id == route.route_id)
+            ).all()
+            assert sent == [route.scheduled_time - timedelta(days=1)]
+        assert login("resident11", DATASET_PASSWORD) is not None
+
+        snapshot = [table_rows(model) for model in (Route, StopRequest)]
+        db.drop_all()
+        db.create_all()
+        generate_dataset(1, seed=7, chunk_size=500, report=lambda line: None)
+        assert [table_rows(model) for model in (Route, StopRequest)] == snapshot
+
+    def test_orm_inserts_after_a_dataset(self):
+        db.drop_all()
+        db.create_all()
+        check_orm_inserts_after_dataset()
+
+
+def check_orm_inserts_after_dataset():
+    counts = generate_dataset(1, seed=7, chunk_size=500, report=lambda line: None)
+    street = Street(name="After Dataset Street")
+    db.session.add(street)
+    db.session.commit()
+    assert street.street_id == counts["streets"] + 1
+    resident = Resident("after_dataset", "pass", "After Dataset", street)
+    db.session.add(resident)
+    db.session.commit()
+    assert resident.id == counts["users"] + 1
+    route = Route(driver_id=1, street_id=street.street_id, scheduled_time=datetime(2025, 3, 3, 8))
+    db.session.add(route)
+    db.session.commit()
+    assert route.route_id == counts["routes"] + 1
+    request = resident.request_stop(route, notify=False)
+    assert request.request_id == counts["stop_requests"] + 1
+
+
+def test_orm_inserts_after_a_dataset_on_postgresql():
+    # the explicit ids only break PostgreSQL's sequences; SQLite always runs above
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("set TEST_POSTGRES_URL to check sequences after a dataset on PostgreSQL")
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': url, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            check_orm_inserts_after_dataset()
+        finally:
+            db.session.remove()
+            db.drop_all()
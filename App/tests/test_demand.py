@@ -0,0 +1,105 @@
+import pytest, unittest
+from datetime import datetime
+
+from flask import current_app
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Driver, Resident, Street, Route, StopRequest, RouteDemand
+from App.controllers import (
+    get_route_demand,
+    get_loading_sheet,
+    get_daily_demand,
+    confirm_stop_request,
+    cancel_stop_request,
+    rebuild_route_demand,
+    verify_route_demand
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class RouteDemandIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        street = Street(name=f"Demand Street {self._testMethodName}")
+        db.session.add(street)
+        db.session.flush()
+        self.residents = [Resident(f"demand_{self._testMethodName}_{i}", "pass", f"Demand {i}", street) for i in range(3)]
+        driver = Driver(f"demand_driver_{self._testMethodName}", "pass", "Demand Driver")
+        db.session.add_all(self.residents + [driver])
+        db.session.commit()
+        self.route = driver.schedule_drive(street, datetime(2025, 3, 3, 9), notify=False)
+        self.route_id = self.route.route_id
+
+    def test_summary_follows_request_confirm_and_cancel(self):
+        first = self.residents[0].request_stop(self.route, quantity=3, notify=False)
+        self.residents[1].request_stop(self.route, quantity=2, notify=False)
+        self.residents[2].request_stop(self.route, quantity=None, notify=False)
+        demand = get_route_demand(self.route_id)
+        assert demand['by_status'] == {'requested': {'requests': 3, 'quantity': 5}}
+        assert (demand['requests'], demand['quantity']) == (3, 5)
+
+        confirm_stop_request(first.request_id)
+        self.residents[1].cancel_stop_request(self.residents[1].stop_requests[0])
+        demand = get_route_demand(self.route_id)
+        assert demand['by_status'] == {
+            'requested': {'requests': 1, 'quantity': 0},
+            'confirmed': {'requests': 1, 'quantity': 3},
+            'cancelled': {'requests': 1, 'quantity': 2},
+        }
+        assert (demand['requests'], demand['quantity']) == (2, 3)
+        assert verify_route_demand() == []
+
+    def test_quantity_changes_and_deletes_are_applied(self):
+        stop_request = self.residents[0].request_stop(self.route, quantity=4, notify=False)
+        stop_request.quantity = 6
+        db.session.commit()
+        assert get_route_demand(self.route_id)['quantity'] == 6
+        db.session.delete(stop_request)
+        db.session.commit()
+        assert get_route_demand(self.route_id)['requests'] == 0
+        assert verify_route_demand() == []
+
+    def test_loading_sheet(self):
+        self.residents[0].request_stop(self.route, quantity=2, notify=False)
+        sheet = get_loading_sheet(self.route_id)
+        assert sheet['street_name'].startswith("Demand Street") and sheet['driver_name'] == "Demand Driver"
+        assert (sheet['requests'], sheet['quantity']) == (1, 2)
+        assert get_loading_sheet(999999) is None
+        response = current_app.test_client().get(f"/api/routes/{self.route_id}/loading-sheet")
+        assert response.status_code == 200 and response.json['quantity'] == 2
+        assert current_app.test_client().get("/api/routes/999999/loading-sheet").status_code == 404
+
+    def test_daily_demand_sums_active_requests_per_street(self):
+        self.residents[0].request_stop(self.route, quantity=2, notify=False)
+        cancelled = self.residents[1].request_stop(self.route, quantity=5, notify=False)
+        cancel_stop_request(cancelled.request_id)
+        rows = [row for row in get_daily_demand(datetime(2025, 3, 3)) if row['street_id'] == self.route.street_id]
+        assert [(row['requests'], row['quantity']) for row in rows] == [(1, 2)]
+        assert get_daily_demand(datetime(2025, 3, 4)) == []
+
+    def test_bulk_writes_are_reconciled_by_rebuild(self):
+        db.session.execute(StopRequest.__table__.insert(), [
+            {'route_id': self.route_id, 'resident_id': resident.id, 'status': "requested", 'quantity': 1}
+            for resident in self.residents
+        ])
+        db.session.commit()
+        mismatches = verify_route_demand()
+        assert [(m[0], m[1], m[2]) for m in mismatches] == [(self.route_id, "requested", (3, 3))]
+        assert rebuild_route_demand() > 0
+        assert verify_route_demand() == []
+        assert get_route_demand(self.route_id)['quantity'] == 3
+
+    def test_deleting_a_route_drops_its_summary(self):
+        self.residents[0].request_stop(self.route, quantity=1, notify=False)
+        db.session.delete(self.route)
+        db.session.commit()
+        assert db.session.scalar(db.select(db.func.count()).where(RouteDemand.route_id == self.route_id)) == 0
+        assert verify_route_demand() == []
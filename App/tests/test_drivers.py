@@ -0,0 +1,200 @@
+import pytest, unittest
+from datetime import datetime, timezone
+from unittest import mock
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy.exc import OperationalError
+
+from App.main import create_app
+from App.database import db, create_db
+from App.events import EventHub
+from App.models import Driver, Street
+from App.controllers import (
+    DriverStateBuffer,
+    get_driver_buffer,
+    get_driver_state,
+    report_driver_location,
+    report_driver_status,
+    flush_driver_updates,
+    get_event_hub,
+    subscribe_driver_updates
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class DriverBufferUnitTests(unittest.TestCase):
+
+    def test_updates_coalesce_per_driver(self):
+        buffer = DriverStateBuffer(max_pending=10, flush_interval=60)
+        buffer.record(1, location="Depot")
+        buffer.record(1, location="Main Street")
+        buffer.record(1, status="on_route")
+        assert buffer.get(1) == {"location": "Main Street", "status": "on_route"}
+        assert buffer.pending_count() == 1
+        assert buffer.stats()["updates_received"] == 3
+
+    def test_size_and_time_thresholds(self):
+        now = [0.0]
+        buffer = DriverStateBuffer(max_pending=2, flush_interval=5, clock=lambda: now[0])
+        assert not buffer.record(1, location="a")
+        assert buffer.record(2, location="b")
+        buffer = DriverStateBuffer(max_pending=100, flush_interval=5, clock=lambda: now[0])
+        assert not buffer.record(1, location="a")
+        now[0] = 6.0
+        assert buffer.record(1, location="b")
+
+
+    def test_text_fields_must_fit_their_columns(self):
+        buffer = DriverStateBuffer()
+        with pytest.raises(ValueError):
+            buffer.record(1, status="x" * 51)
+        with pytest.raises(ValueError):
+            buffer.record(1, location=["Depot"])
+        assert buffer.get(1) is None and buffer.pending_count() == 0
+        buffer.record(1, status="x" * 50, location=None)
+
+    def test_state_expires_once_written(self):
+        now = [0.0]
+        buffer = DriverStateBuffer(state_ttl=10, clock=lambda: now[0])
+        buffer.record(1, location="Depot")
+        buffer.remember(2, location="Depot", status="available")
+        now[0] = 11.0
+        # not written yet, so still the newest there is
+        assert buffer.get(1) == {"location": "Depot"}
+        assert buffer.get(2) is None
+        buffer.remember(1, location="Old Row", status="available")
+        assert buffer.get(1) == {"location": "Depot", "status": "available"}
+        assert buffer.snapshot() == {1: {"location": "Depot"}}
+
+
+class DriverBufferIntegrationTests(unittest.TestCase):
+
+    def test_flush_writes_only_latest_state(self):
+        driver = Driver("buffered_van", "pass", "Buffered Van")
+        db.session.add(driver)
+        db.session.commit()
+        before = get_driver_buffer().stats()
+
+        for i in range(5):
+            report_driver_location(driver.id, f"Stop {i}")
+        report_driver_status(driver.id, "on_route")
+        assert get_driver_state(driver.id) == {"id": driver.id, "status": "on_route", "location": "Stop 4", "lat": None, "lon": None}
+
+        assert flush_driver_updates() == 1
+        db.session.expire_all()
+        driver = db.session.get(Driver, driver.id)
+        assert (driver.location, driver.status) == ("Stop 4", "on_route")
+        after = get_driver_buffer().stats()
+        assert after["updates_received"] - before["updates_received"] == 6
+        assert after["rows_written"] - before["rows_written"] == 1
+
+    def test_state_falls_back_to_database(self):
+        driver = Driver("idle_van", "pass", "Idle Van", location="Depot")
+        db.session.add(driver)
+        db.session.commit()
+        assert get_driver_state(driver.id) == {"id": driver.id, "status": "available", "location": "Depot", "lat": None, "lon": None}
+        assert get_driver_state(999999) is None
+
+
+    def test_bad_row_is_dropped_without_blocking_the_others(self):
+        drivers = [Driver(f"flush_van_{i}", "pass", f"Flush Van {i}") for i in range(3)]
+        db.session.add_all(drivers)
+        db.session.commit()
+        buffer = get_driver_buffer()
+        dropped = buffer.stats()["dropped"]
+        for driver in drivers:
+            report_driver_location(driver.id, f"Stop {driver.id}")
+        # a value the database can't store
+        buffer.record(drivers[1].id, lat=object())
+        assert flush_driver_updates() == 2
+        assert buffer.stats()["dropped"] == dropped + 1 and buffer.pending_count() == 0
+        db.session.expire_all()
+        assert [db.session.get(Driver, d.id).location for d in drivers] == [f"Stop {drivers[0].id}", None, f"Stop {drivers[2].id}"]
+        report_driver_location(drivers[1].id, "Recovered")
+        assert flush_driver_updates() == 1
+
+    def test_updates_kept_while_the_database_is_down(self):
+        driver = Driver("offline_van", "pass", "Offline Van")
+        db.session.add(driver)
+        db.session.commit()
+        buffer = get_driver_buffer()
+        flush_driver_updates()
+        report_driver_location(driver.id, "Depot")
+        with mock.patch.object(buffer, "_write", side_effect=OperationalError("UPDATE", {}, Exception("down"))):
+            with pytest.raises(OperationalError):
+                flush_driver_updates()
+        assert buffer.pending_count() == 1
+        assert flush_driver_updates() == 1
+
+    def test_report_refuses_oversized_text(self):
+        driver = Driver("long_status_van", "pass", "Long Status Van")
+        db.session.add(driver)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(driver.id))}"}
+        client = current_app.test_client()
+        response = client.post("/api/driver/location", json={"location": "Depot", "status": "x" * 51}, headers=headers)
+        assert response.status_code == 400
+        assert get_driver_buffer().snapshot().get(driver.id) is None
+        assert client.post("/api/driver/location", json={"location": "Depot"}, headers=headers).status_code == 202
+        flush_driver_updates()
+
+
+class EventHubUnitTests(unittest.TestCase):
+
+    def test_slow_consumer_gets_latest_state_per_key(self):
+        hub = EventHub(max_pending=2)
+        sub = hub.subscribe("street:1")
+        hub.publish(["street:1"], 1, {"location": "a"})
+        hub.publish(["street:1"], 1, {"location": "b"})
+        hub.publish(["street:1"], 2, {"location": "c"})
+        hub.publish(["street:1"], 3, {"location": "d"})
+        assert sub.get(timeout=0) == [{"location": "c"}, {"location": "d"}]
+        assert (sub.coalesced, sub.dropped) == (1, 1)
+        assert sub.get(timeout=0) == []
+
+    def test_capacity_and_unsubscribe(self):
+        hub = EventHub(max_subscribers=1)
+        sub = hub.subscribe("route:1", "street:1")
+        assert hub.subscribe("route:2") is None
+        assert hub.publish(["route:1", "street:1"], 1, {}) == 1
+        hub.unsubscribe(sub)
+        hub.unsubscribe(sub)
+        assert hub.stats()["subscribers"] == 0
+        assert not hub.has_subscribers()
+
+
+class DriverEventsIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.street = Street(name=f"Event Street {self.id()}")
+        db.session.add(self.street)
+        self.driver = Driver(f"event_van_{self.id()}", "pass", "Event Van", location="Depot")
+        db.session.add(self.driver)
+        db.session.flush()
+        self.route = self.driver.schedule_drive(self.street, datetime.now(timezone.utc), notify=False)
+        self.driver_id = self.driver.id
+
+    def test_location_reports_are_pushed_to_street_listeners(self):
+        sub, snapshot = subscribe_driver_updates(street_id=self.street.street_id)
+        assert [state["location"] for state in snapshot] == ["Depot"]
+        report_driver_location(self.driver_id, "Corner of Main")
+        assert sub.get(timeout=1) == [{"id": self.driver_id, "status": "available", "location": "Corner of Main", "lat": None, "lon": None}]
+        get_event_hub().unsubscribe(sub)
+        flush_driver_updates()
+
+    def test_sse_endpoint_streams_snapshot(self):
+        client = current_app.test_client()
+        response = client.get(f"/api/routes/{self.route.route_id}/events", buffered=False)
+        assert response.mimetype == "text/event-stream"
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b"retry:")
+        assert b'"location": "Depot"' in next(chunks)
+        response.close()
+        assert get_event_hub().stats()["subscribers"] == 0
@@ -0,0 +1,74 @@
+import pytest, unittest
+from datetime import datetime, timezone
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Driver, Street
+from App.controllers import (
+    report_driver_location,
+    flush_driver_updates,
+    subscribe_driver_updates,
+    get_driver_relay,
+    get_event_hub
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def workers(tmp_path_factory):
+    # two app instances on one database, as two gunicorn workers would be
+    uri = f"sqlite:///{tmp_path_factory.mktemp('events') / 'workers.db'}"
+    reporting = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri})
+    create_db()
+    listening = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri})
+    yield reporting, listening
+    with reporting.app_context():
+        db.drop_all()
+
+
+class DriverRelayIntegrationTests(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def apps(self, workers):
+        self.reporting, self.listening = workers
+        with self.reporting.app_context():
+            street = Street(name=f"Relay Street {self.id()}")
+            driver = Driver(f"relay_van_{self.id()}", "pass", "Relay Van", location="Depot")
+            db.session.add_all([street, driver])
+            db.session.flush()
+            driver.schedule_drive(street, datetime.now(timezone.utc), notify=False)
+            self.driver_id, self.street_id = driver.id, street.street_id
+
+    def test_updates_reach_listeners_on_another_worker(self):
+        driver_id, street_id = self.driver_id, self.street_id
+
+        with self.listening.app_context():
+            sub, snapshot = subscribe_driver_updates(street_id=street_id)
+            assert [state["location"] for state in snapshot] == ["Depot"]
+            relay = get_driver_relay()
+            assert relay.poll() == 0
+
+        with self.reporting.app_context():
+            report_driver_location(driver_id, "Corner of Main")
+            # not visible to the other worker until it is written
+            with self.listening.app_context():
+                assert get_driver_relay().poll() == 0
+            flush_driver_updates()
+
+        with self.listening.app_context():
+            assert relay.poll() == 1
+            assert [state["location"] for state in sub.get(timeout=0)] == ["Corner of Main"]
+            assert relay.poll() == 0 and sub.get(timeout=0) == []
+            assert relay.stats()["relayed"] == 1
+            get_event_hub().unsubscribe(sub)
+
+    def test_own_updates_are_not_relayed_again(self):
+        with self.reporting.app_context():
+            sub, _ = subscribe_driver_updates(street_id=self.street_id)
+            report_driver_location(self.driver_id, "Bakery")
+            assert [state["location"] for state in sub.get(timeout=0)] == ["Bakery"]
+            relay = get_driver_relay()
+            assert relay.poll() == 0
+            flush_driver_updates()
+            assert relay.poll() == 0 and sub.get(timeout=0) == []
+            get_event_hub().unsubscribe(sub)
+            assert relay.poll() == 0
@@ -0,0 +1,117 @@
+import random, pytest, unittest
+from flask import current_app
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from App.database import db, create_db
+from App.geo import SpatialGrid, haversine_km
+from App.models import Driver, Street
+from App.controllers import (
+    report_driver_position,
+    flush_driver_updates,
+    find_nearest_drivers,
+    get_driver_grid
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class SpatialGridUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.grid = SpatialGrid(cell_degrees=0.01)
+        self.points = {}
+        for key in range(2000):
+            self.move(key, 10.6 + rng.random() * 0.2, -61.6 + rng.random() * 0.2)
+        # move a third of them so cells are vacated and refilled
+        for key in range(0, 2000, 3):
+            self.move(key, 10.6 + rng.random() * 0.2, -61.6 + rng.random() * 0.2)
+        self.queries = [(10.55 + rng.random() * 0.3, -61.65 + rng.random() * 0.3) for _ in range(50)]
+
+    def move(self, key, lat, lon):
+        self.points[key] = (lat, lon)
+        self.grid.update(key, lat, lon)
+
+    def naive(self, lat, lon):
+        return sorted((haversine_km(lat, lon, *point), key) for key, point in self.points.items())
+
+    def test_haversine(self):
+        assert haversine_km(10.65, -61.5, 10.65, -61.5) == 0
+        assert abs(haversine_km(0, 0, 0, 1) - 111.195) < 0.01
+
+    def test_nearest_matches_full_scan(self):
+        for lat, lon in self.queries:
+            assert self.grid.nearest(lat, lon, k=7) == self.naive(lat, lon)[:7]
+
+    def test_within_matches_full_scan(self):
+        for lat, lon in self.queries:
+            assert self.grid.within(lat, lon, 1.5) == [pair for pair in self.naive(lat, lon) if pair[0] <= 1.5]
+
+    def test_far_away_and_bounded_queries(self):
+        assert self.grid.nearest(48.85, 2.35, k=3) == self.naive(48.85, 2.35)[:3]
+        assert self.grid.nearest(48.85, 2.35, k=3, max_km=50) == []
+
+    def test_remove(self):
+        self.grid.remove(5)
+        self.grid.remove(5)
+        assert self.grid.get(5) is None and len(self.grid) == 1999
+
+
+class DriverProximityIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.street = Street(name=f"Grid Street {self.id()}", lat=10.65, lon=-61.5)
+        self.near = Driver(f"near_{self.id()}", "pass", "Near Van")
+        self.far = Driver(f"far_{self.id()}", "pass", "Far Van")
+        db.session.add_all([self.street, self.near, self.far])
+        db.session.commit()
+        self.driver_ids = (self.near.id, self.far.id)
+
+    def tearDown(self):
+        # park the drivers far away so the next test starts from an empty area
+        for driver_id in self.driver_ids:
+            report_driver_position(driver_id, -45.0, 170.0)
+        flush_driver_updates()
+
+    def test_reported_positions_are_indexed_and_flushed(self):
+        report_driver_position(self.near.id, 10.651, -61.5)
+        report_driver_position(self.far.id, 10.70, -61.5)
+        nearest = find_nearest_drivers(10.65, -61.5, k=2)
+        assert [d["id"] for d in nearest] == [self.near.id, self.far.id]
+        assert nearest[0]["lat"] == 10.651 and nearest[0]["distance_km"] == 0.111
+        assert [d["id"] for d in find_nearest_drivers(10.65, -61.5, k=5, radius_km=1)] == [self.near.id]
+        with pytest.raises(ValueError):
+            report_driver_position(self.near.id, 91, 0)
+        flush_driver_updates()
+        db.session.expire_all()
+        assert (db.session.get(Driver, self.far.id).lat, db.session.get(Driver, self.far.id).lon) == (10.70, -61.5)
+
+    def test_grid_reloads_flushed_positions(self):
+        db.session.get(Driver, self.near.id).lat = 10.652
+        db.session.get(Driver, self.near.id).lon = -61.5
+        db.session.commit()
+        get_driver_grid().loaded_at = None
+        assert get_driver_grid().get(self.near.id) == (10.652, -61.5)
+
+    def test_api(self):
+        client = current_app.test_client()
+        token = create_access_token(identity=str(self.near.id))
+        response = client.post("/api/driver/location", json={"lat": 10.6505, "lon": -61.5},
+                               headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 202
+        assert client.post("/api/driver/location", json={"lat": 10.6505},
+                           headers={"Authorization": f"Bearer {token}"}).status_code == 400
+        drivers = client.get(f"/api/streets/{self.street.street_id}/drivers?k=1").get_json()
+        assert [d["id"] for d in drivers] == [self.near.id]
+        nearest = client.get("/api/drivers/nearest?lat=10.65&lon=-61.5&radius_km=2").get_json()
+        assert self.near.id in [d["id"] for d in nearest]
+        assert client.get("/api/drivers/nearest?lat=10.65").status_code == 400
+        assert client.get("/api/streets/999999/drivers").status_code == 404
+        flush_driver_updates()
@@ -0,0 +1,111 @@
+import pytest, unittest
+from datetime import datetime
+from flask import current_app
+
+from App.main import create_app
+from App.database import db, create_db
+from App.jobs import run_pending_jobs
+from App.models import Driver, Resident, Street, Route, RouteAlert, Notification
+from App.controllers import (
+    Fence,
+    GeofenceEngine,
+    get_geofence_engine,
+    report_driver_position,
+    flush_driver_updates
+)
+
+# at the default 20 km/h: 10 min = 3.33 km, 5 min = 1.67 km, 2 min = 0.67 km
+KM_PER_DEGREE_LAT = 111.195
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+def north_of(lat, km):
+    return lat + km / KM_PER_DEGREE_LAT
+
+
+class GeofenceEngineUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = GeofenceEngine(thresholds=(10, 5, 2), speed_kmh=20)
+        self.engine.load({1: [Fence(7, 3, "Main Street", "Alice", 10.0, -61.0)]})
+
+    def test_each_threshold_fires_once(self):
+        assert self.engine.crossed(1, north_of(10.0, 5), -61.0) == []
+        [(fence, thresholds)] = self.engine.crossed(1, north_of(10.0, 3), -61.0)
+        assert fence.route_id == 7 and thresholds == [10]
+        assert self.engine.crossed(1, north_of(10.0, 2.9), -61.0) == []
+        [(_, thresholds)] = self.engine.crossed(1, north_of(10.0, 1.5), -61.0)
+        assert thresholds == [5]
+
+    def test_jumping_inside_fires_tightest_first(self):
+        [(_, thresholds)] = self.engine.crossed(1, north_of(10.0, 0.5), -61.0)
+        assert thresholds == [2, 5, 10]
+        assert self.engine.crossed(1, 10.0, -61.0) == []
+
+    def test_other_drivers_are_not_checked(self):
+        assert self.engine.crossed(2, 10.0, -61.0) == []
+        assert self.engine.stats()["fences"] == 1
+
+
+class GeofenceIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.street = Street(name=f"Fence Street {self.id()}", lat=10.65, lon=-61.5)
+        self.driver = Driver(f"fence_van_{self.id()}", "pass", "Fence Van")
+        db.session.add_all([self.street, self.driver])
+        db.session.flush()
+        db.session.add_all([Resident(f"fenced_{self.id()}_{i}", "pass", f"Fenced {i}", self.street) for i in range(3)])
+        self.route = Route(driver_id=self.driver.id, street_id=self.street.street_id,
+                           scheduled_time=datetime.utcnow(), status="in_progress")
+        db.session.add(self.route)
+        db.session.commit()
+        self.route_id, self.driver_id = self.route.route_id, self.driver.id
+        get_geofence_engine().loaded_at = None
+
+    def tearDown(self):
+        flush_driver_updates()
+
+    def messages(self):
+        run_pending_jobs(current_app)
+        return db.session.scalars(
+            db.select(Notification.message).filter_by(route_id=self.route_id).order_by(Notification.notification_id)
+        ).all()
+
+    def test_alerts_fire_once_per_threshold(self):
+        report_driver_position(self.driver_id, north_of(10.65, 6), -61.5)
+        assert self.messages() == []
+        report_driver_position(self.driver_id, north_of(10.65, 1.5), -61.5)
+        report_driver_position(self.driver_id, north_of(10.65, 1.4), -61.5)
+        assert self.messages() == [f"Driver Fence Van is 5 minutes away from {self.street.name}!"] * 3
+        # a reload (or another worker) sees the recorded alerts
+        get_geofence_engine().loaded_at = None
+        report_driver_position(self.driver_id, north_of(10.65, 1.3), -61.5)
+        assert len(self.messages()) == 3
+        report_driver_position(self.driver_id, north_of(10.65, 0.2), -61.5)
+        assert self.messages()[-1].endswith("is 2 minutes away from " + self.street.name + "!")
+        assert sorted(db.session.scalars(
+            db.select(RouteAlert.threshold_minutes).filter_by(route_id=self.route_id)
+        )) == [2, 5, 10]
+
+    def test_alerts_recorded_elsewhere_are_not_repeated(self):
+        get_geofence_engine()
+        db.session.add(RouteAlert(route_id=self.route_id, threshold_minutes=2))
+        db.session.commit()
+        duplicates = get_geofence_engine().duplicates
+        report_driver_position(self.driver_id, north_of(10.65, 0.1), -61.5)
+        assert self.messages() == []
+        assert get_geofence_engine().duplicates == duplicates + 1
+
+    def test_routes_not_in_progress_have_no_fence(self):
+        db.session.get(Route, self.route_id).status = "scheduled"
+        db.session.commit()
+        get_geofence_engine().loaded_at = None
+        report_driver_position(self.driver_id, 10.65, -61.5)
+        assert self.messages() == []
@@ -0,0 +1,61 @@
+import logging, pytest, unittest
+from flask import current_app, jsonify
+from sqlalchemy.orm import lazyload
+
+from App.main import create_app
+from App.database import db, create_db
+from App.instrumentation import statement_shape
+from App.models import Resident, Street
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'SQL_INSTRUMENTATION': True,
+        'SQL_REPEAT_THRESHOLD': 2,
+    })
+
+    # deliberately lazy-loads each resident's street, overriding the joined default
+    @app.route('/test/n-plus-one')
+    def n_plus_one():
+        residents = db.session.scalars(db.select(Resident).options(lazyload(Resident.street))).all()
+        return jsonify([resident.street.name for resident in residents])
+
+    create_db()
+    db.session.add_all([Resident(f"lazy_{i}", "pass", f"Lazy {i}", Street(name=f"Lazy Street {i}")) for i in range(4)])
+    db.session.commit()
+    yield app.test_client()
+    db.drop_all()
+
+
+class StatementShapeUnitTests(unittest.TestCase):
+
+    def test_in_lists_and_whitespace_collapse(self):
+        assert statement_shape("SELECT *\n FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+        assert statement_shape("SELECT * FROM t WHERE id IN (%(id_1)s, %(id_2)s)") == "SELECT * FROM t WHERE id IN (?)"
+
+
+class InstrumentationIntegrationTests(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def capture_logs(self, caplog):
+        self.caplog = caplog
+
+    def test_server_timing_and_n_plus_one_warning(self):
+        with self.caplog.at_level(logging.INFO, logger="App.instrumentation"):
+            with current_app.app_context():
+                response = current_app.test_client().get('/test/n-plus-one')
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('db;dur=') and '5 queries' in timing
+        warnings = [r for r in self.caplog.records if r.levelno == logging.WARNING]
+        assert len(warnings) == 1 and "ran the same statement 4 times" in warnings[0].getMessage()
+        assert '"queries": 5' in self.caplog.records[-1].getMessage()
+
+    def test_eager_listing_is_not_flagged(self):
+        with self.caplog.at_level(logging.WARNING, logger="App.instrumentation"):
+            with current_app.app_context():
+                response = current_app.test_client().get('/api/users?limit=10')
+        assert 'Server-Timing' in response.headers
+        assert self.caplog.records == []
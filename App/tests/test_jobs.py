@@ -0,0 +1,103 @@
+import pytest, unittest
+from datetime import datetime, timedelta
+from flask import current_app
+
+from App.main import create_app
+from App.database import db, create_db
+from App.jobs import JobWorker, job_handler, queue_stats, retry_failed_jobs, run_pending_jobs
+from App.models import Job
+
+CALLS = []
+
+
+@job_handler("test_batch", batch_size=3)
+def batch_handler(payloads):
+    CALLS.append([payload['n'] for payload in payloads])
+    if any(payload.get('poison') for payload in payloads):
+        raise ValueError("poison")
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class JobQueueIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+        db.session.execute(Job.__table__.delete())
+        db.session.commit()
+        self.now = datetime(2030, 1, 1, 12, 0)
+
+    def worker(self, **kwargs):
+        return JobWorker(worker_id="test", clock=lambda: self.now, **kwargs)
+
+    def jobs(self):
+        db.session.expire_all()
+        return db.session.scalars(db.select(Job).order_by(Job.id)).all()
+
+    def test_enqueue_is_part_of_the_callers_transaction(self):
+        Job.enqueue("test_batch", {'n': 1})
+        db.session.rollback()
+        assert self.jobs() == []
+
+    def test_jobs_of_a_kind_run_in_batches_and_are_deleted(self):
+        Job.enqueue_many("test_batch", [{'n': n} for n in range(7)])
+        db.session.commit()
+        assert self.worker(batch_size=100).run_once() == 7
+        assert CALLS == [[0, 1, 2], [3, 4, 5], [6]]
+        assert self.jobs() == []
+
+    def test_claims_are_limited_and_due_only(self):
+        Job.enqueue_many("test_batch", [{'n': n} for n in range(5)])
+        Job.enqueue("test_batch", {'n': 99}, delay=3600)
+        db.session.commit()
+        worker = JobWorker(worker_id="test", batch_size=2)
+        assert worker.run(once=True) == 5
+        assert [job.payload['n'] for job in self.jobs()] == [99]
+
+    def test_failed_batch_retries_jobs_alone_with_backoff(self):
+        Job.enqueue_many("test_batch", [{'n': 0}, {'n': 1, 'poison': True}, {'n': 2}], max_attempts=2)
+        db.session.commit()
+        worker = self.worker(retry_base=10)
+        worker.run_once()
+        assert CALLS == [[0, 1, 2], [0], [1], [2]]
+        [job] = self.jobs()
+        assert (job.status, job.attempts, job.run_at) == ("queued", 1, self.now + timedelta(seconds=10))
+        assert "ValueError: poison" in job.last_error
+        assert worker.run_once() == 0
+        self.now += timedelta(seconds=10)
+        worker.run_once()
+        [job] = self.jobs()
+        assert (job.status, job.attempts) == ("failed", 2)
+        assert worker.stats() == {'processed': 2, 'retried': 1, 'failed': 1}
+        assert retry_failed_jobs("test_batch") == 1
+        assert self.jobs()[0].status == "queued"
+
+    def test_unknown_kind_fails_without_retry(self):
+        Job.enqueue("no_such_kind", {})
+        db.session.commit()
+        self.worker().run_once()
+        assert [(job.status, job.attempts) for job in self.jobs()] == [("failed", 1)]
+
+    def test_stale_locks_are_reclaimed(self):
+        Job.enqueue("test_batch", {'n': 1})
+        db.session.commit()
+        db.session.execute(Job.__table__.update().values(status="running", locked_by="dead", locked_at=self.now))
+        db.session.commit()
+        assert self.worker(lock_timeout=60).run_once() == 0
+        self.now += timedelta(seconds=61)
+        assert self.worker(lock_timeout=60).run_once() == 1
+
+    def test_stats_report_depth_and_lag(self):
+        Job.enqueue("test_batch", {'n': 1})
+        db.session.commit()
+        stats = queue_stats(now=datetime.utcnow() + timedelta(seconds=30))
+        assert stats['depth'][0]['kind'] == "test_batch" and stats['depth'][0]['jobs'] == 1
+        assert stats['lag_seconds'] >= 30
+        assert run_pending_jobs(current_app) == 1
+        assert queue_stats()['lag_seconds'] == 0.0
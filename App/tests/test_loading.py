@@ -0,0 +1,100 @@
+import pytest, unittest
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from App.main import create_app
+from App.database import db, create_db
+from App.jobs import run_pending_jobs
+from App.models import User, Driver, Resident, Street, Route
+from App.controllers import get_all_users_json, get_users_page, iter_users_json, get_inbox
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    streets = [Street(name=f"Loading Street {i}") for i in range(3)]
+    db.session.add_all([Resident(f"loaded_{i}", "pass", f"Loaded {i}", streets[i % 3]) for i in range(9)])
+    driver = Driver("loading_driver", "pass", "Loading Driver")
+    db.session.add(driver)
+    db.session.commit()
+    driver.schedule_drive(streets[0], datetime.now(timezone.utc))
+    run_pending_jobs(app)
+    yield app.test_client()
+    db.drop_all()
+
+
+class LoadingStrategyIntegrationTests(unittest.TestCase):
+    """Each access pattern must take a fixed number of statements."""
+
+    def setUp(self):
+        db.session.expunge_all()
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.expunge_all()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_user_by_id_loads_subclass_columns_inline(self):
+        driver_id = db.session.scalar(db.select(Driver.id))
+        resident_id = db.session.scalar(db.select(Resident.id))
+        db.session.expunge_all()
+        self.statements.clear()
+        driver = db.session.get(User, driver_id)
+        resident = db.session.get(User, resident_id)
+        assert isinstance(driver, Driver) and isinstance(resident, Resident)
+        assert driver.status is not None and resident.street.name.startswith("Loading Street")
+        assert len(self.statements) == 2
+
+    def test_user_listing_is_one_query(self):
+        users = db.session.scalars(db.select(User)).all()
+        assert all(user.get_json() for user in users)
+        assert len(self.statements) == 1
+
+    def test_resident_listings_are_one_query_each(self):
+        assert len(get_all_users_json()) == 9
+        assert len(self.statements) == 1
+        users, _ = get_users_page(limit=5)
+        assert all(user.get_json()["street_name"] for user in users)
+        assert len(self.statements) == 2
+        assert len(list(iter_users_json(batch_size=4))) == 9
+        assert len(self.statements) == 3
+
+    def test_api_users_modes(self):
+        client = current_app.test_client()
+        for url in ("/api/users", "/api/users?limit=4", "/api/users?stream=1"):
+            with current_app.app_context():
+                self.statements.clear()
+                response = client.get(url)
+                assert response.status_code == 200 and response.data
+                # plus the conditional GET's read of collection_versions
+                listing = [s for s in self.statements if "collection_versions" not in s]
+                assert len(listing) == 1 and len(self.statements) == 2, url
+
+    def test_route_driver_and_street_are_joined(self):
+        routes = db.session.scalars(db.select(Route)).all()
+        assert [(route.driver.name, route.street.name) for route in routes]
+        assert len(self.statements) == 1
+
+    def test_inbox_is_one_query(self):
+        resident_id = db.session.scalar(
+            db.select(Resident.id).join(Street).where(Street.name == "Loading Street 0")
+        )
+        self.statements.clear()
+        items, _ = get_inbox(resident_id)
+        assert len(items) == 1 and "Loading Driver" in items[0].message
+        assert len(self.statements) == 1
+
+    def test_unbounded_collections_refuse_lazy_loads(self):
+        street = db.session.scalars(db.select(Street)).first()
+        resident = db.session.scalars(db.select(Resident)).first()
+        with pytest.raises(InvalidRequestError):
+            street.residents
+        with pytest.raises(InvalidRequestError):
+            resident.notifications
@@ -0,0 +1,63 @@
+import os, pytest, unittest
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask_migrate import upgrade, downgrade
+
+from App.main import create_app
+from App.database import db, get_migrate
+from App.models import Resident, RouteDemand
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "migrations")
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("migrations") / "upgrade.db"
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+    }, role="cli")
+    get_migrate(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+class MigrationIntegrationTests(unittest.TestCase):
+
+    def test_upgrade_from_the_original_schema_backfills(self):
+        # a database as the original `flask init` left it
+        upgrade(directory=MIGRATIONS, revision="3c1d2e8f4a01")
+        when = datetime(2025, 3, 3, 8)
+        with db.engine.begin() as connection:
+            connection.execute(sa.text("INSERT INTO streets (street_id, name) VALUES (1, 'Old Street')"))
+            connection.execute(sa.text(
+                "INSERT INTO users (id, username, password, name, user_type) VALUES "
+                "(1, 'old_driver', 'x', 'Old Driver', 'driver'), (2, 'old_resident', 'x', 'Old Resident', 'resident')"
+            ))
+            connection.execute(sa.text("INSERT INTO drivers (id) VALUES (1)"))
+            connection.execute(sa.text("INSERT INTO residents (id, street_id) VALUES (2, 1)"))
+            connection.execute(sa.text(
+                "INSERT INTO routes (route_id, driver_id, street_id, scheduled_time, status) VALUES (1, 1, 1, :when, 'scheduled')"
+            ), {"when": when})
+            connection.execute(sa.text(
+                "INSERT INTO notifications (message, timestamp, resident_id, route_id) VALUES ('a', :when, 2, 1), ('b', :when, 2, 1)"
+            ), {"when": when})
+            connection.execute(sa.text(
+                "INSERT INTO stop_requests (status, route_id, resident_id, quantity, created_at) VALUES ('requested', 1, 2, 3, :when)"
+            ), {"when": when})
+
+        upgrade(directory=MIGRATIONS)
+        assert db.session.get(Resident, 2).unread_count == 2
+        demand = db.session.get(RouteDemand, (1, "requested"))
+        assert (demand.requests, demand.quantity) == (1, 3)
+        assert "ix_notifications_resident_unread" in {index["name"] for index in sa.inspect(db.engine).get_indexes("notifications")}
+        db.session.rollback()
+
+        downgrade(directory=MIGRATIONS, revision="3c1d2e8f4a01")
+        inspector = sa.inspect(db.engine)
+        assert "is_read" not in {column["name"] for column in inspector.get_columns("notifications")}
+        assert not inspector.has_table("route_demand")
+        assert inspector.get_indexes("routes") == []
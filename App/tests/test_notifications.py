@@ -0,0 +1,95 @@
+import pytest, unittest
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Driver, Resident, Street, Notification
+from App.controllers import (
+    get_inbox,
+    get_unread_count,
+    mark_notification_read,
+    mark_all_notifications_read
+)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class InboxIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        street = Street(name=f"Inbox Street {self.id()}")
+        self.resident = Resident(f"reader_{self.id()}", "pass", "Reader", street)
+        self.neighbour = Resident(f"neighbour_{self.id()}", "pass", "Neighbour", street)
+        driver = Driver(f"inbox_van_{self.id()}", "pass", "Inbox Van")
+        db.session.add_all([self.resident, self.neighbour, driver])
+        db.session.flush()
+        self.route = driver.schedule_drive(street, datetime.now(timezone.utc), notify=False)
+        # equal timestamps exercise the notification_id tie-breaker
+        base = datetime(2025, 1, 1, 8, 0)
+        for i in range(7):
+            Notification.fan_out_to_street(self.route.route_id, street.street_id, f"Update {i}",
+                                           timestamp=base + timedelta(minutes=i // 2))
+        db.session.commit()
+
+    def test_fan_out_maintains_unread_counters(self):
+        assert get_unread_count(self.resident.id) == 7
+        assert get_unread_count(self.neighbour.id) == 7
+
+    def test_pages_newest_first_without_gaps(self):
+        messages, cursor = [], None
+        while True:
+            page, cursor = get_inbox(self.resident.id, cursor, limit=3)
+            messages += [notification.message for notification in page]
+            if cursor is None:
+                break
+        assert messages == [f"Update {i}" for i in reversed(range(7))]
+
+    def test_mark_read_updates_counter_once(self):
+        newest = get_inbox(self.resident.id, limit=1)[0][0]
+        assert mark_notification_read(self.resident.id, newest.notification_id)
+        assert not mark_notification_read(self.resident.id, newest.notification_id)
+        assert not mark_notification_read(self.neighbour.id, newest.notification_id)
+        assert get_unread_count(self.resident.id) == 6
+        unread, _ = get_inbox(self.resident.id, limit=50, unread_only=True)
+        assert newest.notification_id not in [n.notification_id for n in unread]
+        assert mark_all_notifications_read(self.resident.id) == 6
+        assert get_unread_count(self.resident.id) == 0
+        assert get_unread_count(self.neighbour.id) == 7
+
+    def test_rebuild_matches_incremental_counts(self):
+        mark_notification_read(self.resident.id, get_inbox(self.resident.id, limit=1)[0][0].notification_id)
+        Notification.rebuild_unread_counts()
+        db.session.commit()
+        assert get_unread_count(self.resident.id) == 6
+
+    def test_cancelled_route_takes_its_unread_notifications_off_the_counters(self):
+        mark_notification_read(self.resident.id, get_inbox(self.resident.id, limit=1)[0][0].notification_id)
+        driver = db.session.get(Driver, self.route.driver_id)
+        other = driver.schedule_drive(self.resident.street, datetime.now(timezone.utc) + timedelta(days=1), notify=False)
+        Notification.notify(self.resident.id, other.route_id, "Tomorrow")
+        db.session.commit()
+        assert get_unread_count(self.resident.id) == 7
+
+        driver.cancel_route(self.route)
+        assert get_unread_count(self.resident.id) == 1
+        assert get_unread_count(self.neighbour.id) == 0
+        assert [n.message for n in get_inbox(self.resident.id)[0]] == ["Tomorrow"]
+
+    def test_inbox_api(self):
+        client = current_app.test_client()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(self.resident.id))}"}
+        page = client.get("/api/inbox?limit=5", headers=headers).get_json()
+        assert len(page["notifications"]) == 5 and page["unread_count"] == 7
+        rest = client.get(f"/api/inbox?cursor={page['next_cursor']}", headers=headers).get_json()
+        assert len(rest["notifications"]) == 2 and rest["next_cursor"] is None
+        read = client.post(f"/api/inbox/{rest['notifications'][0]['id']}/read", headers=headers)
+        assert read.get_json() == {"unread_count": 6}
+        assert client.get("/api/inbox?cursor=nonsense", headers=headers).status_code == 400
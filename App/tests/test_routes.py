@@ -0,0 +1,172 @@
+import pytest, unittest
+from datetime import datetime, timezone, timedelta
+
+from flask import current_app
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from App.database import db, create_db
+from App.jobs import run_pending_jobs
+from App.models import Driver, Resident, Street, Route, Notification
+from App.controllers import schedule_route, schedule_routes, parse_route_entry, DriverSchedule
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+class DriverScheduleUnitTests(unittest.TestCase):
+
+    def test_conflicts_are_half_open(self):
+        day = datetime(2025, 3, 3)
+        schedule = DriverSchedule()
+        schedule.add(day.replace(hour=9), day.replace(hour=10), "a")
+        schedule.add(day.replace(hour=12), day.replace(hour=13), "b")
+        assert schedule.conflict(day.replace(hour=10), day.replace(hour=12)) is None
+        assert schedule.conflict(day.replace(hour=8), day.replace(hour=9)) is None
+        assert schedule.conflict(day.replace(hour=9, minute=30), day.replace(hour=11)) == ["a"]
+        assert schedule.conflict(day.replace(hour=11), day.replace(hour=12, minute=1)) == ["b"]
+        assert schedule.conflict(day.replace(hour=12), day.replace(hour=12, minute=5)) == ["b"]
+
+    def test_overlapping_bookings_merge(self):
+        day = datetime(2025, 3, 3)
+        schedule = DriverSchedule()
+        schedule.add(day.replace(hour=9), day.replace(hour=11), "a")
+        schedule.add(day.replace(hour=13), day.replace(hour=14), "b")
+        schedule.add(day.replace(hour=10), day.replace(hour=13, minute=30), "c")
+        assert len(schedule) == 1
+        assert schedule.conflict(day.replace(hour=8), day.replace(hour=9, minute=1)) == ["a", "b", "c"]
+
+
+class RouteSchedulingIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.main = Street(name=f"Main Street {self.id()}")
+        self.oak = Street(name=f"Oak Avenue {self.id()}")
+        db.session.add_all([self.main, self.oak])
+        db.session.flush()
+        self.driver = Driver(f"driver_{self.id()}", "pass", "Alice Driver")
+        self.residents = [
+            Resident(f"res_{self.id()}_{i}", "pass", f"Resident {i}", self.main) for i in range(3)
+        ]
+        outsider = Resident(f"out_{self.id()}", "pass", "Outsider", self.oak)
+        db.session.add_all([self.driver, outsider, *self.residents])
+        db.session.commit()
+
+    def test_schedule_drive_notifies_every_resident_of_the_street(self):
+        route = self.driver.schedule_drive(self.main, datetime.now(timezone.utc))
+        assert db.session.scalars(db.select(Notification).filter_by(route_id=route.route_id)).all() == []
+        run_pending_jobs(current_app)
+        notifications = db.session.scalars(
+            db.select(Notification).filter_by(route_id=route.route_id)
+        ).all()
+        assert route.route_id is not None
+        self.assertCountEqual([n.resident_id for n in notifications], [r.id for r in self.residents])
+        assert all("Alice Driver" in n.message for n in notifications)
+
+    def test_schedule_drive_without_notify(self):
+        route = self.driver.schedule_drive(self.main, datetime.now(timezone.utc), notify=False)
+        assert db.session.scalars(db.select(Notification).filter_by(route_id=route.route_id)).all() == []
+
+    def test_schedule_route_controller(self):
+        route = schedule_route(self.driver.id, self.oak.street_id)
+        run_pending_jobs(current_app)
+        assert route.street_id == self.oak.street_id
+        assert len(db.session.scalars(db.select(Notification).filter_by(route_id=route.route_id)).all()) == 1
+        assert schedule_route(self.driver.id, 999999) is None
+
+
+class RouteEntryUnitTests(unittest.TestCase):
+
+    def test_csv_and_json_values(self):
+        assert parse_route_entry({'driver_id': "3", 'street_id': 4, 'scheduled_time': "2025-03-03T09:00", 'duration': ""}) == {
+            'driver_id': 3, 'street_id': 4, 'duration': None, 'scheduled_time': datetime(2025, 3, 3, 9),
+        }
+
+    def test_bad_fields_are_named(self):
+        good = {'driver_id': 1, 'street_id': 1, 'scheduled_time': "2025-03-03T09:00"}
+        for change, message in (
+            ({'driver_id': "x"}, "driver_id must be an integer"),
+            ({'street_id': None}, "street_id is required"),
+            ({'duration': True}, "duration must be an integer"),
+            ({'scheduled_time': "monday"}, "scheduled_time must be an ISO 8601 date and time"),
+            ({'scheduled_time': 5}, "scheduled_time must be an ISO 8601 date and time"),
+        ):
+            with pytest.raises(ValueError, match=message):
+                parse_route_entry(dict(good, **change))
+
+
+class BatchSchedulingIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.street = Street(name=f"Batch Street {self.id()}")
+        self.driver = Driver(f"batch_driver_{self.id()}", "pass", "Batch Driver")
+        self.resident = Resident(f"batch_res_{self.id()}", "pass", "Batch Resident", self.street)
+        db.session.add_all([self.street, self.driver, self.resident])
+        db.session.commit()
+        self.monday = datetime(2025, 3, 3, 9, 0)
+
+    def entry(self, hours, duration=60, driver_id=None, street_id=None):
+        return {
+            'driver_id': driver_id or self.driver.id,
+            'street_id': street_id or self.street.street_id,
+            'scheduled_time': self.monday + timedelta(hours=hours),
+            'duration': duration,
+        }
+
+    def test_conflicts_with_existing_and_batch_routes_are_rejected(self):
+        existing = self.driver.schedule_drive(self.street, self.monday)
+        accepted, rejected = schedule_routes([
+            self.entry(0.5),                    # overlaps the existing route
+            self.entry(1),                      # starts as it ends
+            self.entry(1.5),                    # overlaps the entry above
+            self.entry(3, duration=0),
+            self.entry(4, driver_id=999999),
+            self.entry(24 * 6),
+        ])
+        assert [e['scheduled_time'].hour for e in accepted] == [10, 9]
+        assert all(e['route_id'] for e in accepted)
+        assert [e['error'] for e in rejected] == [
+            "duration must be between 1 and 1440 minutes",
+            "driver 999999 not found",
+            f"driver {self.driver.id} is already booked (route {existing.route_id})",
+            f"driver {self.driver.id} is already booked (entry 2)",
+        ]
+        routes = db.session.scalars(db.select(Route).filter_by(driver_id=self.driver.id)).all()
+        assert len(routes) == 3
+        run_pending_jobs(current_app)
+        assert db.session.scalar(
+            db.select(db.func.count()).select_from(Notification).where(Notification.route_id.in_([e['route_id'] for e in accepted]))
+        ) == 2
+
+    def test_dry_run_writes_nothing(self):
+        accepted, rejected = schedule_routes([self.entry(0), self.entry(0.5)], dry_run=True)
+        assert len(accepted) == 1 and len(rejected) == 1 and accepted[0]['route_id'] is None
+        assert db.session.scalars(db.select(Route).filter_by(driver_id=self.driver.id)).all() == []
+
+    def test_batch_endpoint(self):
+        client = current_app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=self.driver)}'}
+        body = {'routes': [
+            {'driver_id': self.driver.id, 'street_id': self.street.street_id, 'scheduled_time': "2025-03-03T09:00:00"},
+            {'driver_id': "x", 'street_id': self.street.street_id, 'scheduled_time': "2025-03-03T11:00:00"},
+            {'driver_id': self.driver.id, 'street_id': self.street.street_id, 'scheduled_time': "2025-03-03T09:30:00"},
+            "not a route",
+        ], 'notify': False}
+        response = client.post('/api/routes/batch', headers=headers, json=body)
+        assert response.status_code == 201
+        assert [(e['index'], e['scheduled_time']) for e in response.json['accepted']] == [(0, "2025-03-03T09:00:00")]
+        assert [(e['index'], e['error']) for e in response.json['rejected']] == [
+            (1, "driver_id must be an integer"),
+            (2, f"driver {self.driver.id} is already booked (entry 1)"),
+            (3, "each route must be an object"),
+        ]
+        assert db.session.get(Route, response.json['accepted'][0]['route_id']).street_id == self.street.street_id
+
+        assert client.post('/api/routes/batch', headers=headers, json=[]).status_code == 400
+        headers = {'Authorization': f'Bearer {create_access_token(identity=self.resident)}'}
+        assert client.post('/api/routes/batch', headers=headers, json=body).status_code == 403
@@ -0,0 +1,91 @@
+import gzip
+import json
+import pytest, unittest
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Resident, Street
+from App.serialization import FastJSONProvider, orjson
+from App.compression import brotli
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'COMPRESS_MIN_BYTES': 512})
+    create_db()
+    street = Street(name="Serialised Street")
+    db.session.add(street)
+    db.session.flush()
+    db.session.add_all([Resident(f"serialised_{i}", "pass", f"Serialised Resident {i}", street) for i in range(40)])
+    db.session.commit()
+    yield app.test_client()
+    db.drop_all()
+
+
+class JSONProviderUnitTests(unittest.TestCase):
+
+    def _payload(self):
+        row = db.session.execute(Resident.json_select().limit(1)).one()
+        street = db.session.scalars(db.select(Street)).first()
+        return {'when': datetime(2025, 3, 3, 9, 30), 'price': Decimal("2.50"), 'row': row, 'street': street, 1: "one"}
+
+    def test_backends_agree(self):
+        payload = self._payload()
+        encoded = json.loads(FastJSONProvider(current_app._get_current_object(), backend='json').dumps(payload))
+        assert encoded['when'] == "2025-03-03T09:30:00"
+        assert encoded['price'] == "2.50"
+        assert encoded['row']['username'] == "serialised_0" and encoded['row']['street_name'] == "Serialised Street"
+        assert encoded['street']['name'] == "Serialised Street"
+        assert encoded['1'] == "one"
+        if orjson is not None:
+            assert json.loads(FastJSONProvider(current_app._get_current_object(), backend='orjson').dumps(payload)) == encoded
+
+    def test_missing_backend_falls_back(self):
+        provider = FastJSONProvider(current_app._get_current_object(), backend='json')
+        assert provider.backend == 'json'
+        assert provider.loads(provider.response({'a': 1}).get_data()) == {'a': 1}
+        with pytest.raises(TypeError):
+            provider.dumps(object())
+
+    def test_json_select_matches_get_json(self):
+        rows = [row._asdict() for row in db.session.execute(Resident.json_select().order_by(Resident.id))]
+        users = [user.get_json() for user in db.session.scalars(db.select(Resident).order_by(Resident.id))]
+        assert rows == users
+
+
+class CompressionIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.client = current_app.test_client()
+        self.plain = self.client.get("/api/users").json
+
+    def test_gzip_and_brotli(self):
+        response = self.client.get("/api/users", headers={'Accept-Encoding': "gzip"})
+        assert response.headers['Content-Encoding'] == "gzip"
+        assert "Accept-Encoding" in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert json.loads(gzip.decompress(response.data)) == self.plain
+        if brotli is not None:
+            response = self.client.get("/api/users", headers={'Accept-Encoding': "gzip, br"})
+            assert response.headers['Content-Encoding'] == "br"
+            assert json.loads(brotli.decompress(response.data)) == self.plain
+
+    def test_identity_when_not_accepted_or_small(self):
+        response = self.client.get("/api/users")
+        assert 'Content-Encoding' not in response.headers and "Accept-Encoding" in response.headers['Vary']
+        small = self.client.get("/api/users?limit=1", headers={'Accept-Encoding': "gzip"})
+        assert 'Content-Encoding' not in small.headers
+        etag = response.headers['ETag']
+        not_modified = self.client.get("/api/users", headers={'Accept-Encoding': "gzip", 'If-None-Match': etag})
+        assert not_modified.status_code == 304 and 'Content-Encoding' not in not_modified.headers
+
+    def test_streamed_bodies_are_compressed_incrementally(self):
+        response = self.client.get("/api/users?stream=1", headers={'Accept-Encoding': "gzip"})
+        assert response.headers['Content-Encoding'] == "gzip" and 'Content-Length' not in response.headers
+        assert sorted(json.loads(gzip.decompress(response.data)), key=lambda u: u['id']) == sorted(self.plain, key=lambda u: u['id'])
+        stats = current_app.extensions['compression'].stats()
+        assert stats['streamed'] >= 1 and 0 < stats['ratio'] < 1
@@ -0,0 +1,60 @@
+import os
+import pytest, unittest
+from unittest import mock
+
+from App.main import create_app, flask_command, process_role
+from App.database import db
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    yield app.test_client()
+
+
+class AppRoleUnitTests(unittest.TestCase):
+
+    def test_web_role_is_default(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        assert app.config['APP_ROLE'] == 'web'
+        assert 'user_views' in app.blueprints
+        assert 'admin' in app.extensions
+        assert 'compression' in app.extensions
+
+    def test_cli_role_skips_web_subsystems(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}, role='cli')
+        assert app.blueprints == {}
+        assert 'admin' not in app.extensions
+        assert 'compression' not in app.extensions
+        assert 'response_cache' not in app.extensions
+        # the services controllers rely on are still there
+        assert 'sqlalchemy' in app.extensions
+        assert 'geofences' in app.extensions
+        with app.app_context():
+            assert db.session.execute(db.text("select 1")).scalar() == 1
+
+    def test_role_from_config(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'APP_ROLE': 'worker'})
+        assert app.config['APP_ROLE'] == 'worker'
+        assert app.blueprints == {}
+
+    def test_unknown_role(self):
+        with pytest.raises(ValueError):
+            create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}, role='batch')
+
+    def test_flask_command(self):
+        assert flask_command(['/usr/bin/flask', '--app', 'wsgi', 'street', 'list']) == 'street'
+        assert flask_command(['flask', '-A', 'wsgi', '--debug', 'run']) == 'run'
+        assert flask_command(['flask', '--app=wsgi', 'worker', 'run']) == 'worker'
+        assert flask_command(['flask']) is None
+        assert flask_command(['gunicorn', '-c', 'gunicorn_config.py', 'wsgi:app']) is None
+
+    def test_process_role(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('APP_ROLE', None)
+            assert process_role(None) == 'web'
+            assert process_role('run') == 'web'
+            assert process_role('worker') == 'worker'
+            assert process_role('street') == 'cli'
+            os.environ['APP_ROLE'] = 'web'
+            assert process_role('street') == 'web'
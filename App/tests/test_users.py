@@ -0,0 +1,56 @@
+import json, pytest, unittest
+from unittest import mock
+from flask import current_app
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Resident, Street
+from App.controllers import get_all_users_json, get_users_page
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    street = Street(name="Listing Street")
+    db.session.add_all([Resident(f"listed_{i}", "pass", f"Listed {i}", street) for i in range(5)])
+    db.session.commit()
+    yield app.test_client()
+    db.drop_all()
+
+
+class UserListingIntegrationTests(unittest.TestCase):
+
+    def test_keyset_pages_cover_every_user_once(self):
+        seen, cursor = [], None
+        while True:
+            users, cursor = get_users_page(cursor, limit=2)
+            seen += [user.id for user in users]
+            if cursor is None:
+                break
+        assert seen == sorted(user["id"] for user in get_all_users_json())
+
+    def test_api_page_envelope(self):
+        client = current_app.test_client()
+        page = client.get("/api/users?limit=2").get_json()
+        assert len(page["users"]) == 2
+        rest = client.get(f"/api/users?limit=10&cursor={page['next_cursor']}").get_json()
+        assert len(rest["users"]) == 3 and rest["next_cursor"] is None
+        assert rest["users"][0]["street_name"] == "Listing Street"
+        assert client.get("/api/users?cursor=abc").status_code == 400
+        assert client.get("/api/users?limit=abc").status_code == 400
+        assert len(client.get(f"/api/users?cursor={page['next_cursor']}").get_json()["users"]) == 3
+
+    def test_api_stream_matches_full_listing(self):
+        client = current_app.test_client()
+        response = client.get("/api/users?stream=1")
+        assert response.mimetype == "application/json"
+        assert json.loads(response.data) == client.get("/api/users").get_json()
+        with mock.patch("App.views.user._stream_users_json") as stream:
+            assert client.get("/api/users?stream=0").status_code == 200
+            assert client.get("/api/users?stream=false").status_code == 200
+        stream.assert_not_called()
+
+    def test_users_page_renders(self):
+        response = current_app.test_client().get("/users")
+        assert b"listed_0" in response.data
@@ -0,0 +1,171 @@
+import pytest, unittest
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db, create_db
+from App.models import Driver, Resident, Street, Route, StopRequest, Notification, CollectionVersion
+from App.versions import ResponseCache
+
+
+@pytest.fixture(autouse=True, scope="module")
+def empty_db():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_db()
+    yield app.test_client()
+    db.drop_all()
+
+
+def versions(*names):
+    return {name: version for name, (version, _) in CollectionVersion.read(names).items()}
+
+
+class ResponseCacheUnitTests(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", b"1", "application/json")
+        cache.put("b", b"2", "application/json")
+        assert cache.get("a") == (b"1", "application/json")
+        cache.put("c", b"3", "application/json")
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        cache.record_not_modified()
+        stats = cache.stats()
+        assert (stats['entries'], stats['hits'], stats['misses'], stats['not_modified']) == (2, 2, 1, 1)
+        assert stats['hit_rate'] == 0.75
+
+
+class CollectionVersionIntegrationTests(unittest.TestCase):
+
+    def test_orm_writes_bump_the_tables_they_change(self):
+        before = versions('streets', 'users', 'routes')
+        street = Street(name="Version Street")
+        db.session.add(street)
+        db.session.commit()
+        after = versions('streets', 'users', 'routes')
+        assert after['streets'] == before['streets'] + 1
+        assert after['users'] == before['users'] and after['routes'] == before['routes']
+
+        driver = Driver("version_driver", "pass", "Version Driver")
+        db.session.add(driver)
+        db.session.commit()
+        # no conditional view serves driver state, so the buffer's flushes bump nothing
+        before = versions('users', 'drivers')
+        driver.status = "on_route"
+        db.session.commit()
+        assert versions('users', 'drivers') == before == {'users': before['users'], 'drivers': 0}
+
+    def test_rolled_back_writes_do_not_bump(self):
+        before = versions('streets')
+        db.session.add(Street(name="Rolled Back Street"))
+        db.session.flush()
+        db.session.rollback()
+        assert versions('streets') == before
+
+    def test_core_writes_bump_unless_opted_out(self):
+        street = Street(name="Core Street")
+        db.session.add(street)
+        db.session.flush()
+        resident = Resident("version_resident", "pass", "Version Resident", street)
+        driver = Driver("core_driver", "pass", "Core Driver")
+        db.session.add_all([resident, driver])
+        db.session.commit()
+        route = Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime(2025, 3, 3, 9))
+        db.session.add(route)
+        db.session.commit()
+
+        before = versions('streets', 'residents')
+        streets = Street.__table__
+        db.session.execute(streets.update().where(streets.c.street_id == street.street_id).values(name="Core Road"))
+        Notification.notify(resident.id, route.route_id, "unread counters stay out of it")
+        db.session.commit()
+        assert versions('streets', 'residents') == {'streets': before['streets'] + 1, 'residents': before['residents']}
+
+    def test_stop_request_writes_bump_route_demand(self):
+        resident = db.session.scalars(db.select(Resident).filter_by(username="version_resident")).one()
+        route = db.session.scalars(db.select(Route).filter_by(street_id=resident.street_id)).first()
+        before = versions('route_demand')['route_demand']
+        db.session.add(StopRequest(route_id=route.route_id, resident_id=resident.id, quantity=2))
+        db.session.commit()
+        db.session.execute(StopRequest.__table__.insert().values(route_id=route.route_id, resident_id=resident.id))
+        db.session.commit()
+        assert versions('route_demand')['route_demand'] == before + 2
+
+
+class ConditionalGetIntegrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.client = current_app.test_client()
+        self.cache = current_app.extensions['response_cache']
+        self.statements = []
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def _get(self, url, **headers):
+        self.statements.clear()
+        event.listen(db.engine, "before_cursor_execute", self._count)
+        try:
+            return self.client.get(url, headers=headers)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", self._count)
+
+    def test_etag_revalidation_and_body_cache(self):
+        first = self._get("/api/streets")
+        etag = first.headers['ETag']
+        assert first.status_code == 200 and etag.startswith('W/"')
+        assert first.headers['Cache-Control'] == "no-cache"
+
+        hits = self.cache.stats()['hits']
+        again = self._get("/api/streets")
+        assert again.data == first.data and again.headers['ETag'] == etag
+        assert self.cache.stats()['hits'] == hits + 1
+        assert len(self.statements) == 1 and "collection_versions" in self.statements[0]
+
+        not_modified = self._get("/api/streets", **{'If-None-Match': etag})
+        assert not_modified.status_code == 304 and not not_modified.data
+        assert len(self.statements) == 1
+
+        db.session.add(Street(name="Conditional Street"))
+        db.session.commit()
+        changed = self._get("/api/streets", **{'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.headers['ETag'] != etag
+        assert "Conditional Street" in [street['name'] for street in changed.json]
+
+    def _age_versions(self):
+        table = CollectionVersion.__table__
+        db.session.execute(table.update().values(updated_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.session.commit()
+
+    def test_if_modified_since(self):
+        self._age_versions()
+        response = self._get("/api/streets")
+        last_modified = response.headers['Last-Modified']
+        assert self._get("/api/streets", **{'If-Modified-Since': last_modified}).status_code == 304
+        assert self._get("/api/streets", **{'If-Modified-Since': "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+
+    def test_no_last_modified_within_the_second_of_a_write(self):
+        # another write in the same second would keep the same Last-Modified
+        db.session.add(Street(name="Same Second Street"))
+        db.session.commit()
+        # stamp the write ahead of the clock so the request can't land in the next second
+        table = CollectionVersion.__table__
+        db.session.execute(table.update().values(updated_at=datetime.utcnow() + timedelta(minutes=1)))
+        db.session.commit()
+        since = "Fri, 31 Dec 2100 00:00:00 GMT"
+        response = self._get("/api/streets", **{'If-Modified-Since': since})
+        assert response.status_code == 200 and 'Last-Modified' not in response.headers
+        self._age_versions()
+        assert self._get("/api/streets", **{'If-Modified-Since': since}).status_code == 304
+
+    def test_query_string_is_part_of_the_etag(self):
+        full = self._get("/api/users").headers['ETag']
+        page = self._get("/api/users?limit=1").headers['ETag']
+        assert full != page
+
+    def test_errors_are_not_cached(self):
+        assert self._get("/api/routes/999999").status_code == 404
+        assert 'ETag' not in self._get("/api/routes/999999").headers
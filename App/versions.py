@@ -0,0 +1,171 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from App.metrics import register_metrics
+from App.models import CollectionVersion
+
+# tables read by the conditional GET endpoints; each has its own counter
+VERSIONED_TABLES = frozenset({'users', 'residents', 'streets', 'routes', 'stop_requests', 'route_demand'})
+# summary tables written from another table's mapper events or alongside its
+# bulk writes, on the connection rather than the session; a write to the
+# source table bumps them too
+DERIVED_TABLES = {'stop_requests': frozenset({'route_demand'})}
+
+
+def _with_derived(tables):
+    return set(tables).union(*(DERIVED_TABLES.get(name, ()) for name in tables))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed(session, flush_context):
+    # new/dirty/deleted still describe what was just flushed
+    tables = set()
+    for obj in session.new | session.deleted:
+        tables.update(table.name for table in inspect(obj).mapper.tables)
+    for obj in session.dirty:
+        state = inspect(obj)
+        for prop in state.mapper.column_attrs:
+            if state.attrs[prop.key].history.has_changes():
+                tables.update(column.table.name for column in prop.columns)
+    tables = _with_derived(tables) & VERSIONED_TABLES
+    if tables:
+        CollectionVersion.bump(session.connection(), tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_executed(orm_execute_state):
+    # Core and bulk ORM writes through Session.execute; statements that only
+    # touch bookkeeping columns opt out with execution_options(bump_versions=False)
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if not orm_execute_state.execution_options.get('bump_versions', True):
+        return
+    name = getattr(orm_execute_state.statement.table, 'name', None)
+    if name is None:
+        return
+    tables = _with_derived({name}) & VERSIONED_TABLES
+    if tables:
+        CollectionVersion.bump(orm_execute_state.session.connection(), tables)
+
+
+class ResponseCache:
+    """Serialised response bodies, least recently used evicted first.
+
+    Keys are ETags, which already include the versions of every table the
+    response was built from, so entries never need invalidating: a write
+    changes the key and the stale body ages out.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype):
+        with self._lock:
+            self._entries[key] = (body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.not_modified
+            requests = served + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': served / requests if requests else 0.0,
+            }
+
+
+def setup_response_cache(app):
+    cache = ResponseCache(max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    app.extensions['response_cache'] = cache
+    register_metrics(app, 'response_cache', cache.stats)
+    return cache
+
+
+def conditional(*tables):
+    """Serve a GET view with ETag/Last-Modified from the versions of the tables it reads.
+
+    Costs one primary key query on collection_versions: a matching
+    If-None-Match (or If-Modified-Since) gets a 304, a body cached for the
+    same versions is sent as is, and only otherwise does the view run. Only
+    use it on views whose output depends on nothing but the URL and those
+    tables, never on the current user.
+
+    HTTP dates are whole seconds, so a second write within the same second
+    would keep the same Last-Modified; until that second has passed the
+    header isn't sent and If-Modified-Since isn't honoured (the ETag still is).
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = CollectionVersion.read(tables)
+            key = repr((
+                request.path,
+                sorted(request.args.items(multi=True)),
+                sorted((name, version) for name, (version, _) in versions.items()),
+            ))
+            etag = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+            updated = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+            last_modified = max(updated).replace(tzinfo=timezone.utc, microsecond=0) if updated else None
+            if last_modified is not None and last_modified + timedelta(seconds=1) > datetime.now(timezone.utc):
+                last_modified = None
+
+            cache = current_app.extensions['response_cache']
+            if _not_modified(etag, last_modified):
+                cache.record_not_modified()
+                response = current_app.response_class(status=304)
+            else:
+                cached = cache.get(etag)
+                if cached is not None:
+                    response = current_app.response_class(cached[0], mimetype=cached[1])
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if not response.is_streamed:
+                        cache.put(etag, response.get_data(), response.mimetype)
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # clients may keep the body but must revalidate it every time
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorate
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and last_modified <= since
@@ -3,8 +3,16 @@
 from .user import user_views
 from .index import index_views
 from .auth import auth_views
-from .admin import setup_admin
+from .driver import driver_views
+from .notification import notification_views
+from .imports import import_views
 
 
-views = [user_views, index_views, auth_views] 
+def setup_admin(app):
+    # Flask-Admin is slow to import and only the web role uses it
+    from .admin import setup_admin
+    return setup_admin(app)
+
+
+views = [user_views, index_views, auth_views, driver_views, notification_views, import_views] 
 # blueprints must be added to this list
\ No newline at end of file
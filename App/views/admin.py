@@ -1,9 +1,23 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.filters import FilterEqual, IntEqualFilter
 from flask_jwt_extended import jwt_required, current_user, unset_jwt_cookies, set_access_cookies
 from flask_admin import Admin
-from flask import flash, redirect, url_for, request
+from flask import current_app, flash, g, redirect, url_for, request
+from sqlalchemy import DateTime, inspect, tuple_
+from sqlalchemy.orm import joinedload, lazyload
 from App.database import db
-from App.models import User
+from App.models import User, Driver, Resident, Street, Route, StopRequest, Notification
+from App.serialization import to_json
+
+# exact counts stop here; bigger tables show "N+" unless the database has statistics
+COUNT_LIMIT = 10000
+
 
 class AdminView(ModelView):
 
@@ -16,6 +30,291 @@ class AdminView(ModelView):
         flash("Login to access admin")
         return redirect(url_for('index_page', next=request.url))
 
+
+class KeysetModelView(AdminView):
+    """List pages that cost the same on page 1 and page 100,000.
+
+    Pages are fetched with a keyset cursor (WHERE (sort, pk) > last row's)
+    instead of OFFSET, and the simple pager replaces Flask-Admin's COUNT(*)
+    of the whole table; the row count shown is an estimate (see
+    TableCounts). Only columns that lead an index belong in
+    column_sortable_list and column_filters, and the relationships named in
+    column_list ("street.name") are joined into the list query, loading
+    just that column. A list page is the list query plus, at most once per
+    ADMIN_COUNT_CACHE_SECONDS, the count.
+    """
+
+    simple_list_pager = True
+    can_set_page_size = True
+    page_size = 50
+    # full-text LIKE '%term%' scans the table; filter on indexed columns instead
+    column_searchable_list = None
+    column_exclude_list = ('password',)
+    form_excluded_columns = ('password',)
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True, page_size=None):
+        page_size = self.page_size if page_size is None else page_size
+        joins = {}
+        query = self.get_query().options(lazyload('*'), *self._prefetch_options())
+        if filters and self._filters:
+            query, _, joins, _ = self._apply_filters(query, None, joins, {}, filters)
+
+        columns = self._key_columns(sort_column)
+        cursor, backwards = decode_cursor(request.args.get('after'), columns), False
+        if cursor is None and page:
+            cursor = decode_cursor(request.args.get('before'), columns)
+            backwards = cursor is not None
+        if cursor is not None:
+            key, values = tuple_(*columns), tuple_(*cursor)
+            query = query.filter(key < values if sort_desc != backwards else key > values)
+        descending = sort_desc != backwards
+        query = query.order_by(*(column.desc() if descending else column for column in columns))
+        if page_size:
+            query = query.limit(page_size)
+        if not execute:
+            return None, query
+
+        rows = query.all()
+        if backwards:
+            rows.reverse()
+        g.admin_keyset = {
+            'view': self,
+            # a page asked for without its cursor is served as the first page
+            'page': page if cursor is not None else 0,
+            'first': encode_cursor(self._key_values(rows[0], columns)) if rows else None,
+            'last': encode_cursor(self._key_values(rows[-1], columns)) if rows else None,
+        }
+        if not filters:
+            g.admin_count = current_app.extensions['admin_counts'].label(self.model)
+        return None, rows
+
+    def _get_list_url(self, view_args):
+        # only the neighbouring pages have a cursor; any other link (sorting,
+        # page size, filters) starts again from the first page
+        view_args = view_args.clone()
+        view_args.extra_args.pop('after', None)
+        view_args.extra_args.pop('before', None)
+        keyset = g.get('admin_keyset')
+        page = view_args.page or 0
+        if keyset and keyset['view'] is self and page and view_args.sort == request.args.get('sort', None, type=int):
+            if page == keyset['page'] + 1 and keyset['last']:
+                view_args.extra_args['after'] = keyset['last']
+            elif page == keyset['page'] - 1 and keyset['first']:
+                view_args.extra_args['before'] = keyset['first']
+            else:
+                view_args.page = None
+        else:
+            view_args.page = None
+        return super()._get_list_url(view_args)
+
+    def render(self, template, **kwargs):
+        if template == self.list_template and kwargs.get('count') is None:
+            kwargs['count'] = g.get('admin_count')
+            kwargs['page'] = g.admin_keyset['page'] if 'admin_keyset' in g else kwargs.get('page')
+        return super().render(template, **kwargs)
+
+    def _key_columns(self, sort_column):
+        # the sort column, then the primary key to make the order total
+        primary_key = list(inspect(self.model).primary_key)
+        if sort_column is None or sort_column not in self._sortable_columns:
+            return primary_key
+        column = self._sortable_columns[sort_column]
+        column = getattr(column, 'expression', column)
+        return [column] + [key for key in primary_key if not key.compare(column)]
+
+    def _key_values(self, row, columns):
+        mapper = inspect(self.model)
+        return [getattr(row, mapper.get_property_by_column(column).key) for column in columns]
+
+    def _prefetch_options(self):
+        # "street.name" in column_list becomes one join loading only Street.name
+        options = []
+        for name in self.column_list or ():
+            if not isinstance(name, str) or '.' not in name:
+                continue
+            relationship, attribute = name.split('.', 1)
+            prop = getattr(self.model, relationship)
+            target = prop.property.mapper.class_
+            options.append(joinedload(prop).load_only(getattr(target, attribute)).lazyload('*'))
+        return options
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=to_json, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    # None for a missing or malformed cursor, which means the first page
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns) or any(isinstance(v, (list, dict)) for v in values):
+            return None
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(columns, values)
+        ]
+    except ValueError:
+        return None
+
+
+class TableCounts:
+    """Row counts for list pages without a COUNT(*) over millions of rows.
+
+    PostgreSQL's planner estimate (pg_class.reltuples) or SQLite's ANALYZE
+    statistics when there are any; otherwise an exact count that stops at
+    ``limit`` rows ("10000+"). Results are cached for ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=60.0, limit=COUNT_LIMIT):
+        self.ttl = ttl
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._labels = {}
+
+    def label(self, model):
+        table = model.__table__
+        now = time.monotonic()
+        with self._lock:
+            cached = self._labels.get(table.name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        label = self._count(table)
+        with self._lock:
+            self._labels[table.name] = (now + self.ttl, label)
+        return label
+
+    def _count(self, table):
+        dialect = db.session.get_bind().dialect.name
+        estimate = None
+        if dialect == 'postgresql':
+            estimate = db.session.execute(
+                db.text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {'table': table.name},
+            ).scalar()
+        elif dialect == 'sqlite' and self._has_sqlite_stats():
+            # the first number of an index's stat is the table's row count
+            estimate = db.session.execute(
+                db.text("SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = :table LIMIT 1"),
+                {'table': table.name},
+            ).scalar()
+        if estimate is not None and estimate >= 0:
+            return f"~{estimate:,}"
+        bounded = db.select(db.literal(1)).select_from(table).limit(self.limit + 1).subquery()
+        count = db.session.execute(db.select(db.func.count()).select_from(bounded)).scalar()
+        return f"{self.limit:,}+" if count > self.limit else f"{count:,}"
+
+    def _has_sqlite_stats(self):
+        return db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        ).first() is not None
+
+    def clear(self):
+        with self._lock:
+            self._labels.clear()
+
+
+class AccountAdmin(KeysetModelView):
+    """Users, drivers and residents: edit the profile only.
+
+    Accounts need a hashed password and a user_type matching their table,
+    which the signup and import paths set up; the admin form can't, so it
+    doesn't create them or change the type.
+    """
+
+    can_create = False
+    column_sortable_list = ('id', 'username')
+    column_filters = (FilterEqual(User.username, 'Username'),)
+    form_excluded_columns = ('password', 'user_type')
+
+
+class UserAdmin(AccountAdmin):
+    column_list = ('id', 'username', 'name', 'contact', 'user_type')
+
+
+class DriverAdmin(AccountAdmin):
+    column_list = ('id', 'username', 'name', 'status', 'location')
+    form_excluded_columns = ('password', 'user_type', 'routes')
+
+
+class ResidentAdmin(AccountAdmin):
+    column_list = ('id', 'username', 'name', 'street.name', 'unread_count')
+    column_filters = (FilterEqual(User.username, 'Username'), IntEqualFilter(Resident.street_id, 'Street ID'))
+    form_excluded_columns = ('password', 'user_type', 'stop_requests', 'notifications', 'unread_count')
+    form_ajax_refs = {'street': {'fields': ('name',), 'page_size': 10}}
+
+
+class StreetAdmin(KeysetModelView):
+    column_list = ('street_id', 'name', 'lat', 'lon')
+    column_sortable_list = ('street_id', 'name')
+    column_filters = (FilterEqual(Street.name, 'Name'),)
+    form_excluded_columns = ('residents', 'routes')
+
+
+class RouteAdmin(KeysetModelView):
+    column_list = ('route_id', 'scheduled_time', 'duration', 'status', 'driver.name', 'street.name')
+    column_sortable_list = ('route_id',)
+    column_filters = (IntEqualFilter(Route.driver_id, 'Driver ID'), IntEqualFilter(Route.street_id, 'Street ID'))
+    form_excluded_columns = ('stop_requests', 'notifications', 'alerts')
+    form_ajax_refs = {
+        'driver': {'fields': ('username',), 'page_size': 10},
+        'street': {'fields': ('name',), 'page_size': 10},
+    }
+
+
+class StopRequestAdmin(KeysetModelView):
+    column_list = ('request_id', 'route_id', 'resident.name', 'status', 'quantity', 'notes', 'created_at')
+    column_sortable_list = ('request_id',)
+    column_filters = (IntEqualFilter(StopRequest.route_id, 'Route ID'), IntEqualFilter(StopRequest.resident_id, 'Resident ID'))
+    form_ajax_refs = {
+        'resident': {'fields': ('username',), 'page_size': 10},
+        'route': {'fields': ('route_id',), 'page_size': 10},
+    }
+
+
+class NotificationAdmin(KeysetModelView):
+    column_list = ('notification_id', 'timestamp', 'resident.name', 'route_id', 'message', 'is_read')
+    column_sortable_list = ('notification_id',)
+    column_filters = (IntEqualFilter(Notification.resident_id, 'Resident ID'), IntEqualFilter(Notification.route_id, 'Route ID'))
+    form_ajax_refs = {
+        'resident': {'fields': ('username',), 'page_size': 10},
+        'route': {'fields': ('route_id',), 'page_size': 10},
+    }
+
+    # the form writes through the ORM, not notify/mark_read, so keep the
+    # residents' unread counters in step here (deletes are counted by the
+    # model's after_delete hook)
+    def on_model_change(self, form, model, is_created):
+        after = (model.resident.id if model.resident is not None else model.resident_id, model.is_read)
+        if is_created:
+            before = None
+        else:
+            history = inspect(model).attrs.is_read.history
+            before = (model.resident_id, history.deleted[0] if history.deleted else model.is_read)
+        if before == after:
+            return
+        if before is not None and not before[1]:
+            Notification.adjust_unread(before[0], -1)
+        if not after[1]:
+            Notification.adjust_unread(after[0], 1)
+
+
+ADMIN_VIEWS = (
+    (UserAdmin, User),
+    (DriverAdmin, Driver),
+    (ResidentAdmin, Resident),
+    (StreetAdmin, Street),
+    (RouteAdmin, Route),
+    (StopRequestAdmin, StopRequest),
+    (NotificationAdmin, Notification),
+)
+
+
 def setup_admin(app):
     admin = Admin(app, name='FlaskMVC', template_mode='bootstrap3')
-    admin.add_view(AdminView(User, db.session))
\ No newline at end of file
+    app.extensions['admin_counts'] = TableCounts(ttl=app.config.get('ADMIN_COUNT_CACHE_SECONDS', 60))
+    for view, model in ADMIN_VIEWS:
+        admin.add_view(view(model, db.session))
+    return admin
@@ -0,0 +1,233 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+
+from App.models import Driver
+from App.versions import conditional
+from App.controllers import (
+    report_driver_location,
+    report_driver_status,
+    report_driver_position,
+    get_driver_state,
+    valid_driver_text,
+    DRIVER_TEXT_LENGTHS,
+    find_nearest_drivers,
+    find_drivers_near_street,
+    get_loading_sheet,
+    get_all_streets_json,
+    get_route_json,
+    schedule_routes,
+    parse_route_entry,
+    ROUTE_BATCH_MAX,
+    get_driver_dashboard,
+    DASHBOARD_DAYS,
+    DASHBOARD_MAX_DAYS,
+    get_event_hub,
+    subscribe_driver_updates
+)
+
+driver_views = Blueprint('driver_views', __name__, template_folder='../templates')
+
+NEAREST_DRIVERS_MAX = 100
+
+
+'''
+API Routes
+'''
+
+@driver_views.route('/api/driver/location', methods=['POST'])
+@jwt_required()
+def report_location_action():
+    if not isinstance(current_user, Driver):
+        return jsonify(message='only drivers can report a location'), 403
+    data = request.json
+    # checked up front so a bad field doesn't leave the others half applied
+    for name, limit in DRIVER_TEXT_LENGTHS.items():
+        if name in data and not valid_driver_text(data[name], limit):
+            return jsonify(message=f'{name} must be a string of at most {limit} characters'), 400
+    if 'lat' in data or 'lon' in data:
+        try:
+            report_driver_position(current_user.id, float(data['lat']), float(data['lon']))
+        except (KeyError, TypeError, ValueError):
+            return jsonify(message='lat and lon must both be valid coordinates'), 400
+    if 'location' in data:
+        report_driver_location(current_user.id, data['location'])
+    if 'status' in data:
+        report_driver_status(current_user.id, data['status'])
+    return jsonify(message='update accepted'), 202
+
+@driver_views.route('/api/drivers/<int:driver_id>/location', methods=['GET'])
+def driver_location_action(driver_id):
+    state = get_driver_state(driver_id)
+    if not state:
+        return jsonify(message='driver not found'), 404
+    return jsonify(state)
+
+@driver_views.route('/api/drivers/nearest', methods=['GET'])
+def nearest_drivers_action():
+    try:
+        lat, lon = float(request.args['lat']), float(request.args['lon'])
+        k, radius_km = _proximity_args()
+    except (KeyError, ValueError):
+        return jsonify(message='lat and lon are required; k and radius_km must be positive numbers'), 400
+    return jsonify(find_nearest_drivers(lat, lon, k, radius_km))
+
+@driver_views.route('/api/streets/<int:street_id>/drivers', methods=['GET'])
+def street_drivers_action(street_id):
+    try:
+        k, radius_km = _proximity_args()
+    except ValueError:
+        return jsonify(message='k and radius_km must be positive numbers'), 400
+    drivers = find_drivers_near_street(street_id, k, radius_km)
+    if drivers is None:
+        return jsonify(message='street not found or has no coordinates'), 404
+    return jsonify(drivers)
+
+
+@driver_views.route('/api/streets', methods=['GET'])
+@conditional('streets')
+def list_streets_action():
+    return jsonify(get_all_streets_json())
+
+@driver_views.route('/api/routes/<int:route_id>', methods=['GET'])
+@conditional('routes', 'streets', 'users')
+def route_action(route_id):
+    route = get_route_json(route_id)
+    if not route:
+        return jsonify(message='route not found'), 404
+    return jsonify(route)
+
+@driver_views.route('/api/routes/batch', methods=['POST'])
+@jwt_required()
+def schedule_routes_action():
+    # {"routes": [{driver_id, street_id, scheduled_time, duration}, ...], "dry_run": false, "notify": true};
+    # bad and double-booked entries come back with their index, the rest are scheduled together
+    if not isinstance(current_user, Driver):
+        return jsonify(message='only drivers can schedule routes'), 403
+    data = request.get_json(silent=True)
+    routes = data.get('routes') if isinstance(data, dict) else None
+    if not isinstance(routes, list):
+        return jsonify(message='send {"routes": [...]}'), 400
+    if len(routes) > ROUTE_BATCH_MAX:
+        return jsonify(message=f'at most {ROUTE_BATCH_MAX} routes per batch'), 400
+    entries, invalid = [], []
+    for index, row in enumerate(routes):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError('each route must be an object')
+            entry = parse_route_entry(row)
+        except ValueError as e:
+            invalid.append({'index': index, 'error': str(e)})
+            continue
+        entry['index'] = index
+        entries.append(entry)
+    dry_run = bool(data.get('dry_run', False))
+    accepted, rejected = schedule_routes(entries, notify=bool(data.get('notify', True)), dry_run=dry_run)
+    invalid.extend(_batch_entry_json(entry) for entry in rejected)
+    return jsonify(
+        accepted=[_batch_entry_json(entry) for entry in accepted],
+        rejected=sorted(invalid, key=lambda entry: entry['index']),
+        dry_run=dry_run,
+    ), 200 if dry_run or not accepted else 201
+
+@driver_views.route('/api/routes/<int:route_id>/loading-sheet', methods=['GET'])
+@conditional('routes', 'streets', 'users', 'stop_requests', 'route_demand')
+def loading_sheet_action(route_id):
+    sheet = get_loading_sheet(route_id)
+    if not sheet:
+        return jsonify(message='route not found'), 404
+    return jsonify(sheet)
+
+
+@driver_views.route('/api/drivers/<int:driver_id>/dashboard', methods=['GET'])
+@jwt_required()
+def driver_dashboard_action(driver_id):
+    # the payload names residents, so only the driver themselves may see it
+    if current_user.id != driver_id:
+        return jsonify(message='drivers can only view their own dashboard'), 403
+    try:
+        start, end = _window_args()
+    except ValueError:
+        return jsonify(message=f'from and to must be ISO times, from before to, at most {DASHBOARD_MAX_DAYS} days apart'), 400
+    dashboard = get_driver_dashboard(driver_id, start, end)
+    if dashboard is None:
+        return jsonify(message='driver not found'), 404
+    return jsonify(dashboard)
+
+
+def _window_args():
+    start = _utc_arg('from') or datetime.utcnow()
+    end = _utc_arg('to') or start + timedelta(days=DASHBOARD_DAYS)
+    if not start < end <= start + timedelta(days=DASHBOARD_MAX_DAYS):
+        raise ValueError(end)
+    return start, end
+
+
+def _utc_arg(name):
+    # scheduled times are stored as naive UTC
+    value = request.args.get(name)
+    if not value:
+        return None
+    value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _batch_entry_json(entry):
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in entry.items()
+    }
+
+
+def _proximity_args():
+    k = min(int(request.args.get('k', 5)), NEAREST_DRIVERS_MAX)
+    radius_km = request.args.get('radius_km', type=float)
+    if k < 1 or (radius_km is not None and radius_km <= 0):
+        raise ValueError(k)
+    return k, radius_km
+
+
+@driver_views.route('/api/streets/<int:street_id>/events', methods=['GET'])
+def street_events_stream(street_id):
+    return _driver_event_stream(street_id=street_id)
+
+@driver_views.route('/api/routes/<int:route_id>/events', methods=['GET'])
+def route_events_stream(route_id):
+    return _driver_event_stream(route_id=route_id)
+
+
+def _driver_event_stream(street_id=None, route_id=None):
+    # Server-Sent Events: the current state first, then every change pushed
+    # by the event hub. Idle connections only cost a parked greenlet.
+    hub = get_event_hub()
+    sub, snapshot = subscribe_driver_updates(street_id=street_id, route_id=route_id)
+    if sub is None:
+        return jsonify(message='too many listeners, retry later'), 503
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            for state in snapshot:
+                yield _sse('driver', state)
+            while not sub.closed:
+                events = sub.get(timeout=heartbeat)
+                if not events:
+                    yield ': keep-alive\n\n'
+                for state in events:
+                    yield _sse('driver', state)
+        finally:
+            hub.unsubscribe(sub)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
@@ -0,0 +1,45 @@
+import io
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+
+from App.models import Driver
+from App.controllers import (
+    read_import_rows,
+    import_rows,
+    IMPORT_KINDS,
+    IMPORT_FORMATS,
+    IMPORT_CHUNK_SIZE
+)
+
+import_views = Blueprint('import_views', __name__, template_folder='../templates')
+
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/json-lines': 'jsonl',
+}
+
+
+'''
+API Routes
+'''
+
+@import_views.route('/api/import/<kind>', methods=['POST'])
+@jwt_required()
+def import_action(kind):
+    # the body is read as it is imported, never held in memory whole
+    if not isinstance(current_user, Driver):
+        return jsonify(message='only drivers can import data'), 403
+    kind = kind.replace('-', '_')
+    if kind not in IMPORT_KINDS:
+        return jsonify(message=f"kind must be one of {', '.join(IMPORT_KINDS)}"), 404
+    fmt = request.args.get('format') or IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify(message='send text/csv or application/x-ndjson, or pass ?format=csv|jsonl'), 415
+    chunk_size = request.args.get('chunk_size', IMPORT_CHUNK_SIZE, type=int)
+    if chunk_size is None or not 1 <= chunk_size <= 10 * IMPORT_CHUNK_SIZE:
+        return jsonify(message=f'chunk_size must be between 1 and {10 * IMPORT_CHUNK_SIZE}'), 400
+    rows = read_import_rows(io.BufferedReader(request.stream), fmt)
+    return jsonify(import_rows(kind, rows, chunk_size=chunk_size))
@@ -1,5 +1,6 @@
 from flask import Blueprint, redirect, render_template, request, send_from_directory, jsonify
 from App.controllers import create_user, initialize
+from App.metrics import collect_metrics
 
 index_views = Blueprint('index_views', __name__, template_folder='../templates')
 
@@ -14,4 +15,8 @@ def init():
 
 @index_views.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status':'healthy'})
\ No newline at end of file
+    return jsonify({'status':'healthy'})
+
+@index_views.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify(collect_metrics())
\ No newline at end of file
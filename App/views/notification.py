@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+
+from App.models import Resident
+from App.controllers import (
+    get_inbox,
+    get_unread_count,
+    mark_notification_read,
+    mark_all_notifications_read
+)
+
+notification_views = Blueprint('notification_views', __name__, template_folder='../templates')
+
+
+'''
+API Routes
+'''
+
+@notification_views.route('/api/inbox', methods=['GET'])
+@jwt_required()
+def inbox_action():
+    if not isinstance(current_user, Resident):
+        return jsonify(message='only residents have an inbox'), 403
+    limit = request.args.get('limit', 20, type=int)
+    unread_only = request.args.get('unread', '').lower() in ('1', 'true', 'yes')
+    try:
+        notifications, next_cursor = get_inbox(current_user.id, request.args.get('cursor'), limit, unread_only)
+    except ValueError:
+        return jsonify(message='invalid cursor'), 400
+    return jsonify(
+        notifications=[notification.get_json() for notification in notifications],
+        next_cursor=next_cursor,
+        unread_count=get_unread_count(current_user.id)
+    )
+
+@notification_views.route('/api/inbox/<int:notification_id>/read', methods=['POST'])
+@jwt_required()
+def mark_read_action(notification_id):
+    if not mark_notification_read(current_user.id, notification_id):
+        return jsonify(message='notification not found or already read'), 404
+    return jsonify(unread_count=get_unread_count(current_user.id))
+
+@notification_views.route('/api/inbox/read-all', methods=['POST'])
+@jwt_required()
+def mark_all_read_action():
+    updated = mark_all_notifications_read(current_user.id)
+    return jsonify(marked=updated, unread_count=get_unread_count(current_user.id))
@@ -1,12 +1,14 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from flask import Blueprint, Response, current_app, render_template, jsonify, request, send_from_directory, flash, redirect, url_for, stream_with_context
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 
 from.index import index_views
+from App.versions import conditional
 
 from App.controllers import (
     create_user,
-    get_all_users,
     get_all_users_json,
+    get_users_page,
+    iter_users_json,
     jwt_required
 )
 
@@ -14,8 +16,8 @@ user_views = Blueprint('user_views', __name__, template_folder='../templates')
 
 @user_views.route('/users', methods=['GET'])
 def get_user_page():
-    users = get_all_users()
-    return render_template('users.html', users=users)
+    users, next_cursor = get_users_page(request.args.get('cursor', type=int))
+    return render_template('users.html', users=users, next_cursor=next_cursor)
 
 @user_views.route('/users', methods=['POST'])
 def create_user_action():
@@ -25,7 +27,18 @@ def create_user_action():
     return redirect(url_for('user_views.get_user_page'))
 
 @user_views.route('/api/users', methods=['GET'])
+@conditional('users', 'residents', 'streets')
 def get_users_action():
+    # ?stream=1 writes the full array incrementally, ?limit/?cursor pages by id
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return Response(stream_with_context(_stream_users_json()), mimetype='application/json')
+    if 'limit' in request.args or 'cursor' in request.args:
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor', type=int)
+        if ('limit' in request.args and limit is None) or ('cursor' in request.args and cursor is None):
+            return jsonify(message='limit and cursor must be integers'), 400
+        users, next_cursor = get_users_page(cursor, 50 if limit is None else limit)
+        return jsonify(users=[user.get_json() for user in users], next_cursor=next_cursor)
     users = get_all_users_json()
     return jsonify(users)
 
@@ -37,4 +50,15 @@ def create_user_endpoint():
 
 @user_views.route('/static/users', methods=['GET'])
 def static_user_page():
-  return send_from_directory('static', 'static-user.html')
\ No newline at end of file
+  return send_from_directory('static', 'static-user.html')
+
+
+def _stream_users_json(batch_size=500):
+    yield '['
+    chunk = []
+    for i, user in enumerate(iter_users_json(batch_size)):
+        chunk.append((',' if i else '') + current_app.json.dumps(user))
+        if len(chunk) == batch_size:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + ']'
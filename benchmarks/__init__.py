@@ -0,0 +1,2 @@
+# Standalone performance scripts. Run them from the project root, e.g.
+#   python -m benchmarks.fanout
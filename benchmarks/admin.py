@@ -0,0 +1,109 @@
+"""Admin list pages at growing table sizes: keyset views against stock Flask-Admin.
+
+Fills stop_requests with N rows (over 1,000 residents and 1,000 routes),
+then times the first, middle and last page of /admin/stoprequest/ and of
+a stock ModelView (COUNT(*) and OFFSET paging) and reports statements and
+milliseconds per page. Counts are not cached, so every keyset page pays
+for its bounded count too.
+
+    python -m benchmarks.admin --rows 10000,100000,1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from flask_admin.contrib.sqla import ModelView
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Driver, Resident, Street, Route, StopRequest
+from App.views.admin import encode_cursor
+
+RESIDENTS = ROUTES = 1000
+PAGE_SIZE = 50
+
+
+class StockStopRequestView(ModelView):
+    # Flask-Admin's defaults, without the login check
+    def is_accessible(self):
+        return True
+
+
+def seed(rows, chunk=50000):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    street = Street(name="Admin Street")
+    driver = Driver("admin_driver", "x", "Admin Driver")
+    db.session.add_all([street, driver])
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {"id": 1000 + i, "username": f"admin_resident_{i}", "password": "x", "name": f"Resident {i}", "user_type": "resident"}
+        for i in range(RESIDENTS)
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": 1000 + i, "street_id": street.street_id} for i in range(RESIDENTS)
+    ])
+    db.session.execute(Route.__table__.insert(), [
+        {"route_id": n + 1, "driver_id": driver.id, "street_id": street.street_id,
+         "scheduled_time": datetime(2025, 3, 3, 6), "status": "scheduled"}
+        for n in range(ROUTES)
+    ])
+    for start in range(0, rows, chunk):
+        db.session.execute(StopRequest.__table__.insert(), [
+            {"request_id": n + 1, "route_id": n % ROUTES + 1, "resident_id": 1000 + n % RESIDENTS,
+             "status": "requested", "quantity": 1, "created_at": datetime(2025, 3, 1)}
+            for n in range(start, min(start + chunk, rows))
+        ])
+    db.session.commit()
+
+
+def measure(client, url, repeat):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        times = []
+        for _ in range(repeat):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.get(url)
+            times.append(time.perf_counter() - start)
+            assert response.status_code == 200, (url, response.status_code)
+        return len(statements), statistics.median(times) * 1000
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+
+def run(row_counts, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "admin.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "ADMIN_COUNT_CACHE_SECONDS": 0})
+    app.extensions["admin"][0].add_view(StockStopRequestView(StopRequest, db.session, endpoint="stock_stoprequest"))
+    # the keyset views' login check, for the benchmark only
+    for view in app.extensions["admin"][0]._views:
+        view.is_accessible = lambda: True
+    client = app.test_client()
+
+    print(f"{'rows':>9} {'page':<7} {'stock stmts':>11} {'stock ms':>9} {'keyset stmts':>12} {'keyset ms':>10}")
+    for rows in row_counts:
+        seed(rows)
+        pages = {"first": 0, "middle": rows // PAGE_SIZE // 2, "last": max(0, (rows - 1) // PAGE_SIZE)}
+        for name, page in pages.items():
+            stock = measure(client, f"/admin/stock_stoprequest/?page_size={PAGE_SIZE}&page={page}", repeat)
+            keyset_url = f"/admin/stoprequest/?page_size={PAGE_SIZE}"
+            if page:
+                keyset_url += f"&page={page}&after={encode_cursor([page * PAGE_SIZE])}"
+            keyset = measure(client, keyset_url, repeat)
+            print(f"{rows:>9} {name:<7} {stock[0]:>11} {stock[1]:9.1f} {keyset[0]:>12} {keyset[1]:10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run([int(n) for n in args.rows.split(",")], args.repeat)
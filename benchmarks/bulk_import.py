@@ -0,0 +1,73 @@
+"""Resident imports: bulk_import against creating residents one at a time.
+
+Writes N residents as JSON Lines and loads them twice into a fresh SQLite
+file: once through the ORM, one Resident(...) and commit per row (what a
+script looping over the API's create path does), and once through
+import_rows at --chunk-size rows per transaction. Reports rows per second
+for each; passwords use --hash-method so both pay the same hashing cost.
+
+    python -m benchmarks.bulk_import --rows 5000
+    python -m benchmarks.bulk_import --rows 2000 --hash-method scrypt
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+from App.main import create_app
+from App.database import db
+from App.models import Resident, Street
+from App.controllers import import_rows, read_import_rows
+
+
+def build(rows, hash_method):
+    path = os.path.join(tempfile.mkdtemp(), "bulk_import.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "PASSWORD_HASH_METHOD": hash_method}, role="cli")
+    data = b"".join(
+        json.dumps({"username": f"bulk{i}", "password": f"secret{i}", "name": f"Bulk {i}", "street": "Bulk Street"}).encode() + b"\n"
+        for i in range(rows)
+    )
+    return app, data
+
+
+def reset():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    db.session.add(Street(name="Bulk Street"))
+    db.session.commit()
+
+
+def one_at_a_time(data):
+    street = db.session.scalars(db.select(Street)).one()
+    for line in io.BytesIO(data):
+        row = json.loads(line)
+        db.session.add(Resident(row["username"], row["password"], row["name"], street))
+        db.session.commit()
+
+
+def run(rows, chunk_size, hash_method):
+    app, data = build(rows, hash_method)
+    with app.app_context():
+        print(f"{rows} residents, {hash_method}")
+        print(f"{'method':<16} {'seconds':>9} {'rows/s':>10}")
+        reset()
+        start = time.perf_counter()
+        one_at_a_time(data)
+        elapsed = time.perf_counter() - start
+        print(f"{'one at a time':<16} {elapsed:9.2f} {rows / elapsed:10.0f}")
+        reset()
+        summary = import_rows("residents", read_import_rows(io.BytesIO(data), "jsonl"), chunk_size=chunk_size)
+        assert summary["imported"] == rows, summary["errors"][:5]
+        print(f"{'bulk_import':<16} {summary['seconds']:9.2f} {summary['rows_per_second']:10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1000")
+    args = parser.parse_args()
+    run(args.rows, args.chunk_size, args.hash_method)
@@ -0,0 +1,108 @@
+"""Driver dashboard: SQL-side aggregation against walking the relationships.
+
+Gives one driver R routes a week with Q stop requests each, then builds
+the dashboard payload two ways and reports statements and time per call:
+get_driver_dashboard, and the same payload read through Driver.routes,
+Route.stop_requests and StopRequest.resident lazy loads.
+
+    python -m benchmarks.dashboard --routes 5,20,80 --requests 5,20
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Driver, Resident, Street, Route, StopRequest
+from App.controllers import get_driver_dashboard
+
+MONDAY = datetime(2025, 3, 3, 6)
+
+
+def seed(routes, requests):
+    db.drop_all()
+    db.create_all()
+    streets = [Street(name=f"Street {i}") for i in range(routes)]
+    driver = Driver("dashboard_driver", "x", "Dashboard Driver")
+    db.session.add_all(streets + [driver])
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {"id": 1000 + i, "username": f"resident_{i}", "password": "x", "name": f"Resident {i}", "user_type": "resident"}
+        for i in range(requests)
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": 1000 + i, "street_id": streets[0].street_id} for i in range(requests)
+    ])
+    route_rows = [
+        {"route_id": n + 1, "driver_id": driver.id, "street_id": streets[n].street_id,
+         "scheduled_time": MONDAY + timedelta(hours=2 * n), "status": "scheduled"}
+        for n in range(routes)
+    ]
+    db.session.execute(Route.__table__.insert(), route_rows)
+    db.session.execute(StopRequest.__table__.insert(), [
+        {"route_id": route["route_id"], "resident_id": 1000 + i, "status": "requested", "quantity": 2}
+        for route in route_rows for i in range(requests)
+    ])
+    db.session.commit()
+    return driver.id
+
+
+def orm_dashboard(driver_id, start, end):
+    # what a view written against the relationships does
+    driver = db.session.get(Driver, driver_id)
+    routes = []
+    for route in sorted(driver.routes, key=lambda route: route.scheduled_time):
+        if not start <= route.scheduled_time < end:
+            continue
+        routes.append({
+            'route_id': route.route_id,
+            'street': {'street_id': route.street.street_id, 'name': route.street.name},
+            'stop_requests': [
+                {'request_id': sr.request_id, 'resident_name': sr.resident.name, 'quantity': sr.quantity}
+                for sr in route.stop_requests
+            ],
+        })
+    return {'driver': {'id': driver.id, 'name': driver.name}, 'routes': routes}
+
+
+def measure(fn, calls):
+    statements = []
+    count = lambda *args: statements.append(1)
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+            db.session.remove()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return len(statements) / calls, elapsed / calls * 1000
+
+
+def run(route_counts, request_counts, calls):
+    path = os.path.join(tempfile.mkdtemp(), "dashboard.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "DRIVER_BUFFER_BACKGROUND_FLUSH": False})
+    window = (MONDAY, MONDAY + timedelta(days=7))
+    print(f"{'routes':>6} {'requests':>8} {'orm stmts':>10} {'orm ms':>8} {'dashboard stmts':>16} {'dashboard ms':>13}")
+    with app.app_context():
+        for routes in route_counts:
+            for requests in request_counts:
+                driver_id = seed(routes, requests)
+                orm = measure(lambda: orm_dashboard(driver_id, *window), calls)
+                dashboard = measure(lambda: get_driver_dashboard(driver_id, *window), calls)
+                print(f"{routes:>6} {requests:>8} {orm[0]:>10.0f} {orm[1]:>8.2f} {dashboard[0]:>16.0f} {dashboard[1]:>13.2f}")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", default="5,20,80", help="routes in the week")
+    parser.add_argument("--requests", default="5,20", help="stop requests per route")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+    run([int(n) for n in args.routes.split(",")], [int(n) for n in args.requests.split(",")], args.calls)
@@ -0,0 +1,89 @@
+"""Route scheduling fan-out cost as street size grows.
+
+Compares the old per-resident ORM loop against the set-based
+Notification.fan_out_to_street() for streets of 10 up to 100k residents.
+
+    python -m benchmarks.fanout --sizes 10,100,1000,10000,100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from App.main import create_app
+from App.database import db
+from App.models import Driver, Resident, Street, Route, Notification, User
+
+PASSWORD_HASH = "benchmark-not-a-real-hash"
+
+
+def seed_street(name, size, first_id):
+    street = Street(name=name)
+    db.session.add(street)
+    db.session.flush()
+    ids = range(first_id, first_id + size)
+    db.session.execute(User.__table__.insert(), [
+        {"id": i, "username": f"bench_{i}", "password": PASSWORD_HASH, "name": f"Resident {i}", "user_type": "resident"}
+        for i in ids
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": i, "street_id": street.street_id} for i in ids
+    ])
+    db.session.commit()
+    return street
+
+
+def orm_loop(driver, street):
+    # The pre-fan-out implementation of `flask driver schedule`
+    route = Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime.now(timezone.utc))
+    db.session.add(route)
+    db.session.flush()
+    for resident in Resident.query.filter_by(street_id=street.street_id).all():
+        db.session.add(Notification(resident_id=resident.id, route_id=route.route_id, message="scheduled"))
+    db.session.commit()
+
+
+def set_based(driver, street):
+    driver.schedule_drive(street, datetime.now(timezone.utc))
+
+
+def run(sizes, skip_orm_above):
+    path = os.path.join(tempfile.mkdtemp(), "fanout.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    db.create_all()
+    driver = Driver(username="bench_driver", password="x", name="Bench Driver")
+    db.session.add(driver)
+    db.session.commit()
+
+    print(f"{'residents':>10} {'orm loop (s)':>14} {'set-based (s)':>14} {'speedup':>8}")
+    next_id = 1000
+    for size in sizes:
+        street = seed_street(f"Bench Street {size}", size, next_id)
+        next_id += size
+        db.session.expire_all()
+
+        orm_seconds = None
+        if size <= skip_orm_above:
+            start = time.perf_counter()
+            orm_loop(driver, street)
+            orm_seconds = time.perf_counter() - start
+            db.session.expire_all()
+
+        start = time.perf_counter()
+        set_based(driver, street)
+        set_seconds = time.perf_counter() - start
+
+        orm_col = f"{orm_seconds:14.4f}" if orm_seconds is not None else f"{'skipped':>14}"
+        speedup = f"{orm_seconds / set_seconds:7.1f}x" if orm_seconds is not None else f"{'-':>8}"
+        print(f"{size:>10} {orm_col} {set_seconds:14.4f} {speedup}")
+    db.drop_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--skip-orm-above", type=int, default=100000,
+                        help="skip the slow ORM loop for streets larger than this")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.skip_orm_above)
@@ -0,0 +1,78 @@
+"""Nearest-driver queries: SpatialGrid against a full scan.
+
+Scatters N vans over a city-sized area (the same density as the synthetic
+dataset), then times k-nearest and within-radius queries from random
+points, plus position updates, for the grid and for a naive scan that
+computes the distance to every van.
+
+    python -m benchmarks.geo --sizes 1000,5000,20000
+"""
+import argparse
+import math
+import random
+import time
+
+from App.controllers import DATASET_CENTER, DATASET_SPREAD_DEGREES, DRIVERS_PER_SCALE
+from App.geo import SpatialGrid, haversine_km
+
+
+def naive_nearest(points, lat, lon, k):
+    return sorted((haversine_km(lat, lon, plat, plon), key) for key, (plat, plon) in points.items())[:k]
+
+
+def naive_within(points, lat, lon, radius_km):
+    found = [(haversine_km(lat, lon, plat, plon), key) for key, (plat, plon) in points.items()]
+    return sorted(pair for pair in found if pair[0] <= radius_km)
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def run(sizes, queries, k, radius_km, cell_degrees, seed):
+    print(f"{'vans':>7} {'query':<12} {'scan (us)':>11} {'grid (us)':>11} {'speedup':>8}")
+    for size in sizes:
+        rng = random.Random(seed)
+        # keep the dataset's vans per square degree, whatever the size
+        spread = DATASET_SPREAD_DEGREES * math.sqrt(size / DRIVERS_PER_SCALE)
+
+        def point():
+            return (DATASET_CENTER[0] + rng.uniform(-spread, spread) / 2,
+                    DATASET_CENTER[1] + rng.uniform(-spread, spread) / 2)
+
+        points = {key: point() for key in range(size)}
+        grid = SpatialGrid(cell_degrees)
+        grid.replace_all((key, lat, lon) for key, (lat, lon) in points.items())
+        probes = [point() for _ in range(queries)]
+
+        for lat, lon in probes[:20]:
+            assert grid.nearest(lat, lon, k) == naive_nearest(points, lat, lon, k)
+
+        scan_calls = max(1, min(queries, 200_000 // size))
+        rows = [
+            ("nearest", lambda lat, lon: naive_nearest(points, lat, lon, k), lambda lat, lon: grid.nearest(lat, lon, k)),
+            ("within", lambda lat, lon: naive_within(points, lat, lon, radius_km), lambda lat, lon: grid.within(lat, lon, radius_km)),
+        ]
+        for name, scan, indexed in rows:
+            scan_us = per_call_us(scan, probes[:scan_calls])
+            grid_us = per_call_us(indexed, probes)
+            print(f"{size:>7} {name:<12} {scan_us:11.1f} {grid_us:11.1f} {scan_us / grid_us:7.0f}x")
+
+        moves = [(rng.randrange(size), *point()) for _ in range(queries)]
+        update_us = per_call_us(grid.update, moves)
+        print(f"{size:>7} {'update':<12} {'-':>11} {update_us:11.1f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius-km", type=float, default=1.0)
+    parser.add_argument("--cell-degrees", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.queries, args.k, args.radius_km, args.cell_degrees, args.seed)
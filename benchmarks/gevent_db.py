@@ -0,0 +1,91 @@
+"""Slow and fast requests sharing one gevent worker, with and without DB_COOPERATIVE.
+
+Starts S greenlets that each hit an endpoint running a slow query (a
+recursive CTE on SQLite, pg_sleep on PostgreSQL), and meanwhile sends F
+GET /api/streets requests, one every --interval-ms, timing each from when
+it was due. With blocking database calls the fast requests queue behind
+every slow query; with cooperative access they are answered while the
+slow queries are still running.
+
+    python -m benchmarks.gevent_db --slow 4 --fast 50
+    python -m benchmarks.gevent_db --database-uri postgresql://localhost/bench
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import gevent
+
+from App.main import create_app
+from App.database import db
+from App.models import Street
+
+SLOW_QUERIES = {
+    'sqlite': "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows) SELECT count(*) FROM n",
+    'postgresql': "SELECT pg_sleep(:seconds)",
+}
+
+
+def build(uri, cooperative):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'DB_COOPERATIVE': cooperative})
+    dialect = db.engine.dialect.name
+    slow = db.text(SLOW_QUERIES[dialect])
+
+    def slow_view():
+        params = {'rows': 2_000_000} if dialect == 'sqlite' else {'seconds': 0.5}
+        return {'count': db.session.execute(slow, params).scalar()}
+    app.add_url_rule('/_bench/slow', 'bench_slow', slow_view)
+
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([Street(name=f"Bench Street {i}") for i in range(20)])
+    db.session.commit()
+    return app
+
+
+def run(app, slow, fast, interval):
+    client = app.test_client()
+    client.get('/api/streets')
+
+    def request(url, due):
+        # latency counts from when the request was due, so time spent
+        # waiting for a blocked hub to get round to it is included
+        gevent.sleep(max(0.0, due - time.perf_counter()))
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - due
+
+    start = time.perf_counter()
+    slow_greenlets = [gevent.spawn(request, '/_bench/slow', start) for _ in range(slow)]
+    fast_greenlets = [gevent.spawn(request, '/api/streets', start + (i + 1) * interval) for i in range(fast)]
+    gevent.joinall(slow_greenlets + fast_greenlets, raise_error=True)
+    wall = time.perf_counter() - start
+    return [g.value for g in slow_greenlets], [g.value for g in fast_greenlets], wall
+
+
+def main(uri, slow, fast, interval):
+    print(f"{slow} slow requests, {fast} fast requests, {uri.split(':', 1)[0]}")
+    print(f"{'DB_COOPERATIVE':<15} {'slow p50 s':>11} {'fast p50 ms':>12} {'fast p95 ms':>12} {'fast max ms':>12} {'wall s':>8}")
+    for cooperative in (False, True):
+        app = build(uri, cooperative)
+        slow_times, fast_times, wall = run(app, slow, fast, interval)
+        fast_ms = sorted(t * 1000 for t in fast_times)
+        print(f"{str(cooperative):<15} {statistics.median(slow_times):11.2f} {statistics.median(fast_ms):12.1f} "
+              f"{fast_ms[int(len(fast_ms) * 0.95)]:12.1f} {fast_ms[-1]:12.1f} {wall:8.2f}")
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", default=None, help="default: a temporary SQLite file")
+    parser.add_argument("--slow", type=int, default=4)
+    parser.add_argument("--fast", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=20, help="time between fast requests")
+    args = parser.parse_args()
+    uri = args.database_uri or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'gevent_db.db')}"
+    main(uri, args.slow, args.fast, args.interval_ms / 1000)
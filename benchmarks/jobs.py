@@ -0,0 +1,81 @@
+"""Background job throughput against the number of worker processes.
+
+Queues N jobs of a stand-in delivery kind that sleeps --latency-ms per
+batch (a push/SMS/email call), then drains the queue with 1, 2, 4, ...
+worker processes and reports jobs/s. With --kind notify_street the real
+notification fan-out handler is used instead, on a street of --residents.
+
+    python -m benchmarks.jobs --jobs 2000 --processes 1,2,4,8
+    python -m benchmarks.jobs --kind notify_street --jobs 2000 --processes 1,2,4
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from App.main import create_app
+from App.database import db
+from App.jobs import job_handler, run_workers, queue_stats
+from App.models import Driver, Resident, Street, Route, Job, User, NOTIFY_STREET_JOB
+
+LATENCY = {'ms': 20.0}
+
+
+@job_handler("benchmark_deliver", batch_size=10)
+def deliver(payloads):
+    # one round trip to the provider per batch
+    time.sleep(LATENCY['ms'] / 1000)
+
+
+def seed_route(residents):
+    street = Street(name="Queue Street")
+    driver = Driver("queue_driver", "x", "Queue Driver")
+    db.session.add_all([street, driver])
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {"id": 1000 + i, "username": f"queue_{i}", "password": "x", "name": f"Resident {i}", "user_type": "resident"}
+        for i in range(residents)
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": 1000 + i, "street_id": street.street_id} for i in range(residents)
+    ])
+    route = Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime.utcnow())
+    db.session.add(route)
+    db.session.commit()
+    return route
+
+
+def run(jobs, process_counts, kind, residents):
+    path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "DRIVER_BUFFER_BACKGROUND_FLUSH": False})
+    app.logger.disabled = True
+    db.create_all()
+    route = seed_route(residents) if kind == NOTIFY_STREET_JOB else None
+
+    print(f"{'processes':>9} {'jobs':>7} {'seconds':>9} {'jobs/s':>9}")
+    for processes in process_counts:
+        if route is not None:
+            payloads = [{'route_id': route.route_id, 'street_id': route.street_id, 'message': f"update {n}"} for n in range(jobs)]
+        else:
+            payloads = [{'n': n} for n in range(jobs)]
+        Job.enqueue_many(kind, payloads)
+        db.session.commit()
+        start = time.perf_counter()
+        run_workers(app, processes=processes, once=True)
+        elapsed = time.perf_counter() - start
+        left = sum(row['jobs'] for row in queue_stats()['depth'])
+        print(f"{processes:>9} {jobs - left:>7} {elapsed:9.2f} {(jobs - left) / elapsed:9.0f}")
+    db.drop_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--processes", default="1,2,4,8")
+    parser.add_argument("--kind", default="benchmark_deliver", choices=["benchmark_deliver", NOTIFY_STREET_JOB])
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated delivery latency per batch")
+    parser.add_argument("--residents", type=int, default=100, help="street size for notify_street")
+    args = parser.parse_args()
+    LATENCY['ms'] = args.latency_ms
+    run(args.jobs, [int(p) for p in args.processes.split(",")], args.kind, args.residents)
@@ -0,0 +1,89 @@
+"""Concurrent logins per second in a gevent worker, with and without the hash pool.
+
+Also tracks how long the gevent hub stalls: a ticker greenlet asks to wake
+every 10ms and records the worst overshoot. Inline hashing blocks every
+greenlet in the worker for the full duration of each hash.
+
+    python -m benchmarks.login --users 200 --concurrency 50
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import tempfile
+import time
+
+import gevent
+
+from App.main import create_app
+from App.database import db
+from App.hashing import PasswordHasher
+from App.models import User, Resident, Street
+from App.controllers import login
+
+
+def seed_users(count, method):
+    street = Street(name="Login Street")
+    db.session.add(street)
+    db.session.flush()
+    # one real hash reused for every account keeps setup fast
+    pwhash = PasswordHasher(method, workers=0).hash("benchpass")
+    db.session.execute(User.__table__.insert(), [
+        {"id": i, "username": f"login_{i}", "password": pwhash, "name": f"User {i}", "user_type": "resident"}
+        for i in range(1, count + 1)
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": i, "street_id": street.street_id} for i in range(1, count + 1)
+    ])
+    db.session.commit()
+
+
+def measure(app, users, concurrency, workers, method):
+    app.extensions['password_hasher'] = PasswordHasher(method, workers=workers)
+    worst_stall = [0.0]
+    running = [True]
+
+    def ticker():
+        while running[0]:
+            start = time.perf_counter()
+            gevent.sleep(0.01)
+            worst_stall[0] = max(worst_stall[0], time.perf_counter() - start - 0.01)
+
+    def worker(ids):
+        for i in ids:
+            with app.app_context():
+                assert login(f"login_{i}", "benchpass")
+
+    ids = list(range(1, users + 1))
+    tick = gevent.spawn(ticker)
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(worker, ids[n::concurrency]) for n in range(concurrency)], raise_error=True)
+    elapsed = time.perf_counter() - start
+    running[0] = False
+    tick.join()
+    return users / elapsed, worst_stall[0] * 1000
+
+
+def run(users, concurrency, method, workers):
+    path = os.path.join(tempfile.mkdtemp(), "login.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    db.create_all()
+    seed_users(users, method)
+
+    print(f"{users} logins, {concurrency} concurrent greenlets, method {method}")
+    print(f"{'hash pool':>12} {'logins/s':>10} {'worst hub stall (ms)':>22}")
+    for label, pool_size in (("inline", 0), (f"{workers} threads", workers)):
+        rate, stall = measure(app, users, concurrency, pool_size, method)
+        print(f"{label:>12} {rate:10.1f} {stall:22.1f}")
+    db.drop_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--method", default="scrypt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.users, args.concurrency, args.method, args.workers)
@@ -0,0 +1,81 @@
+"""JSON encoding and compression cost of the /api/users listing.
+
+Seeds N residents, then for each JSON backend measures CPU per response
+to build the listing the old way (Resident objects and get_json) and from
+json_select() rows, and for each Content-Encoding the bytes on the wire
+and the CPU spent compressing them.
+
+    python -m benchmarks.serialization --residents 1000,10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Resident, Street
+from App.serialization import FastJSONProvider, orjson
+from App.compression import ResponseCompressor, brotli
+
+
+def seed(residents):
+    db.drop_all()
+    db.create_all()
+    streets = [Street(name=f"Street {i}") for i in range(max(1, residents // 100))]
+    db.session.add_all(streets)
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {"id": i, "username": f"resident_{i}", "password": "x", "name": f"Resident {i}",
+         "contact": f"868-555-{i % 10000:04d}", "user_type": "resident"}
+        for i in range(1, residents + 1)
+    ])
+    db.session.execute(Resident.__table__.insert(), [
+        {"id": i, "street_id": streets[i % len(streets)].street_id} for i in range(1, residents + 1)
+    ])
+    db.session.commit()
+
+
+def cpu_ms(fn, calls):
+    start = time.process_time()
+    for _ in range(calls):
+        result = fn()
+        db.session.remove()
+    return (time.process_time() - start) / calls * 1000, result
+
+
+def run(sizes, calls):
+    path = os.path.join(tempfile.mkdtemp(), "serialization.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "DRIVER_BUFFER_BACKGROUND_FLUSH": False})
+    backends = ['json'] + (['orjson'] if orjson is not None else [])
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    compressor = ResponseCompressor()
+    with app.test_request_context():
+        for residents in sizes:
+            seed(residents)
+            print(f"\n{residents} residents")
+            print(f"  {'backend':<8} {'objects+get_json ms':>20} {'rows ms':>9}")
+            for backend in backends:
+                provider = FastJSONProvider(app, backend=backend)
+                objects, _ = cpu_ms(lambda: provider.response(
+                    [user.get_json() for user in db.session.scalars(db.select(Resident))]
+                ), calls)
+                rows, response = cpu_ms(lambda: provider.response(
+                    db.session.execute(Resident.json_select()).all()
+                ), calls)
+                print(f"  {backend:<8} {objects:>20.2f} {rows:>9.2f}")
+            body = response.get_data()
+            print(f"  {'encoding':<8} {'bytes':>10} {'ratio':>7} {'cpu ms':>8}")
+            print(f"  {'identity':<8} {len(body):>10} {1:>7.2f} {0:>8.2f}")
+            for encoding in encodings:
+                ms, compressed = cpu_ms(lambda: compressor.compress(encoding, body), calls)
+                print(f"  {encoding:<8} {len(compressed):>10} {len(compressed) / len(body):>7.2f} {ms:>8.2f}")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--residents", default="1000,10000")
+    parser.add_argument("--calls", type=int, default=10)
+    args = parser.parse_args()
+    run([int(n) for n in args.residents.split(",")], args.calls)
@@ -0,0 +1,97 @@
+"""SSE connection count versus memory for one gevent worker.
+
+Opens N idle /api/streets/<id>/events streams through the real view code
+(one greenlet each, as the gevent worker would), reports the worker's RSS
+per step, then publishes a burst of driver updates and times delivery.
+
+    python -m benchmarks.sse_load --steps 1000,2500,5000,10000
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import gevent
+
+from App.main import create_app
+from App.database import db
+from App.models import Driver, Street
+from App.controllers import get_event_hub, report_driver_location
+
+
+def rss_mb():
+    with open(f"/proc/{os.getpid()}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def listen(client, url, received):
+    response = client.get(url, buffered=False)
+    try:
+        for chunk in response.response:
+            if chunk.startswith(b"event: driver"):
+                received[0] += 1
+    finally:
+        response.close()
+
+
+def run(steps, publishes):
+    path = os.path.join(tempfile.mkdtemp(), "sse.db")
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SSE_MAX_SUBSCRIBERS": max(steps) + 1,
+        "SSE_HEARTBEAT_SECONDS": 30,
+    })
+    db.create_all()
+    street = Street(name="Load Street")
+    driver = Driver(username="load_van", password="x", name="Load Van", location="Depot")
+    db.session.add_all([street, driver])
+    db.session.flush()
+    driver.schedule_drive(street, datetime.now(timezone.utc), notify=False)
+    url = f"/api/streets/{street.street_id}/events"
+
+    client = app.test_client()
+    received = [0]
+    greenlets = []
+    baseline = rss_mb()
+    print(f"{'connections':>12} {'rss (MB)':>10} {'KB/conn':>9}")
+    print(f"{0:>12} {baseline:10.1f} {'-':>9}")
+    for target in steps:
+        while len(greenlets) < target:
+            greenlets.append(gevent.spawn(listen, client, url, received))
+        while get_event_hub().stats()["subscribers"] < target:
+            gevent.sleep(0.05)
+        rss = rss_mb()
+        print(f"{target:>12} {rss:10.1f} {(rss - baseline) * 1024 / target:9.2f}")
+
+    # the snapshot event each listener received on connect
+    received[0] = 0
+    start = time.perf_counter()
+    for i in range(publishes):
+        report_driver_location(driver.id, f"Position {i}")
+        gevent.sleep(0)
+    # coalesced updates never arrive, so wait until deliveries settle
+    last, last_change = -1, time.perf_counter()
+    while time.perf_counter() - last_change < 0.2:
+        if received[0] != last:
+            last, last_change = received[0], time.perf_counter()
+        gevent.sleep(0.01)
+    elapsed = last_change - start
+    stats = get_event_hub().stats()
+    print(f"\n{publishes} updates -> {received[0]} deliveries to {len(greenlets)} listeners in {elapsed:.3f}s "
+          f"({stats['dropped']} dropped by backpressure)")
+    gevent.killall(greenlets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", default="1000,2500,5000,10000")
+    parser.add_argument("--publishes", type=int, default=20)
+    args = parser.parse_args()
+    run([int(s) for s in args.steps.split(",")], args.publishes)
@@ -0,0 +1,145 @@
+"""Cold start: import time, create_app time and memory per process role.
+
+Each role is measured in a fresh interpreter, reporting seconds to import
+App.main, seconds in create_app, the process's RSS and how many modules
+were loaded. --cli also times a whole `flask street list` run.
+
+--gunicorn N boots N gevent workers twice, without and with preload_app,
+and reports time until /health answers and each worker's RSS, PSS (its
+share of pages it has in common with the other processes) and private
+memory from /proc/<pid>/smaps_rollup (Linux only).
+
+    python -m benchmarks.startup --repeat 3 --cli --gunicorn 4
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from App.main import create_app
+imported = time.perf_counter()
+create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}, role=sys.argv[1])
+created = time.perf_counter()
+with open('/proc/self/status') as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+print(json.dumps({'import': imported - start, 'create': created - imported, 'rss_kb': rss, 'modules': len(sys.modules)}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def environment(**extra):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("APP_ROLE", None)
+    env.update(extra)
+    return env
+
+
+def probe(role):
+    out = subprocess.run([sys.executable, "-c", PROBE, role], cwd=ROOT, env=environment(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def roles(repeat):
+    print(f"{'role':<8} {'import s':>9} {'create s':>9} {'rss MB':>8} {'modules':>8}")
+    for role in ("web", "cli", "worker"):
+        runs = [probe(role) for _ in range(repeat)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{role:<8} {median['import']:9.3f} {median['create']:9.3f} "
+              f"{median['rss_kb'] / 1024:8.1f} {median['modules']:8.0f}")
+
+
+def cli(repeat):
+    database = os.path.join(tempfile.mkdtemp(), "startup.db")
+    subprocess.run(["flask", "--app", "wsgi", "init", "db"], cwd=ROOT, capture_output=True, check=True,
+                   env=environment(FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}"))
+    print(f"\n{'flask street list':<18} {'wall s':>8}")
+    for role in ("web", "cli"):
+        env = environment(APP_ROLE=role, FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}")
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(["flask", "--app", "wsgi", "street", "list"], cwd=ROOT, env=env,
+                           capture_output=True, check=True)
+            times.append(time.perf_counter() - start)
+        print(f"{'role=' + role:<18} {statistics.median(times):8.3f}")
+
+
+def smaps(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), private
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as listing:
+        return [int(child) for child in listing.read().split()]
+
+
+def boot(workers, preload, port):
+    env = environment(GUNICORN_PRELOAD="1" if preload else "0", WEB_CONCURRENCY=str(workers),
+                      FLASK_SQLALCHEMY_DATABASE_URI="sqlite://")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "--bind", f"127.0.0.1:{port}",
+         "--access-logfile", "/dev/null", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                break
+            except OSError:
+                if server.poll() is not None or time.perf_counter() - start > 60:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.05)
+        ready = time.perf_counter() - start
+        # the first answer may come before every worker has booted
+        while len(children(server.pid)) < workers:
+            time.sleep(0.05)
+        time.sleep(1)
+        memory = [smaps(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+    return ready, memory
+
+
+def gunicorn(workers, port):
+    print(f"\n{'gunicorn x' + str(workers):<14} {'ready s':>8} {'rss MB':>8} {'pss MB':>8} {'private MB':>11} {'total pss MB':>13}")
+    for preload in (False, True):
+        ready, memory = boot(workers, preload, port)
+        rss, pss, private = (statistics.mean(worker[i] for worker in memory) / 1024 for i in range(3))
+        total = sum(worker[1] for worker in memory) / 1024
+        print(f"{'preload' if preload else 'no preload':<14} {ready:8.2f} {rss:8.1f} {pss:8.1f} {private:11.1f} {total:13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cli", action="store_true", help="also time `flask street list` per role")
+    parser.add_argument("--gunicorn", type=int, default=0, metavar="WORKERS",
+                        help="also boot this many gunicorn workers with and without preload")
+    parser.add_argument("--port", type=int, default=18080)
+    args = parser.parse_args()
+    roles(args.repeat)
+    if args.cli:
+        cli(args.repeat)
+    if args.gunicorn:
+        gunicorn(args.gunicorn, args.port)
@@ -0,0 +1,313 @@
+"""In-process benchmark suite for controllers and endpoints.
+
+Generates datasets of several sizes (flask init db --scale), then drives
+the controllers directly and the views through the Flask test client. For
+each scenario it reports p50/p95/p99 latency, SQL statements per call and
+peak traced memory.
+
+    python -m benchmarks.suite --scales 1,5 --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --scales 1,5 --compare benchmarks/baselines/local.json
+
+--compare exits with status 1 if any metric is worse than the baseline
+by more than --threshold (default 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from App.main import create_app
+from App.database import db
+from App.models import Resident, Route
+from App.controllers import (
+    login,
+    get_all_users_json,
+    get_inbox,
+    schedule_route,
+    schedule_routes,
+    generate_dataset,
+    DATASET_PASSWORD,
+    DATASET_EPOCH,
+    DAYS,
+    DRIVERS_PER_SCALE,
+    STREETS_PER_SCALE,
+)
+
+SCENARIOS = {}
+
+
+def scenario(name, iterations=50):
+    def register(setup):
+        SCENARIOS[name] = (setup, iterations)
+        return setup
+    return register
+
+
+class Dataset:
+    """What scenarios need to know about the generated data."""
+
+    def __init__(self, app, scale, seed):
+        self.app = app
+        self.client = app.test_client()
+        self.rng = random.Random(seed)
+        self.scale = scale
+        residents = Resident.__table__
+        self.resident_ids = db.session.scalars(db.select(residents.c.id).order_by(residents.c.id)).all()
+        self.driver_ids = list(range(1, DRIVERS_PER_SCALE * scale + 1))
+        self.street_ids = list(range(1, STREETS_PER_SCALE * scale + 1))
+        self.route_ids = db.session.scalars(db.select(Route.route_id)).all()
+
+    def resident(self):
+        return self.rng.choice(self.resident_ids)
+
+    def auth_headers(self, user_id):
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+@scenario("login", iterations=20)
+def login_scenario(data):
+    return lambda: login(f"resident{data.resident()}", DATASET_PASSWORD)
+
+
+@scenario("get_all_users_json", iterations=5)
+def all_users_scenario(data):
+    return get_all_users_json
+
+
+@scenario("GET /api/users", iterations=5)
+def api_users_scenario(data):
+    return lambda: data.client.get("/api/users").data
+
+
+@scenario("GET /api/users?stream=1", iterations=5)
+def api_users_stream_scenario(data):
+    return lambda: data.client.get("/api/users?stream=1").data
+
+
+@scenario("GET /api/users?limit=50")
+def api_users_page_scenario(data):
+    def run():
+        cursor = data.rng.choice(data.resident_ids)
+        return data.client.get(f"/api/users?limit=50&cursor={cursor}").data
+    return run
+
+
+@scenario("schedule_route", iterations=20)
+def schedule_scenario(data):
+    return lambda: schedule_route(
+        data.rng.choice(data.driver_ids), data.rng.choice(data.street_ids), datetime.now(timezone.utc)
+    )
+
+
+@scenario("schedule_routes (week)", iterations=3)
+def schedule_week_scenario(data):
+    weeks = iter(range(1, 1000))
+
+    def run():
+        # every driver, two routes a day, in a week nothing is booked yet
+        monday = DATASET_EPOCH + timedelta(days=DAYS * next(weeks))
+        return schedule_routes([
+            {
+                'driver_id': driver_id,
+                'street_id': data.rng.choice(data.street_ids),
+                'scheduled_time': monday + timedelta(days=day, hours=hour),
+                'duration': 90,
+            }
+            for driver_id in data.driver_ids
+            for day in range(7)
+            for hour in (8, 13)
+        ])
+    return run
+
+
+@scenario("request_stop")
+def request_stop_scenario(data):
+    def run():
+        resident = db.session.get(Resident, data.resident())
+        route = db.session.get(Route, data.rng.choice(data.route_ids))
+        return resident.request_stop(route, quantity=2, notes="benchmark")
+    return run
+
+
+@scenario("get_inbox")
+def inbox_controller_scenario(data):
+    return lambda: get_inbox(data.resident(), limit=20)
+
+
+@scenario("GET /api/inbox")
+def inbox_api_scenario(data):
+    headers = {}
+
+    def run():
+        resident_id = data.resident()
+        headers.setdefault(resident_id, data.auth_headers(resident_id))
+        return data.client.get("/api/inbox?limit=20", headers=headers[resident_id]).data
+    return run
+
+
+@scenario("GET /api/drivers/<id>/dashboard")
+def dashboard_scenario(data):
+    headers = {}
+    window = f"from={DATASET_EPOCH.isoformat()}&to={(DATASET_EPOCH + timedelta(days=DAYS)).isoformat()}"
+
+    def run():
+        driver_id = data.rng.choice(data.driver_ids)
+        headers.setdefault(driver_id, data.auth_headers(driver_id))
+        return data.client.get(f"/api/drivers/{driver_id}/dashboard?{window}", headers=headers[driver_id]).data
+    return run
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(data, setup, iterations):
+    run = setup(data)
+    run()  # warm caches and lazy imports
+    db.session.remove()
+
+    timings = []
+    with StatementCounter(db.engine) as counter:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+            db.session.remove()
+
+    # memory is traced in a separate pass, tracemalloc distorts timings
+    tracemalloc.start()
+    for _ in range(min(iterations, 5)):
+        run()
+        db.session.remove()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "statements": counter.count / iterations,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_suite(scales, seed, selected, database_dir):
+    results = {}
+    for scale in scales:
+        path = os.path.join(database_dir, f"bench-scale-{scale}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "DRIVER_BUFFER_BACKGROUND_FLUSH": False,
+        })
+        with app.app_context():
+            db.create_all()
+            print(f"\n== scale {scale}: generating dataset")
+            generate_dataset(scale, seed, report=lambda line: None)
+            data = Dataset(app, scale, seed)
+            print(f"{'scenario':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'stmts':>7} {'peak KB':>9}")
+            for name, (setup, iterations) in SCENARIOS.items():
+                if selected and name not in selected:
+                    continue
+                result = measure(data, setup, iterations)
+                results[f"{name}@{scale}"] = result
+                print(f"{name:<28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+                      f"{result['statements']:7.1f} {result['peak_kb']:9.0f}")
+            db.session.remove()
+            db.engine.dispose()
+    return results
+
+
+COMPARED_METRICS = ("p50_ms", "p95_ms", "statements", "peak_kb")
+# differences below these are timer/allocator noise, whatever the percentage
+NOISE_FLOOR = {"p50_ms": 0.5, "p95_ms": 1.0, "statements": 0.0, "peak_kb": 64.0}
+
+
+def compare(results, baseline, threshold):
+    """Return human-readable regressions of results against a baseline."""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous[metric], result[metric]
+            # statement counts are exact, so any increase is a regression
+            limit = before if metric == "statements" else before * (1 + threshold)
+            if after > limit and after - before > NOISE_FLOOR[metric]:
+                regressions.append(f"{key}: {metric} {before:.2f} -> {after:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,5", help="comma separated dataset scales")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="comma separated scenario names")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    selected = {name.strip() for name in args.only.split(",") if name.strip()}
+    results = run_suite([int(s) for s in args.scales.split(",")], args.seed, selected, tempfile.mkdtemp())
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "seed": args.seed,
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"\nbaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,43 @@
 # gunicorn_config.py
 import multiprocessing
+import os
 
 # The socket to bind.
 # "0.0.0.0" to bind to all interfaces. 8000 is the port number.
 bind = "0.0.0.0:8080"
 
 # The number of worker processes for handling requests.
-workers = 4
+# App/config.py sizes each worker's database pool from the same values.
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
 
 # Use the 'gevent' worker type for async performance.
 worker_class = 'gevent'
 
+# Maximum concurrent greenlets (connections) per worker.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
 # Log level
 loglevel = 'info'
 
 # Where to log to
 accesslog = '-'  # '-' means log to stdout
-errorlog = '-'  # '-' means log to stderr
\ No newline at end of file
+errorlog = '-'  # '-' means log to stderr
+
+# Import the app once in the master and fork the workers from it, so the
+# imported modules are shared copy-on-write instead of loaded per worker.
+# GUNICORN_PRELOAD=0 goes back to importing in each worker (needed for
+# `--reload`).
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+if preload_app and worker_class == 'gevent':
+    # the gevent worker patches after the fork, too late for modules the
+    # master already imported (threading, socket, the database drivers)
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def post_fork(server, worker):
+    # connections opened while the master loaded the app must not be shared
+    if preload_app:
+        from App.main import reset_after_fork
+        reset_after_fork(server.app.wsgi())
@@ -0,0 +1,103 @@
+"""baseline schema
+
+The tables as the app first shipped them, before is_read, unread_count,
+the coordinates, route durations, jobs and the summary tables. Databases
+made with `flask init` back then already have them, so tables that exist
+are left alone and `flask db upgrade` can run on those directly.
+
+Revision ID: 3c1d2e8f4a01
+Revises:
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d2e8f4a01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def upgrade():
+    _create_table(
+        'streets',
+        sa.Column('street_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('street_id'),
+        sa.UniqueConstraint('name'),
+    )
+    _create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=False),
+        sa.Column('password', sa.String(length=200), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('contact', sa.String(length=100), nullable=True),
+        sa.Column('user_type', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+    )
+    _create_table(
+        'drivers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('location', sa.String(length=200), nullable=True),
+        sa.ForeignKeyConstraint(['id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(
+        'residents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('street_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['users.id']),
+        sa.ForeignKeyConstraint(['street_id'], ['streets.street_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(
+        'routes',
+        sa.Column('route_id', sa.Integer(), nullable=False),
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('street_id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.ForeignKeyConstraint(['driver_id'], ['drivers.id']),
+        sa.ForeignKeyConstraint(['street_id'], ['streets.street_id']),
+        sa.PrimaryKeyConstraint('route_id'),
+    )
+    _create_table(
+        'notifications',
+        sa.Column('notification_id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.String(length=200), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('resident_id', sa.Integer(), nullable=False),
+        sa.Column('route_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['resident_id'], ['residents.id']),
+        sa.ForeignKeyConstraint(['route_id'], ['routes.route_id']),
+        sa.PrimaryKeyConstraint('notification_id'),
+    )
+    _create_table(
+        'stop_requests',
+        sa.Column('request_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('route_id', sa.Integer(), nullable=False),
+        sa.Column('resident_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('notes', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['resident_id'], ['residents.id']),
+        sa.ForeignKeyConstraint(['route_id'], ['routes.route_id']),
+        sa.PrimaryKeyConstraint('request_id'),
+    )
+
+
+def downgrade():
+    for name in ('stop_requests', 'notifications', 'routes', 'residents', 'drivers', 'users', 'streets'):
+        op.drop_table(name)
@@ -0,0 +1,132 @@
+"""unread counts, coordinates, route durations, jobs and summary tables
+
+Brings a baseline database up to the current models: notifications.is_read
+and residents.unread_count (backfilled from the notifications), driver and
+street coordinates, routes.duration, and the jobs, route_alerts,
+route_demand (backfilled from stop_requests) and collection_versions
+tables, and the query indexes (the partial unread index needs is_read, so
+it can only come after that column). Columns, tables and indexes that are
+already there (say from a create_all after the models changed) are skipped.
+
+Revision ID: 8b7e5f0c2d94
+Revises: 3c1d2e8f4a01
+Create Date: 2026-10-18 19:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7e5f0c2d94'
+down_revision = '3c1d2e8f4a01'
+branch_labels = None
+depends_on = None
+
+
+def _add_column(table, column):
+    if column.name not in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}:
+        op.add_column(table, column)
+
+
+def _create_table(name, *columns):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _create_index(name, table, columns, **kw):
+    if name not in {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}:
+        op.create_index(name, table, columns, **kw)
+
+
+INDEXES = (
+    ('ix_jobs_status_run_at', 'jobs', ['status', 'run_at', 'id'], {}),
+    ('ix_notifications_resident_timestamp', 'notifications', ['resident_id', 'timestamp', 'notification_id'], {}),
+    ('ix_notifications_route_id', 'notifications', ['route_id'], {}),
+    ('ix_notifications_resident_unread', 'notifications', ['resident_id', 'timestamp', 'notification_id'], {
+        'sqlite_where': sa.text('is_read = 0'),
+        'postgresql_where': sa.text('NOT is_read'),
+    }),
+    ('ix_residents_street_id', 'residents', ['street_id'], {}),
+    ('ix_routes_driver_scheduled', 'routes', ['driver_id', 'scheduled_time'], {}),
+    ('ix_routes_street_scheduled', 'routes', ['street_id', 'scheduled_time'], {}),
+    ('ix_stop_requests_route_status', 'stop_requests', ['route_id', 'status'], {}),
+    ('ix_stop_requests_resident_created', 'stop_requests', ['resident_id', 'created_at'], {}),
+)
+
+
+def upgrade():
+    _add_column('notifications', sa.Column('is_read', sa.Boolean(), nullable=False, server_default=sa.false()))
+    _add_column('residents', sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'))
+    _add_column('drivers', sa.Column('lat', sa.Float(), nullable=True))
+    _add_column('drivers', sa.Column('lon', sa.Float(), nullable=True))
+    _add_column('streets', sa.Column('lat', sa.Float(), nullable=True))
+    _add_column('streets', sa.Column('lon', sa.Float(), nullable=True))
+    _add_column('routes', sa.Column('duration', sa.Integer(), nullable=False, server_default='60'))
+
+    _create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(
+        'route_alerts',
+        sa.Column('route_id', sa.Integer(), nullable=False),
+        sa.Column('threshold_minutes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['route_id'], ['routes.route_id']),
+        sa.PrimaryKeyConstraint('route_id', 'threshold_minutes'),
+    )
+    _create_table(
+        'route_demand',
+        sa.Column('route_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['route_id'], ['routes.route_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('route_id', 'status'),
+    )
+    _create_table(
+        'collection_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    for name, table, columns, kw in INDEXES:
+        _create_index(name, table, columns, **kw)
+
+    # every existing notification starts unread; the counters and the
+    # demand summary are recomputed from the rows, so a rerun is harmless
+    from App.models import Notification, RouteDemand
+    Notification.rebuild_unread_counts(op.get_bind())
+    RouteDemand.rebuild(op.get_bind())
+
+
+def downgrade():
+    for name, table, columns, kw in INDEXES:
+        if table != 'jobs':
+            op.drop_index(name, table_name=table)
+    for name in ('collection_versions', 'route_demand', 'route_alerts', 'jobs'):
+        op.drop_table(name)
+    for table, columns in (
+        ('routes', ('duration',)),
+        ('streets', ('lat', 'lon')),
+        ('drivers', ('lat', 'lon')),
+        ('residents', ('unread_count',)),
+        ('notifications', ('is_read',)),
+    ):
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column)
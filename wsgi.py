@@ -1,22 +1,51 @@
 import click
+import csv
+import sys
+import time
 from flask.cli import AppGroup
 from datetime import datetime, timezone, timedelta
-from App.database import db, get_migrate
-from App.main import create_app
-from App.models import User, Driver, Resident, Street, Route, StopRequest, Notification
+from App.database import db, get_migrate, create_indexes
+from App.geo import valid_position
+from App.jobs import run_workers, queue_stats, retry_failed_jobs
+from App.main import create_app, flask_command, process_role
+from App.models import User, Driver, Resident, Street, Route, StopRequest, Notification, RouteAlert
+from App.controllers import (
+    report_driver_location, report_driver_status, report_driver_position, flush_driver_updates,
+    valid_driver_text, DRIVER_TEXT_LENGTHS,
+    find_drivers_near_street,
+    get_inbox, get_unread_count, mark_notification_read, mark_all_notifications_read,
+    generate_dataset, DATASET_PASSWORD, schedule_routes, parse_route_entry,
+    get_loading_sheet, confirm_stop_request, cancel_stop_request, rebuild_route_demand, verify_route_demand,
+    read_import_rows, import_rows, IMPORT_FORMATS, IMPORT_CHUNK_SIZE
+)
 
-# Create Flask app
-app = create_app()
-migrate = get_migrate(app)
+# Create Flask app; CLI commands get the cli role (no blueprints or admin)
+# and gunicorn, which imports this module, gets the web role
+command = flask_command(sys.argv)
+app = create_app(role=process_role(command))
+if command is not None:
+    migrate = get_migrate(app)
 
 # --- SYSTEM COMMANDS --- #
 
 init_cli = AppGroup('init', help='Database initialization commands') 
 
 @init_cli.command('db', help="Initialize and seed the database")
-def init_db():
+@click.option("--scale", default=0, type=int, help="Generate a synthetic dataset of this size instead of the demo rows")
+@click.option("--seed", default=42, type=int, help="Random seed for --scale datasets")
+@click.option("--chunk-size", default=10000, type=int, help="Rows per insert batch for --scale datasets")
+def init_db(scale, seed, chunk_size):
+    from flask_migrate import stamp
     db.drop_all()
     db.create_all()
+    # create_all built the current schema; record it so `flask db upgrade` starts from here
+    stamp()
+    
+    if scale:
+        print(f" Generating dataset at scale {scale} (seed {seed})...")
+        counts = generate_dataset(scale, seed, chunk_size)
+        print(f" Generated {sum(counts.values())} rows. Every user's password is '{DATASET_PASSWORD}'.")
+        return
     
     # --- 1. Seed Streets (6 Streets) ---
     print(" 1. Seeding Streets...")
@@ -24,7 +53,11 @@ def init_db():
         "Main Street", "Oak Avenue", "Cedar Lane", "Willow Drive", 
         "Pine Close", "Elm Road"
     ]
-    streets = [Street(name=name) for name in streets_data]
+    street_points = [
+        (10.6520, -61.5120), (10.6575, -61.5030), (10.6490, -61.4955),
+        (10.6610, -61.4890), (10.6445, -61.5070), (10.6680, -61.5005)
+    ]
+    streets = [Street(name=name, lat=lat, lon=lon) for name, (lat, lon) in zip(streets_data, street_points)]
     db.session.add_all(streets)
     db.session.flush() 
     
@@ -58,6 +91,12 @@ def init_db():
     
     d_alice, d_bob, d_charlie, d_david, d_eve, d_frank = drivers
     
+    # positions for the drivers that share one; Eve and Frank aren't tracked
+    d_alice.lat, d_alice.lon = 10.6523, -61.5112
+    d_bob.lat, d_bob.lon = 10.6418, -61.4990
+    d_charlie.lat, d_charlie.lon = 10.6560, -61.4970
+    d_david.lat, d_david.lon = 10.6418, -61.4990
+    
     # --- 3. Seed Residents (10 Residents) ---
     print(" 3. Seeding Residents...")
     residents = [
@@ -158,9 +197,24 @@ def init_db():
                      message=f"Driver {d_charlie.name} has cancelled the route to {s_cedar.name}."),
     ]
     db.session.add_all(notifications)
+    # Notif 6 is a geofence alert; record it so the engine doesn't send it again
+    db.session.add_all([
+        RouteAlert(route_id=rt_alice_main.route_id, threshold_minutes=10),
+        RouteAlert(route_id=rt_alice_main.route_id, threshold_minutes=5),
+    ])
+    db.session.flush()
+    Notification.rebuild_unread_counts()
     
     db.session.commit()
     print(" Database initialized and seeded with 6 Drivers, 6 Streets, 10 Residents, 5 Routes, 5 Stop Requests, and 10 Notifications.")
+
+@init_cli.command('indexes', help="Recreate model indexes missing from an up-to-date database (upgrade with `flask db upgrade`)")
+def init_indexes():
+    created = create_indexes()
+    for name in created:
+        print(f" Created index {name}")
+    print(f" {len(created)} index(es) created")
+
 app.cli.add_command(init_cli)
 
 # --- DRIVER COMMANDS --- #
@@ -198,22 +252,86 @@ def schedule_route(driver_id, street_id):
         print(f" Street with ID {street_id} not found")
         return
     
-    route = Route(driver_id=driver.id, street_id=street.street_id, scheduled_time=datetime.now(timezone.utc), status="scheduled")
-    db.session.add(route)
-    
-    # Notify all residents of that street
-    residents = Resident.query.filter_by(street_id=street.street_id).all()
-    for resident in residents:
-        notification = Notification(
-            resident_id=resident.id, 
-            route_id=route.route_id, 
-            message=f"Driver {driver.name} scheduled to visit {street.name} at {route.scheduled_time}"
-        )
-        db.session.add(notification)
-    
-    db.session.commit()
+    # Flushes the route, then notifies the whole street with one INSERT ... SELECT
+    driver.schedule_drive(street, datetime.now(timezone.utc))
     print(f" Driver {driver.name} scheduled route to {street.name}")
 
+@driver_cli.command("schedule-batch", help="Schedule routes from a CSV file")
+@click.argument("file", type=click.File("r"))
+@click.option("--dry-run", is_flag=True, help="Only report conflicts, write nothing")
+@click.option("--no-notify", is_flag=True, help="Do not notify the streets' residents")
+def schedule_batch(file, dry_run, no_notify):
+    """FILE has a header row: driver_id,street_id,scheduled_time[,duration].
+
+    scheduled_time is ISO 8601 (UTC when no offset is given) and duration is
+    in minutes. Rows that don't parse are reported with their line number
+    and skipped; the others are still scheduled.
+    """
+    entries, invalid = [], []
+    reader = csv.DictReader(file)
+    for row in reader:
+        try:
+            entry = parse_route_entry(row)
+        except ValueError as e:
+            invalid.append((reader.line_num, str(e)))
+            continue
+        entry['line'] = reader.line_num
+        entries.append(entry)
+    start = time.perf_counter()
+    accepted, rejected = schedule_routes(entries, notify=not no_notify, dry_run=dry_run)
+    elapsed = time.perf_counter() - start
+    for entry in rejected:
+        invalid.append((entry['line'], f"driver {entry['driver_id']} street {entry['street_id']} "
+                                       f"at {entry['scheduled_time']}: {entry['error']}"))
+    for line, error in sorted(invalid):
+        print(f"   rejected line {line}: {error}")
+    verb = "would be scheduled" if dry_run else "scheduled"
+    print(f" {len(accepted)} route(s) {verb}, {len(invalid)} rejected in {elapsed:.2f}s")
+
+@driver_cli.command("report", help="Report a driver's location and/or status")
+@click.argument("driver_id", type=int)
+@click.option("--location", default=None)
+@click.option("--status", default=None)
+@click.option("--lat", type=float, default=None)
+@click.option("--lon", type=float, default=None)
+def report_driver(driver_id, location, status, lat, lon):
+    # checked before anything is recorded so a bad option doesn't leave the others half applied
+    if (lat is None) != (lon is None):
+        raise click.UsageError("--lat and --lon must be given together")
+    if lat is not None and not valid_position(lat, lon):
+        raise click.UsageError(f"({lat}, {lon}) is not a valid position")
+    for name, value in (('location', location), ('status', status)):
+        if not valid_driver_text(value, DRIVER_TEXT_LENGTHS[name]):
+            raise click.UsageError(f"--{name} must be at most {DRIVER_TEXT_LENGTHS[name]} characters")
+    if lat is not None:
+        report_driver_position(driver_id, lat, lon)
+    if location is not None:
+        report_driver_location(driver_id, location)
+    if status is not None:
+        report_driver_status(driver_id, status)
+    written = flush_driver_updates()
+    print(f" Driver {driver_id} update recorded ({written} row(s) written)")
+
+@driver_cli.command("loading-sheet", help="Show what to load for a route")
+@click.argument("route_id", type=int)
+def loading_sheet(route_id):
+    sheet = get_loading_sheet(route_id)
+    if not sheet:
+        print(f" Route with ID {route_id} not found")
+        return
+    print(f" Route {sheet['route_id']}: {sheet['driver_name']} to {sheet['street_name']} at {sheet['scheduled_time']}")
+    for status, totals in sorted(sheet['by_status'].items()):
+        print(f"   {status:<10} {totals['requests']:>6} request(s) {totals['quantity']:>6} loaves")
+    print(f"   To load: {sheet['quantity']} loaves for {sheet['requests']} stop(s)")
+
+@driver_cli.command("confirm-stop", help="Confirm a resident's stop request")
+@click.argument("request_id", type=int)
+def confirm_stop(request_id):
+    if not confirm_stop_request(request_id):
+        print(f" Stop request with ID {request_id} not found")
+        return
+    print(f" Stop request {request_id} confirmed")
+
 app.cli.add_command(driver_cli)
 
 # --- RESIDENT COMMANDS --- #
@@ -244,25 +362,50 @@ def create_resident(username, password, name, street_id):
     db.session.commit()
     print(f" Resident '{username}' created!")
 
-@resident_cli.command("inbox", help="View a resident's notifications")
+@resident_cli.command("inbox", help="View a resident's newest notifications")
 @click.argument("resident_id", type=int)
-def inbox(resident_id):
-    resident = Resident.query.get(resident_id)
+@click.option("--limit", default=20, help="Notifications per page")
+@click.option("--cursor", default=None, help="next_cursor printed by the previous page")
+@click.option("--unread", is_flag=True, help="Only show unread notifications")
+def inbox(resident_id, limit, cursor, unread):
+    resident = db.session.get(Resident, resident_id)
     if not resident:
         print(f" Resident with ID {resident_id} not found")
         return
     
-    print(f" Notifications for {resident.name}:")
-    if not resident.notifications:
+    try:
+        notifications, next_cursor = get_inbox(resident.id, cursor, limit, unread)
+    except ValueError:
+        raise click.UsageError("--cursor must be a next_cursor printed by a previous page")
+    print(f" Notifications for {resident.name} ({get_unread_count(resident.id)} unread):")
+    if not notifications:
         print("   No notifications")
-    for notification in resident.notifications:
-        print(f"   [{notification.timestamp}] {notification.message}")
+    for notification in notifications:
+        marker = " " if notification.is_read else "*"
+        print(f"  {marker}#{notification.notification_id} [{notification.timestamp}] {notification.message}")
+    if next_cursor:
+        print(f"   More: --cursor {next_cursor}")
+
+@resident_cli.command("read", help="Mark a resident's notification(s) as read")
+@click.argument("resident_id", type=int)
+@click.argument("notification_id", type=int, required=False)
+@click.option("--all", "read_all", is_flag=True, help="Mark every notification read")
+def read_notifications(resident_id, notification_id, read_all):
+    if read_all:
+        print(f" Marked {mark_all_notifications_read(resident_id)} notification(s) read")
+    elif notification_id is None:
+        print(" Give a notification id or --all")
+    elif mark_notification_read(resident_id, notification_id):
+        print(f" Notification {notification_id} marked read")
+    else:
+        print(f" Notification {notification_id} not found or already read")
 
 @resident_cli.command("request-stop", help="Request a stop for a route")
 @click.argument("resident_id", type=int)
 @click.argument("route_id", type=int)
 @click.argument("notes", default="Need bread")
-def request_stop(resident_id, route_id, notes):
+@click.option("--quantity", type=int, default=None, help="Loaves wanted")
+def request_stop(resident_id, route_id, notes, quantity):
     resident = Resident.query.get(resident_id)
     route = Route.query.get(route_id)
     
@@ -273,21 +416,18 @@ def request_stop(resident_id, route_id, notes):
         print(f" Route with ID {route_id} not found")
         return
     
-    stop_request = StopRequest(resident_id=resident.id, route_id=route.route_id, notes=notes)
-    db.session.add(stop_request)
-    
-    # Notify driver
-    driver = Driver.query.get(route.driver_id)
-    notification = Notification(
-        resident_id=resident.id, 
-        route_id=route.route_id, 
-        message=f"Stop requested on {route.street.name} by {resident.name}. Notes: {notes}"
-    )
-    db.session.add(notification)
-    
-    db.session.commit()
+    # the confirmation notification is delivered by `flask worker run`
+    resident.request_stop(route, quantity=quantity, notes=notes)
     print(f" {resident.name} requested stop on {route.street.name}")
 
+@resident_cli.command("cancel-stop", help="Cancel a stop request")
+@click.argument("request_id", type=int)
+def cancel_stop(request_id):
+    if not cancel_stop_request(request_id):
+        print(f" Stop request with ID {request_id} not found")
+        return
+    print(f" Stop request {request_id} cancelled")
+
 @resident_cli.command("driver-status", help="View driver status and location")
 @click.argument("driver_id", type=int)
 def driver_status(driver_id):
@@ -319,17 +459,123 @@ def list_streets():
     streets = Street.query.all()
     print(" Streets:")
     for street in streets:
-        print(f"   ID: {street.street_id}, Name: {street.name}")
+        print(f"   ID: {street.street_id}, Name: {street.name}, Position: {street.lat}, {street.lon}")
 
 @street_cli.command("create", help="Create a new street")
 @click.argument("name")
-def create_street(name):
-    street = Street(name=name)
+@click.option("--lat", type=float, default=None)
+@click.option("--lon", type=float, default=None)
+def create_street(name, lat, lon):
+    street = Street(name=name, lat=lat, lon=lon)
     db.session.add(street)
     db.session.commit()
     print(f" Street '{name}' created!")
 
+@street_cli.command("drivers", help="List the drivers closest to a street")
+@click.argument("street_id", type=int)
+@click.option("--k", default=5, type=int, help="How many drivers")
+@click.option("--radius-km", default=None, type=float, help="Only drivers within this distance")
+def street_drivers(street_id, k, radius_km):
+    drivers = find_drivers_near_street(street_id, k, radius_km)
+    if drivers is None:
+        print(f" Street with ID {street_id} not found or has no coordinates")
+        return
+    print(f" Drivers nearest street {street_id}:")
+    for driver in drivers:
+        print(f"   ID: {driver['id']}, {driver['distance_km']:.2f} km, Status: {driver['status']}, Location: {driver['location']}")
+
 app.cli.add_command(street_cli)
 
+# --- WORKER COMMANDS --- #
+
+worker_cli = AppGroup("worker", help="Background job queue commands")
+
+@worker_cli.command("run", help="Run background job workers")
+@click.option("--processes", default=1, type=int, help="Worker processes to start")
+@click.option("--once", is_flag=True, help="Exit once no job is due instead of polling")
+@click.option("--idle-sleep", default=0.5, type=float, help="Seconds between polls of an empty queue")
+def run_worker(processes, once, idle_sleep):
+    print(f" Starting {processes} worker(s)...")
+    run_workers(app, processes=processes, once=once, idle_sleep=idle_sleep)
+
+@worker_cli.command("stats", help="Show queue depth and lag")
+def worker_stats():
+    stats = queue_stats()
+    print(f" Lag of the oldest due job: {stats['lag_seconds']:.1f}s")
+    for row in stats['depth']:
+        print(f"   {row['kind']:<20} {row['status']:<8} {row['jobs']:>8} job(s), oldest run_at {row['oldest_run_at']}")
+
+@worker_cli.command("retry-failed", help="Queue failed jobs again")
+@click.option("--kind", default=None, help="Only jobs of this kind")
+def worker_retry_failed(kind):
+    print(f" {retry_failed_jobs(kind)} job(s) queued again")
+
+app.cli.add_command(worker_cli)
+
+# --- DEMAND COMMANDS --- #
+
+demand_cli = AppGroup("demand", help="Route demand summary commands")
+
+@demand_cli.command("rebuild", help="Recompute the demand summary from stop requests")
+def demand_rebuild():
+    start = time.perf_counter()
+    written = rebuild_route_demand()
+    print(f" route_demand rebuilt: {written} row(s) in {time.perf_counter() - start:.2f}s")
+
+@demand_cli.command("verify", help="Compare the demand summary with stop requests")
+@click.option("--repair", is_flag=True, help="Rebuild the summary if it disagrees")
+def demand_verify(repair):
+    mismatches = verify_route_demand(repair=repair)
+    for route_id, status, expected, found in mismatches[:50]:
+        print(f"   route {route_id} {status}: expected {expected}, found {found}")
+    if not mismatches:
+        print(" route_demand matches stop_requests")
+    elif repair:
+        print(f" {len(mismatches)} mismatch(es) found; route_demand rebuilt")
+    else:
+        print(f" {len(mismatches)} mismatch(es) found; run with --repair to rebuild")
+        raise SystemExit(1)
+
+app.cli.add_command(demand_cli)
+
+# --- IMPORT COMMANDS --- #
+
+import_cli = AppGroup("import", help="Bulk import from CSV or JSON Lines files")
+
+def _run_import(kind, file, fmt, chunk_size):
+    if fmt is None:
+        fmt = 'jsonl' if file.name.endswith(('.jsonl', '.ndjson')) else 'csv'
+    print(f" Importing {kind.replace('_', ' ')} from {file.name} ({fmt}, {chunk_size} rows per transaction)...")
+    summary = import_rows(kind, read_import_rows(file, fmt), chunk_size=chunk_size, report=print)
+    for error in summary['errors']:
+        print(f"   line {error['line']}: {error['error']}")
+    if summary['rejected'] > len(summary['errors']):
+        print(f"   ... and {summary['rejected'] - len(summary['errors'])} more")
+    print(f" {summary['imported']} imported, {summary['rejected']} rejected of {summary['rows']} row(s) "
+          f"in {summary['seconds']:.2f}s ({summary['rows_per_second']:.0f} rows/s)")
+
+def _import_options(command):
+    command = click.argument("file", type=click.File("rb"))(command)
+    command = click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default=None,
+                           help="Default: jsonl for .jsonl/.ndjson files, otherwise csv")(command)
+    return click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, type=int, help="Rows per transaction")(command)
+
+@import_cli.command("streets", help="Import streets: name[,lat,lon]")
+@_import_options
+def import_streets(file, fmt, chunk_size):
+    _run_import('streets', file, fmt, chunk_size)
+
+@import_cli.command("residents", help="Import residents: username,password,name,street|street_id[,contact]")
+@_import_options
+def import_residents(file, fmt, chunk_size):
+    _run_import('residents', file, fmt, chunk_size)
+
+@import_cli.command("stop-requests", help="Import stop requests: route_id,resident|resident_id[,quantity,notes,status]")
+@_import_options
+def import_stop_requests(file, fmt, chunk_size):
+    _run_import('stop_requests', file, fmt, chunk_size)
+
+app.cli.add_command(import_cli)
+
 if __name__ == "__main__":
     app.run()